@@ -1,33 +1,93 @@
-import cv2
 import time
+LAUNCH_TIME = time.perf_counter()  # เวลาเริ่มโปรแกรม สำหรับรายงานเวลาที่ใช้ในการเริ่มระบบ
+
+import cv2
 import datetime
 import threading
-import queue
-import RPi.GPIO as GPIO
+try:
+    import RPi.GPIO as GPIO
+except ImportError:  # เครื่องที่ไม่ใช่ Raspberry Pi ใช้ได้เฉพาะโหมด --simulate
+    GPIO = None
 import argparse
 import csv
 import os
-from ultralytics import YOLO
+import socket
+from video_reader import VideoFileReader
+from sorting_engine import SortingEngine, box_area, detections_from_results
+from grade_table import DEFAULT_GRADES, GradeTable
+from inference_geometry import DEFAULT_INFERENCE_WIDTH, InferenceGeometry
+from startup import BackgroundModelLoader, StartupTimer, load_model, warm_up_model
+from sampling_profiler import SamplingProfiler
+from count_journal import CountJournal
+from size_stats import WindowedSizeStats
+from crop_archive import CropArchiveWriter
+from black_box import BlackBoxRecorder
+from simulated_gpio import SimulatedGPIO
+from contour_measure import BeltSegmenter, ContourMeasurement
+from frame_watchdog import DEFAULT_MAX_FRAME_AGE, FrameWatchdog
+from execution_strategies import STRATEGIES, create_strategy, print_comparison
+from resource_planner import ResourcePlanner, parse_cpu_list
+from telemetry import TelemetryClient
+import synthetic_conveyor
+from runtime_config import ConfigWatcher, apply_config, current_config, load_config_file, validate_config
+from shrimp_logging import add_logging_arguments, get_logger, setup_logging_from_args, shutdown_logging
+
+# logger แยกตามส่วนของระบบ ปรับระดับแยกกันได้ด้วย --log-module
+log = get_logger("sorter")
+servo_log = get_logger("servo")
+csv_log = get_logger("csv")
 
 class ShrimpSortingSystem:
-    def __init__(self, use_video_file=None):
+    def __init__(self, use_video_file=None, video_pace="native", video_buffer=8, config_path="shrimp_config.json",
+                 warmup_runs=2, profiler=None, count_journal_path="shrimp_counts.journal",
+                 fsync_interval=1.0, stats_path="shrimp_size_rollup.jsonl", stats_window=60,
+                 crop_archive_dir="shrimp_crops", crop_quota_mb=2048,
+                 black_box_dir="blackbox", black_box_seconds=10.0, black_box_min_fps=0.0,
+                 simulate=False, simulation_log="simulated_actuations.csv", ground_truth=None,
+                 measurement="yolo", verify_every=10, contour_threshold=30,
+                 strategy="threaded", csv_logging=True, headless=False, max_frames=None, resources=None,
+                 station=None, telemetry_address=None, telemetry_interval=5.0,
+                 telemetry_spool="telemetry_spool.jsonl"):
         # System variables
         self.frame_width = 640
         self.frame_height = 480
         self.running = True
         self.use_video_file = use_video_file
+        self.headless = headless  # ไม่แสดงหน้าต่าง (ใช้ตอน benchmark)
+        self.max_frames = max_frames  # หยุดเมื่ออ่านครบจำนวนเฟรมนี้ (None = ไม่จำกัด)
+        self.profiler = profiler  # SamplingProfiler สำหรับโหมด --profile (None = ปิด)
+        self.station = station or socket.gethostname()  # ชื่อเครื่อง ใช้ในไฟล์สถิติและ telemetry
+        self.start_time = time.time()
+        self.servo_errors = 0
+        
+        # แบ่ง core ให้ capture, inference และ actuation (ไม่กำหนด = ไม่ผูก core แต่ยังวัดเวลา CPU ต่อขั้นตอน)
+        self.resources = resources or ResourcePlanner()
+        self.resources.apply()
         
-        # ค่าพื้นที่สำหรับแยกขนาดกุ้ง
+        # เกรดขนาดกุ้งเรียงจากเล็กไปใหญ่ (ไฟล์ config กำหนดได้กี่เกรดก็ได้ผ่าน "grades")
+        self.grades = list(DEFAULT_GRADES)
+        
+        # ค่าพื้นที่สำหรับแยกขนาดกุ้ง: ขอบบนของทุกเกรดยกเว้นเกรดสุดท้าย
         self.size_thresholds = {
             "small": 32519.3,  # พื้นที่น้อยกว่า 32519.3 pixels² = Small
             "medium": 48045.8  # พื้นที่ระหว่าง 32519.3-48045.8 pixels² = Medium
             # พื้นที่มากกว่า 48045.8 pixels² = Large
         }
         
+        # โหมดจำลอง: ใช้ GPIO จำลองที่บันทึกเวลาการหมุน servo แทนฮาร์ดแวร์จริง
+        self.simulate = simulate
+        self.ground_truth = ground_truth  # ไฟล์เฉลยจาก synthetic_conveyor.py สำหรับประเมินผลตอนปิดระบบ
+        if simulate:
+            self.gpio = SimulatedGPIO(simulation_log)
+        elif GPIO is None:
+            raise RuntimeError("RPi.GPIO is not available, run with --simulate on this machine")
+        else:
+            self.gpio = GPIO
+        
         # GPIO setup ใช้แบบเดิมไม่มีการเปลี่ยนแปลง
-        GPIO.setmode(GPIO.BOARD)
+        self.gpio.setmode(self.gpio.BOARD)
         
-        # ใช้ servo configs เดิมแต่เปลี่ยนชื่อวัตถุเป็นขนาดของกุ้ง
+        # ใช้ servo configs เดิมแต่เปลี่ยนชื่อวัตถุเป็นขนาดของกุ้ง (เกรดที่ไม่มี servo จะไหลไปท้ายสายพาน)
         self.servo_configs = {
             "small": {
                 "pin": 11,
@@ -52,58 +112,145 @@ class ShrimpSortingSystem:
             }
         }
         
+        # ค่าเริ่มต้นของโมเดลและการตรวจจับ (ไฟล์ config สามารถแทนที่ได้)
+        self.model_path = "/home/project/Desktop/ShrimpDetection last.pt"
+        self.confidence_threshold = 0.6
+        self.detection_interval = 0.05  # ลดเวลาในการตรวจจับลง
+        
+        # ความกว้างของภาพที่ส่งเข้าโมเดล (ความสูงตามสัดส่วนกล้อง หารด้วย 32 ลงตัว) 480 = โหมดเร็ว 480x352
+        # กรอบถูกแปลงกลับเป็นพิกัด 640x480 เสมอ threshold จึงใช้ได้ทุกขนาด (CheckPixel ใช้การเตรียมภาพแบบเดียวกัน)
+        self.inference_width = DEFAULT_INFERENCE_WIDTH
+        self._geometry = None
+        
+        # อายุสูงสุดของเฟรมก่อนตรวจจับและก่อนสั่ง servo (วินาทีนับจากได้เฟรม) ควรตั้งจากความเร็วสายพาน
+        # และระยะจากกล้องถึงประตู กุ้งที่สั่ง servo ไม่ทันจะไปช่อง reject_lane (None = ปล่อยไปท้ายสายพาน)
+        self.max_frame_age = dict(DEFAULT_MAX_FRAME_AGE)
+        self.reject_lane = None
+        self.watchdog = FrameWatchdog()
+        
+        # โหลดค่าจากไฟล์ config (ถ้ามี) ก่อนตั้งค่า servo และโหลดโมเดล
+        self.config_path = config_path
+        self.config_lock = threading.Lock()  # ล็อคสำหรับการสลับค่า config ขณะทำงาน
+        self.config_watcher = None
+        self.load_startup_config()
+        
+        # เปลี่ยนเป็นใช้โมเดลที่เทรนสำหรับกุ้ง
+        # โหลดและ warm-up โมเดลใน thread แยก พร้อมกับการตั้งค่า servo และกล้อง (self.model พร้อมใช้ใน run())
+        # strategy "process" โหลดโมเดลใน process ตรวจจับแทน
+        self.startup = StartupTimer(LAUNCH_TIME)
+        self.model = None
+        self.warmup_runs = warmup_runs
+        self.model_loader = None
+        if strategy != "process":
+            self.model_loader = BackgroundModelLoader(
+                self.model_path,
+                self.geometry.inference_size,
+                self.startup,
+                warmup_runs=warmup_runs,
+                conf=self.confidence_threshold,
+                resources=self.resources
+            )
+        
         # สร้าง PWM objects สำหรับแต่ละ servo (คงเดิม)
         self.servos = {}
         for shrimp_size, config in self.servo_configs.items():
             pin = config["pin"]
-            GPIO.setup(pin, GPIO.OUT)
-            servo = GPIO.PWM(pin, 50)  # 50Hz pulse
+            self.gpio.setup(pin, self.gpio.OUT)
+            servo = self.gpio.PWM(pin, 50)  # 50Hz pulse
             servo.start(0)
             self.servos[shrimp_size] = servo
-            
-            # ตั้งค่า servo ไปที่องศาเริ่มต้น
-            print(f"Setting {shrimp_size} shrimp servo to initial position: {config['initial_angle']} degrees")
-            initial_duty = 2 + (config["initial_angle"] / 18)
-            servo.ChangeDutyCycle(initial_duty)
-            time.sleep(0.5)
-            servo.ChangeDutyCycle(0)  # หยุด PWM เพื่อป้องกัน jitter
-
-        # เปลี่ยนเป็นใช้โมเดลที่เทรนสำหรับกุ้ง
-        self.model = YOLO("/home/project/Desktop/ShrimpDetection last.pt")  # เปลี่ยนเป็นโมเดลที่เทรนสำหรับกุ้ง
-        self.confidence_threshold = 0.6
+        if simulate:
+            self.gpio.label_pins({config["pin"]: size for size, config in self.servo_configs.items()})
+        
+        # ตั้งค่า servo ทุกตัวไปที่องศาเริ่มต้นพร้อมกัน
+        with self.startup.phase("servo_homing"):
+            self.home_servos()
         
         # กำหนดกล้องหรือไฟล์วิดีโอตามตัวเลือก
-        if self.use_video_file:
-            self.cap = cv2.VideoCapture(self.use_video_file)
-            print(f"Using video file: {self.use_video_file}")
-        else:
-            self.cap = cv2.VideoCapture(0)
-            self.setup_camera()
-            print("Using real-time camera")
+        with self.startup.phase("camera_open"):
+            self.open_video_source(video_pace, video_buffer)
         
-        # Initialize object tracking variables
-        self.shrimp_counts = {size: 0 for size in self.servo_configs.keys()}
-        self.tracked_objects = {}  # เก็บข้อมูลวัตถุที่กำลังติดตาม
+        # ตรรกะการคัดแยก (ไม่ขึ้นกับฮาร์ดแวร์) พร้อมตัวนับและข้อมูลการติดตามวัตถุ
+        self.engine = SortingEngine(
+            self.size_thresholds,
+            self.grades,
+            self.frame_width,
+            self.frame_height,
+            confidence_threshold=self.confidence_threshold,
+            stale_timeout=0.5  # ลดเวลาในการลบออกเพื่อการตอบสนองที่เร็วขึ้น
+        )
+        self.shrimp_counts = self.engine.shrimp_counts
+        self.tracked_objects = self.engine.tracked_objects  # เก็บข้อมูลวัตถุที่กำลังติดตาม (ใช้เฉพาะใน processing thread)
         
-        # Threading and queue setup - ปรับปรุงประสิทธิภาพ
-        self.frame_queue = queue.Queue(maxsize=2)  # เพิ่มขนาด queue เป็น 2
-        self.processed_frame_queue = queue.Queue(maxsize=2)  # queue สำหรับเฟรมที่ประมวลผลเสร็จแล้ว
-        self.detection_thread = None
-        self.processing_thread = None
-        self.last_detection_time = 0
-        self.detection_interval = 0.05  # ลดเวลาในการตรวจจับลง
+        # โหมด --measure contour: วัดขนาดด้วย contour บนพื้นสายพาน และใช้ YOLO ยืนยันเป็นระยะ (ใช้ใน detection thread)
+        self.measurement = measurement
+        self.verify_every = verify_every
+        self.contour_threshold = contour_threshold
+        self.contour_measurement = None
+        if measurement == "contour" and strategy != "process":
+            self.contour_measurement = ContourMeasurement(
+                self.engine, verify_every=verify_every, segmenter=BeltSegmenter(diff_threshold=contour_threshold))
+        
+        # บันทึกตัวนับแบบ journal เพื่อกู้คืนยอดได้หลังไฟดับหรือโปรแกรมล่ม
+        self.count_journal = None
+        if count_journal_path:
+            self.count_journal = CountJournal(count_journal_path, self.grades, fsync_interval)
+            recovered_counts = self.count_journal.recover()
+            if recovered_counts:
+                self.shrimp_counts.update(recovered_counts)
+                print(f"Resuming counts from last session: {recovered_counts}")
+            self.count_journal.start(self.shrimp_counts)
+        
+        # สถิติพื้นที่ต่อขนาดกุ้งแบบ streaming แยกตามช่วงเวลา (รวมข้ามช่วงเวลา/เครื่องได้ภายหลัง)
+        self.size_stats = None
+        if stats_path:
+            self.size_stats = WindowedSizeStats(stats_path, self.grades, window_seconds=stats_window,
+                                                station=self.station)
+            self.size_stats.start()
+        
+        # เก็บภาพ crop ของกุ้งทุกตัวที่ถูกคัดแยก ไว้ตรวจสอบย้อนหลังและใช้เป็นข้อมูลเทรนโมเดล
+        self.crop_archive = None
+        if crop_archive_dir:
+            self.crop_archive = CropArchiveWriter(crop_archive_dir, self.grades,
+                                                  quota_bytes=int(crop_quota_mb * 1024 * 1024))
+            self.crop_archive.start()
+        
+        # เก็บภาพหน้าจอย้อนหลังไว้ในหน่วยความจำ บันทึกเป็นวิดีโอเมื่อเกิดปัญหา (servo error, อ่านเฟรมไม่ได้, กด b)
+        self.black_box = None
+        self.black_box_min_fps = black_box_min_fps  # FPS ต่ำกว่าค่านี้จะบันทึกวิดีโอ (0 = ปิด)
+        if black_box_dir and black_box_seconds > 0:
+            self.black_box = BlackBoxRecorder(black_box_dir, seconds=black_box_seconds,
+                                              frame_size=(self.frame_width, self.frame_height))
+        
+        # วิธีรันการตรวจจับและการคัดแยก (sync, threaded, process) ทุกแบบใช้ detect() และ handle_detections() ร่วมกัน
+        self.strategy_name = strategy
+        self.strategy = create_strategy(strategy, self)
         
         # ตัวแปรสำหรับการคำนวณ FPS
         self.fps = 0
+        self.prev_frame_time = 0  # เวลาของเฟรมก่อนหน้า สำหรับ FPS ของการแสดงผล
         self.fps_update_time = time.time()
         self.frame_count = 0
         
+        # สถานะล่าสุดสำหรับหน้าจอและผู้อ่านอื่น processing thread สร้างชุดใหม่ทุกเฟรม
+        # แล้วสลับด้วยการกำหนดค่าครั้งเดียว ผู้อ่านจึงไม่ต้องล็อค
+        self.snapshot = self.engine.snapshot()
+        
+        # ส่งยอดนับ สถิติพื้นที่ เวลาแฝง และสถานะเครื่องเป็นชุดไปยัง aggregator (telemetry.py serve)
+        self.telemetry = None
+        if telemetry_address:
+            self.telemetry = TelemetryClient(telemetry_address, self.station, self.grades,
+                                             interval=telemetry_interval, health=self.telemetry_health,
+                                             spool_path=telemetry_spool or None)
+            self.strategy.stats.listener = self.telemetry.record_latency
+        
         # ... existing code ...
         
         # เพิ่มตัวแปรสำหรับการเก็บข้อมูล CSV
         self.csv_filename = None
         self.csv_data = []  # เก็บข้อมูลชั่วคราวก่อนเขียนลงไฟล์
-        self.initialize_csv()
+        if csv_logging:
+            self.initialize_csv()
     
     def initialize_csv(self):
         """สร้างไฟล์ CSV ใหม่พร้อมชื่อไฟล์เป็น timestamp"""
@@ -133,6 +280,8 @@ class ShrimpSortingSystem:
     
     def log_detection_to_csv(self, class_name, shrimp_size, track_id, confidence, box, processed=False):
         """เพิ่มข้อมูลการตรวจจับลงในรายการสำหรับเขียนลง CSV"""
+        if not self.csv_filename:
+            return
         current_time = datetime.datetime.now()
         timestamp = current_time.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]  # รวมมิลลิวินาที
         detection_time = current_time.timestamp()
@@ -163,10 +312,10 @@ class ShrimpSortingSystem:
                 writer = csv.writer(csvfile)
                 writer.writerow(row_data)
             
-            print(f"CSV: Logged {shrimp_size} shrimp (ID: {track_id}) - Processed: {processed}")
+            csv_log.debug("Logged %s shrimp (ID: %s) - Processed: %s", shrimp_size, track_id, processed)
             
         except Exception as e:
-            print(f"Error writing to CSV: {e}")
+            csv_log.error("Error writing to CSV: %s", e)
     
     def write_csv_batch(self):
         """เขียนข้อมูลที่สะสมไว้ลงในไฟล์ CSV แบบ real-time"""
@@ -178,13 +327,13 @@ class ShrimpSortingSystem:
                 writer = csv.writer(csvfile)
                 writer.writerows(self.csv_data)
             
-            print(f"Wrote {len(self.csv_data)} records to CSV")
+            csv_log.debug("Wrote %d records to CSV", len(self.csv_data))
             
             # ล้างข้อมูลชั่วคราวหลังจากเขียนเสร็จ
             self.csv_data.clear()
             
         except Exception as e:
-            print(f"Error writing to CSV: {e}")
+            csv_log.error("Error writing to CSV: %s", e)
     
     def write_single_record_csv(self, class_name, shrimp_size, track_id, confidence, box, processed=False):
         """เขียนข้อมูลทีละ record ลงไฟล์ CSV ทันที (สำหรับ debugging)"""
@@ -207,10 +356,10 @@ class ShrimpSortingSystem:
                 writer = csv.writer(csvfile)
                 writer.writerow(row_data)
             
-            print(f"CSV: Logged {shrimp_size} shrimp (ID: {track_id}) - Processed: {processed}")
+            csv_log.debug("Logged %s shrimp (ID: %s) - Processed: %s", shrimp_size, track_id, processed)
             
         except Exception as e:
-            print(f"Error writing single record to CSV: {e}")
+            csv_log.error("Error writing single record to CSV: %s", e)
     
     def save_summary_csv(self):
         """เขียนสรุปผลลัพธ์ลงในไฟล์ CSV แдельно"""
@@ -238,26 +387,88 @@ class ShrimpSortingSystem:
 
         # ... rest of existing cleanup code ...
 
+    def open_video_source(self, video_pace, video_buffer):
+        """เปิดกล้องหรือไฟล์วิดีโอตามตัวเลือก"""
+        if self.use_video_file:
+            # ถอดรหัสวิดีโอล่วงหน้าใน process แยก และวนเล่นซ้ำโดยไม่ต้อง seek ใน loop หลัก
+            self.cap = VideoFileReader(
+                self.use_video_file,
+                size=(self.frame_width, self.frame_height),
+                buffer_size=video_buffer,
+                loop=not self.simulate,  # โหมดจำลองเล่นครั้งเดียวให้ตรงกับไฟล์เฉลย
+                pace=video_pace
+            )
+            self.resources.add_process("capture", self.cap.pid)
+            print(f"Using video file: {self.use_video_file} (pace: {video_pace})")
+        else:
+            self.cap = cv2.VideoCapture(0)
+            self.setup_camera()
+            print("Using real-time camera")
+
     def setup_camera(self):
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_width)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_height)
         self.cap.set(cv2.CAP_PROP_FPS, 30)
         self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # ลดขนาดบัฟเฟอร์เพื่อลดเวลาแฝง
 
+    def load_startup_config(self):
+        """อ่านไฟล์ config ตอนเริ่มระบบ (เปลี่ยน pin ได้เฉพาะตอนนี้)"""
+        if not self.config_path or not os.path.exists(self.config_path):
+            return
+        config = validate_config(load_config_file(self.config_path), current_config(self), allow_pin_change=True)
+        self.grades = config["grades"]
+        self.size_thresholds = config["size_thresholds"]
+        self.servo_configs = config["servo_configs"]
+        self.confidence_threshold = config["confidence_threshold"]
+        self.detection_interval = config["detection_interval"]
+        self.model_path = config["model_path"]
+        self.max_frame_age = config["max_frame_age"]
+        self.reject_lane = config["reject_lane"]
+        self.inference_width = config["inference_width"]
+        print(f"Loaded config from {self.config_path}")
+
+    def reload_config(self, data):
+        """นำค่าจากไฟล์ config ที่เปลี่ยนไปใช้ทันทีโดยไม่ต้องหยุดระบบ"""
+        return apply_config(self, data, load_model=self.load_model_for_reload, home_servo=self.set_servo_angle)
+
+    def load_model_for_reload(self, model_path):
+        """โหลดโมเดลใหม่พร้อม warm-up ก่อนสลับเข้าไปใช้งาน"""
+        if self.strategy_name == "process":
+            return None  # process ตรวจจับโหลดโมเดลใหม่เองเมื่อเห็น model_path ที่เปลี่ยน
+        model = load_model(model_path)
+        width, height = self.geometry.inference_size
+        return warm_up_model(model, width, height, conf=self.confidence_threshold)
+
+    @property
+    def geometry(self):
+        """InferenceGeometry ของ inference_width ปัจจุบัน (สร้างใหม่เมื่อ config เปลี่ยน)"""
+        if self._geometry is None or self._geometry.inference_width != self.inference_width:
+            self._geometry = InferenceGeometry(self.frame_width, self.frame_height, self.inference_width)
+        return self._geometry
+
+    def home_servos(self):
+        """ตั้งค่า servo ทุกตัวไปที่องศาเริ่มต้นพร้อมกัน (รอ servo เคลื่อนที่ครั้งเดียว)"""
+        for shrimp_size, config in self.servo_configs.items():
+            print(f"Setting {shrimp_size} shrimp servo to initial position: {config['initial_angle']} degrees")
+            self.servos[shrimp_size].ChangeDutyCycle(2 + (config["initial_angle"] / 18))
+        time.sleep(0.5)  # รอให้ servo ทุกตัวเคลื่อนที่ไปถึงตำแหน่ง
+        for servo in self.servos.values():
+            servo.ChangeDutyCycle(0)  # หยุด PWM เพื่อป้องกัน jitter
+
+    def set_servo_angle(self, shrimp_size, angle):
+        """หมุน servo ไปยังมุมที่กำหนดแล้วหยุด PWM"""
+        servo = self.servos[shrimp_size]
+        servo.ChangeDutyCycle(2 + (angle / 18))  # Convert angle to duty cycle
+        time.sleep(0.5)  # รอให้ servo เคลื่อนที่ไปถึงตำแหน่ง
+        servo.ChangeDutyCycle(0)  # หยุด PWM เพื่อป้องกัน jitter
+
     def determine_shrimp_size(self, box):
         """คำนวณขนาดของกุ้งจากพื้นที่ของกรอบ"""
-        x1, y1, x2, y2 = map(int, box.xyxy[0])
-        area = (x2 - x1) * (y2 - y1)  # คำนวณพื้นที่เป็น pixels²
-        
-        if area < self.size_thresholds["small"]:
-            return "small"
-        elif area < self.size_thresholds["medium"]:
-            return "medium"
-        else:
-            return "large"
+        return self.engine.determine_shrimp_size(box.xyxy[0].tolist())
 
     def move_servo(self, shrimp_size):
         """ควบคุม servo ตามขนาดของกุ้ง - คงไว้ตามเดิม"""
+        self.resources.enter("actuation")
         try:
             config = self.servo_configs[shrimp_size]
             initial_angle = config["initial_angle"]
@@ -267,228 +478,191 @@ class ShrimpSortingSystem:
             servo = self.servos[shrimp_size]
             
             # ส่วนการเคลื่อนที่ servo ไปยังเป้าหมาย
-            print(f"Moving {shrimp_size} shrimp servo to {target_angle} degrees")
+            servo_log.debug("Moving %s shrimp servo to %s degrees", shrimp_size, target_angle)
             target_duty = 2 + (target_angle / 18)  # Convert angle to duty cycle
             servo.ChangeDutyCycle(target_duty)
             time.sleep(0.5)  # รอให้ servo เคลื่อนที่ไปถึงตำแหน่ง
             servo.ChangeDutyCycle(0)  # หยุด PWM เพื่อป้องกัน jitter
             
             # ค้างไว้ที่ตำแหน่งเป้าหมายตามเวลาที่กำหนด
-            print(f"Holding {shrimp_size} shrimp servo at {target_angle} degrees for {hold_time} seconds")
+            servo_log.debug("Holding %s shrimp servo at %s degrees for %s seconds", shrimp_size, target_angle, hold_time)
             time.sleep(hold_time)
             
             # รอตามเวลา delay
             time.sleep(delay - hold_time if delay > hold_time else 0)
             
             # ส่ง servo กลับไปที่ตำแหน่งเริ่มต้น
-            print(f"Returning {shrimp_size} shrimp servo to initial position: {initial_angle} degrees")
+            servo_log.debug("Returning %s shrimp servo to initial position: %s degrees", shrimp_size, initial_angle)
             initial_duty = 2 + (initial_angle / 18)  # Convert angle to duty cycle
             servo.ChangeDutyCycle(initial_duty)
             time.sleep(0.5)  # รอให้ servo เคลื่อนที่ไปถึงตำแหน่งเริ่มต้น
             servo.ChangeDutyCycle(0)  # หยุด PWM เพื่อป้องกัน jitter
             
         except Exception as e:
-            print(f"Servo error for {shrimp_size} shrimp: {e}")
-
-    def detection_loop(self):
-        """Thread แยกสำหรับการตรวจจับ object"""
-        while self.running:
-            try:
-                if self.frame_queue.empty():
-                    time.sleep(0.01)
-                    continue
-                
-                current_time = time.time()
-                if current_time - self.last_detection_time < self.detection_interval:
-                    time.sleep(0.005)  # ลดเวลารอลงเพื่อตอบสนองเร็วขึ้น
-                    continue
+            self.servo_error(shrimp_size, e)
+        finally:
+            self.resources.leave()
 
-                # ดึงเฟรมล่าสุดจาก queue
-                frame = self.frame_queue.get(timeout=0.5)
-                
-                # ทำ object detection พร้อมการ tracking
-                results = self.model.track(frame, persist=True, conf=self.confidence_threshold, verbose=False)
-                
-                # ใส่ผลลัพธ์ลงใน queue สำหรับการประมวลผลต่อไป
-                self.processed_frame_queue.put((frame, results))
-                
-                self.last_detection_time = current_time
-                
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(f"Detection error: {e}")
-
-    def processing_loop(self):
-        """Thread แยกสำหรับการประมวลผลหลังจากตรวจจับวัตถุเสร็จ"""
-        while self.running:
-            try:
-                if self.processed_frame_queue.empty():
-                    time.sleep(0.01)
+    def servo_plan(self, shrimp_size):
+        """ลำดับการหมุน servo หนึ่งรอบเป็น [(วินาทีนับจากเริ่ม, duty cycle)] จังหวะเดียวกับ move_servo
+
+        ใช้กับ strategy ที่ตั้งเวลาแต่ละขั้นเองแทนการ sleep (asyncio)
+        """
+        config = self.servo_configs[shrimp_size]
+        target_duty = 2 + (config["target_angle"] / 18)  # Convert angle to duty cycle
+        initial_duty = 2 + (config["initial_angle"] / 18)
+        # หมุนไป 0.5 วินาที ค้างไว้ hold_time และรอจนครบ delay แล้วจึงหมุนกลับ
+        return_time = 0.5 + max(config["hold_time"], config["delay"])
+        return [(0.0, target_duty), (0.5, 0), (return_time, initial_duty), (return_time + 0.5, 0)]
+
+    def servo_error(self, shrimp_size, error):
+        servo_log.error("Servo error for %s shrimp: %s", shrimp_size, error)
+        self.servo_errors += 1
+        if self.black_box:
+            self.black_box.trigger(f"servo_error_{shrimp_size}")
+
+    def detect(self, frame):
+        """ตรวจจับกุ้งในเฟรม คืนค่ารายการ Detection (เรียกจาก strategy)"""
+        # อ่านโมเดลและค่าความเชื่อมั่นชุดเดียวกัน (config อาจถูกสลับระหว่างทำงาน)
+        with self.config_lock:
+            model = self.model
+            confidence_threshold = self.confidence_threshold
+            geometry = self.geometry
+        
+        if self.contour_measurement:
+            # วัดและติดตามด้วย contour ทุกเฟรม เรียก YOLO เฉพาะตอนยืนยัน
+            return self.contour_measurement.measure(frame, model, confidence_threshold, geometry)
+        
+        # ทำ object detection พร้อมการ tracking ที่ขนาด inference แล้วแปลงกรอบกลับเป็นพิกัดเฟรม
+        results = geometry.track(model, frame, persist=True, conf=confidence_threshold, verbose=False)
+        return geometry.scale_detections(detections_from_results(results, model.names))
+
+    def handle_detections(self, frame, detections, capture_time):
+        """คัดแยกตามผลการตรวจจับของหนึ่งเฟรม แล้วเผยแพร่สถานะใหม่ (เรียกจาก strategy)"""
+        # ประมวลผลการติดตามวัตถุ ด้วย config ชุดเดียวกันตลอดทั้งเฟรม
+        with self.config_lock:
+            self.process_detections(frame, detections, capture_time)
+        
+        # เพิ่มการนับ FPS
+        self.frame_count += 1
+        current_time = time.time()
+        if current_time - self.fps_update_time >= 1.0:  # อัพเดททุก 1 วินาที
+            self.fps = self.frame_count / (current_time - self.fps_update_time)
+            self.frame_count = 0
+            self.fps_update_time = current_time
+        
+        # เผยแพร่สถานะของเฟรมนี้
+        self.snapshot = self.engine.snapshot(self.fps)
+
+    def frame_is_fresh(self, capture_time):
+        """เฟรมยังใหม่พอจะส่งเข้าโมเดลหรือไม่ (strategy เรียกก่อนตรวจจับ เฟรมที่เก่าเกินถูกนับและทิ้ง)"""
+        return self.watchdog.fresh_for_inference(capture_time, self.max_frame_age["inference"])
+
+    def process_detections(self, frame, detections, capture_time):
+        """ส่งผลการตรวจจับให้ SortingEngine แล้วสั่ง servo และบันทึก CSV ตามผลลัพธ์"""
+        # ใช้ค่า config ล่าสุด (อาจถูกเปลี่ยนผ่านไฟล์ config ขณะทำงาน)
+        self.engine.size_thresholds = self.size_thresholds
+        self.engine.confidence_threshold = self.confidence_threshold
+        
+        commands, events = self.engine.step(detections, time.time())
+        
+        # สั่ง servo ก่อนเพื่อลดเวลาแฝง
+        for command in commands:
+            log.debug("Processing %s shrimp (ID: %s)", command.shrimp_size, command.track_id)
+            if self.count_journal:
+                self.count_journal.record(command.shrimp_size)
+            if self.telemetry:
+                self.telemetry.record_sort(command.shrimp_size)
+            if self.startup.mark("first_sort"):
+                log.info("First shrimp sorted %.2f s after launch", self.startup.marks['first_sort'])
+            if command.shrimp_size not in self.servos:
+                continue  # เกรดที่ไม่มี servo นับอย่างเดียว
+            
+            # เฟรมเก่าเกินจนสั่ง servo ไม่ทันกุ้งตัวนี้แล้ว ส่งไปช่อง reject แทนประตูที่ผิด
+            lane = command.shrimp_size
+            if not self.watchdog.deadline_met(capture_time, self.max_frame_age["actuation"], command.shrimp_size,
+                                              self.reject_lane):
+                lane = self.reject_lane
+                if lane is None:
                     continue
-                
-                # ดึงเฟรมและผลการตรวจจับมาประมวลผลต่อ
-                frame, results = self.processed_frame_queue.get(timeout=0.5)
-                
-                # ประมวลผลการติดตามวัตถุ
-                self.process_detections(frame, results)
-                
-                # เพิ่มการนับ FPS
-                self.frame_count += 1
-                current_time = time.time()
-                if current_time - self.fps_update_time >= 1.0:  # อัพเดททุก 1 วินาที
-                    self.fps = self.frame_count / (current_time - self.fps_update_time)
-                    self.frame_count = 0
-                    self.fps_update_time = current_time
-                
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(f"Processing error: {e}")
-
-    def is_object_in_frame(self, box):
-        """ตรวจสอบว่าวัตถุอยู่ในเฟรมหรือไม่"""
-        x1, y1, x2, y2 = map(int, box.xyxy[0])
-        return (0 <= x1 <= self.frame_width and 
-                0 <= x2 <= self.frame_width and
-                0 <= y1 <= self.frame_height and 
-                0 <= y2 <= self.frame_height)
-
-    def process_detections(self, frame, results):
-        if results and len(results) > 0:
-            current_time = time.time()
-            active_tracks = set()  # เก็บ ID ที่เจอในเฟรมปัจจุบัน
+            if self.simulate:
+                self.gpio.record_command(lane, command.box, time.time())
             
-            for result in results:
-                for box in result.boxes:
-                    if box.id is None:
-                        continue
-                        
-                    cls = int(box.cls[0])
-                    class_name = self.model.names[cls]  # ตอนนี้ class_name ควรจะเป็น "shrimp"
-                    track_id = int(box.id[0])
-                    conf = float(box.conf[0])
-                    
-                    # ตรวจสอบความเชื่อมั่น
-                    if conf < self.confidence_threshold:
-                        continue
-
-                    # กำหนดขนาดของกุ้ง
-                    shrimp_size = self.determine_shrimp_size(box)
-                    unique_id = f"{class_name}_{track_id}"
-                    
-                    # ตรวจสอบว่าวัตถุอยู่ในเฟรมหรือไม่
-                    if not self.is_object_in_frame(box):
-                        if unique_id in self.tracked_objects:
-                            del self.tracked_objects[unique_id]
-                        continue
-                    
-                    active_tracks.add(unique_id)
-                    
-                    # จัดการวัตถุใหม่หรืออัพเดตวัตถุที่มีอยู่
-                    if unique_id not in self.tracked_objects:
-                        # วัตถุใหม่หรือวัตถุที่กลับเข้ามาในเฟรม
-                        self.tracked_objects[unique_id] = {
-                            'class': class_name,
-                            'size': shrimp_size,
-                            'last_seen': current_time,
-                            'processed': False,
-                            'box': box.xyxy[0].tolist()  # เก็บข้อมูล bounding box ล่าสุด
-                        }
-                        
-                        # บันทึกข้อมูลการตรวจจับใหม่ลง CSV
-                        self.log_detection_to_csv(class_name, shrimp_size, track_id, conf, box.xyxy[0].tolist(), False)
-                        
-                    else:
-                        # อัพเดตขนาดและเวลาที่เห็นล่าสุด และตำแหน่งล่าสุด
-                        self.tracked_objects[unique_id]['size'] = shrimp_size
-                        self.tracked_objects[unique_id]['last_seen'] = current_time
-                        self.tracked_objects[unique_id]['box'] = box.xyxy[0].tolist()
-                    
-                    # ประมวลผลวัตถุที่ยังไม่ได้ประมวลผล
-                    if not self.tracked_objects[unique_id]['processed']:
-                        self.tracked_objects[unique_id]['processed'] = True
-                        self.shrimp_counts[shrimp_size] += 1
-                        print(f"Processing {shrimp_size} shrimp (ID: {track_id})")
-                        
-                        # บันทึกข้อมูลการประมวลผลลง CSV
-                        self.log_detection_to_csv(class_name, shrimp_size, track_id, conf, box.xyxy[0].tolist(), True)
-                        
-                        thread = threading.Thread(
-                            target=self.move_servo,
-                            args=(shrimp_size,)
-                        )
-                        thread.start()
+            # strategy เป็นผู้กำหนดวิธีสั่ง servo (thread ต่อรอบ หรือตั้งเวลาบน event loop)
+            self.strategy.actuate(lane)
+        
+        # บันทึกข้อมูลการตรวจจับใหม่และการประมวลผลลง CSV
+        for event in events:
+            if event.processed:
+                area = box_area(event.box)
+                if self.size_stats:
+                    self.size_stats.add(event.shrimp_size, area, event.timestamp)
+                if self.telemetry:
+                    self.telemetry.record_area(event.shrimp_size, area)
+                if self.crop_archive:
+                    self.crop_archive.submit(frame, event.box, event.shrimp_size, event.track_id,
+                                             event.confidence, area, event.timestamp)
+            self.log_detection_to_csv(event.class_name, event.shrimp_size, event.track_id,
+                                      event.confidence, event.box, event.processed)
+
+    def telemetry_health(self):
+        """สถานะเครื่องสำหรับ telemetry (เรียกจาก telemetry thread ทุกช่วงเวลา)"""
+        stats = self.strategy.stats
+        return {
+            "uptime_s": round(time.time() - self.start_time),
+            "fps": round(self.snapshot.fps, 1),
+            "strategy": self.strategy_name,
+            "frames_submitted": stats.submitted,
+            "frames_skipped": stats.skipped,
+            "frames_processed": stats.processed,
+            "servo_errors": self.servo_errors,
+            **self.watchdog.summary()
+        }
+
+    def draw_boxes(self, frame, snapshot):
+        """วาดกรอบและข้อมูลบนเฟรมจาก snapshot ล่าสุด (ไม่อ่านสถานะที่ processing thread กำลังแก้ไข)"""
+        for track in snapshot.tracks:
+            x1, y1, x2, y2 = map(int, track.box)
+            
+            # คำนวณพื้นที่สำหรับแสดงในกรอบ
+            area = (x2 - x1) * (y2 - y1)
+            
+            # สีกรอบตามสถานะการประมวลผล
+            color = (0, 255, 0) if track.processed else (255, 165, 0)
             
-            # ลบวัตถุที่ไม่ได้เจอในเฟรมปัจจุบันและไม่ได้เห็นมานาน
-            for unique_id in list(self.tracked_objects.keys()):
-                if (unique_id not in active_tracks and 
-                    current_time - self.tracked_objects[unique_id]['last_seen'] > 0.5):  # ลดเวลาในการลบออกเพื่อการตอบสนองที่เร็วขึ้น
-                    del self.tracked_objects[unique_id]
-
-    def draw_boxes(self, frame, results):
-        """วาดกรอบและข้อมูลบนเฟรม"""
-        # วาดกรอบจากผลการตรวจจับล่าสุด (ถ้ามี)
-        if results:
-            for result in results:
-                for box in result.boxes:
-                    if box.id is None:
-                        continue
-                        
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cls = int(box.cls[0])
-                    conf = float(box.conf[0])
-                    track_id = int(box.id[0])
-                    class_name = self.model.names[cls]
-                    
-                    if conf >= self.confidence_threshold:
-                        # คำนวณขนาดของกุ้ง
-                        shrimp_size = self.determine_shrimp_size(box)
-                        unique_id = f"{class_name}_{track_id}"
-                        
-                        processed = False
-                        if unique_id in self.tracked_objects:
-                            processed = self.tracked_objects[unique_id].get('processed', False)
-                        
-                        # คำนวณพื้นที่สำหรับแสดงในกรอบ
-                        area = (x2 - x1) * (y2 - y1)
-                        
-                        # สีกรอบตามสถานะการประมวลผล
-                        color = (0, 255, 0) if processed else (255, 165, 0)
-                        
-                        # วาดกรอบและจุดกึ่งกลาง
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                        center_x = (x1 + x2) // 2
-                        center_y = (y1 + y2) // 2
-                        cv2.circle(frame, (center_x, center_y), 4, (0, 0, 255), -1)
-                        
-                        # แสดงข้อความที่ปรับปรุงแล้ว - เพิ่มขนาดและพื้นที่
-                        label = f"{class_name} ({shrimp_size}) ID:{track_id} Area:{area:.1f}px²"
-                        
-                        # วาดพื้นหลังข้อความเพื่อให้อ่านง่ายขึ้น
-                        (text_width, text_height), _ = cv2.getTextSize(
-                            label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2
-                        )
-                        cv2.rectangle(
-                            frame, 
-                            (x1, y1 - text_height - 10), 
-                            (x1 + text_width, y1), 
-                            color, 
-                            -1
-                        )
-                        cv2.putText(
-                            frame, 
-                            label, 
-                            (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 
-                            0.5, 
-                            (255, 255, 255), 
-                            2
-                        )
+            # วาดกรอบและจุดกึ่งกลาง
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            center_x = (x1 + x2) // 2
+            center_y = (y1 + y2) // 2
+            cv2.circle(frame, (center_x, center_y), 4, (0, 0, 255), -1)
+            
+            # แสดงข้อความที่ปรับปรุงแล้ว - เพิ่มขนาดและพื้นที่
+            label = f"{track.class_name} ({track.shrimp_size}) ID:{track.track_id} Area:{area:.1f}px²"
+            
+            # วาดพื้นหลังข้อความเพื่อให้อ่านง่ายขึ้น
+            (text_width, text_height), _ = cv2.getTextSize(
+                label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2
+            )
+            cv2.rectangle(
+                frame, 
+                (x1, y1 - text_height - 10), 
+                (x1 + text_width, y1), 
+                color, 
+                -1
+            )
+            cv2.putText(
+                frame, 
+                label, 
+                (x1, y1 - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 
+                0.5, 
+                (255, 255, 255), 
+                2
+            )
 
         # แสดงจำนวนการนับด้วยพื้นหลังสีเพื่อลดการกระพริบ
         y_pos = 30
-        for size, count in self.shrimp_counts.items():
+        for size, count in snapshot.counts.items():
             text = f"{size} shrimp: {count}"
             (text_width, text_height), _ = cv2.getTextSize(
                 text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2
@@ -533,7 +707,7 @@ class ShrimpSortingSystem:
         # เพิ่มข้อมูลเกณฑ์ขนาดในบรรทัดเดียว
         cv2.putText(
             frame, 
-            f"Size: S< {int(self.size_thresholds['small'])}, M: {int(self.size_thresholds['small'])}-{int(self.size_thresholds['medium'])}, L> {int(self.size_thresholds['medium'])} px²", 
+            f"Size: {snapshot.threshold_label} px²", 
             (corner_x, corner_y - 5),
             cv2.FONT_HERSHEY_SIMPLEX, 
             font_size, 
@@ -544,7 +718,7 @@ class ShrimpSortingSystem:
         # แสดง FPS ที่คำนวณได้จากการประมวลผลจริง
         cv2.putText(
             frame, 
-            f"FPS: {self.fps:.1f}", 
+            f"FPS: {snapshot.fps:.1f}", 
             (self.frame_width - 120, 30),
             cv2.FONT_HERSHEY_SIMPLEX, 
             0.6, 
@@ -570,128 +744,370 @@ class ShrimpSortingSystem:
         print("Servo initial positions:")
         for size, config in self.servo_configs.items():
             print(f"  - {size} shrimp: {config['initial_angle']} degrees")
-        print("Size thresholds (pixels²):")
-        print(f"  - Small: < {self.size_thresholds['small']}")
-        print(f"  - Medium: {self.size_thresholds['small']} - {self.size_thresholds['medium']}")
-        print(f"  - Large: > {self.size_thresholds['medium']}")
-        time.sleep(2)
+        print(f"Size grades (pixels²), {len(self.grades)} grades:")
+        for grade, lower, upper in GradeTable.from_thresholds(self.size_thresholds, self.grades).ranges():
+            if lower is None:
+                print(f"  - {grade}: < {upper}")
+            elif upper is None:
+                print(f"  - {grade}: > {lower}")
+            else:
+                print(f"  - {grade}: {lower} - {upper}")
+            if grade not in self.servo_configs:
+                print("    (no servo, passes to the end of the belt)")
+        print(f"Execution strategy: {self.strategy_name}")
+        print(f"Inference size: {self.geometry.describe()}")
         
-        # เริ่ม threads สำหรับการตรวจจับและประมวลผลแยก
-        self.detection_thread = threading.Thread(target=self.detection_loop)
-        self.detection_thread.daemon = True  # ให้ thread ปิดเมื่อโปรแกรมหลักปิด
-        self.detection_thread.start()
+        # รอให้โมเดลโหลดและ warm-up เสร็จ (ทำงานพร้อมกับการตั้งค่า servo และกล้องตั้งแต่ __init__)
+        # แล้วเริ่มการตรวจจับตาม strategy (process จะรอ process ตรวจจับโหลดโมเดลที่นี่)
+        try:
+            if self.model_loader:
+                with self.startup.phase("wait_model"):
+                    self.model = self.model_loader.wait()
+            self.strategy.start()
+            if self.telemetry:
+                self.telemetry.start()
+        except Exception:
+            self.cleanup()
+            raise
         
-        self.processing_thread = threading.Thread(target=self.processing_loop)
-        self.processing_thread.daemon = True
-        self.processing_thread.start()
+        # เริ่มเก็บ stack ของทุก thread (โหมด --profile)
+        if self.profiler:
+            self.profiler.start()
+        
+        # เฝ้าดูไฟล์ config เพื่อปรับค่าได้โดยไม่ต้องหยุดระบบ
+        if self.config_path:
+            self.config_watcher = ConfigWatcher(self.config_path, self.reload_config)
+            self.config_watcher.start()
+            print(f"Watching config file: {self.config_path}")
         
         try:
-            # ตัวแปรสำหรับการคำนวณ FPS ของการแสดงผล
-            prev_frame_time = 0
+            # ผูก loop หลักกับ core ของขั้นตอนที่ทำ (capture และ inference ด้วยถ้าเป็น sync)
+            self.resources.enter(*self.strategy.main_stages)
+            
+            if self.strategy.owns_main_loop:
+                # strategy asyncio รับเฟรม ตรวจจับ และตั้งเวลา servo บน event loop ของตัวเอง
+                self.strategy.run()
+                return
             
+            frames_read = 0
             while self.running:
-                # จับเวลาเริ่มต้นการประมวลผล
-                new_frame_time = time.time()
-                
-                ret, frame = self.cap.read()
-                if not ret:
-                    # ถ้าเป็นไฟล์วิดีโอและเล่นจบแล้ว ให้เริ่มเล่นใหม่
-                    if self.use_video_file:
-                        print("Video ended, restarting...")
-                        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                        continue
-                    else:
-                        print("Failed to grab frame")
-                        break
-
-                frame = cv2.resize(frame, (self.frame_width, self.frame_height))
-                
-                # ใส่เฟรมเข้า queue สำหรับการตรวจจับ โดยไม่รอถ้า queue เต็ม
-                if not self.frame_queue.full():
-                    self.frame_queue.put(frame.copy(), block=False)
-                
-                # สร้างภาพสำหรับแสดงผล
-                display_frame = frame.copy()
-                
-                # วาดข้อมูลจากผลลัพธ์ล่าสุด
-                self.draw_boxes(display_frame, None)  # ส่งค่า None เพื่อให้ draw_boxes ใช้ข้อมูลที่เก็บไว้ใน tracked_objects
-                
-                # คำนวณ FPS สำหรับการแสดงผล
-                fps_display = 1 / (new_frame_time - prev_frame_time) if prev_frame_time > 0 else 0
-                prev_frame_time = new_frame_time
-                
-                # แสดง FPS ของการแสดงผล
-                cv2.putText(
-                    display_frame, 
-                    f"Display FPS: {fps_display:.1f}", 
-                    (self.frame_width - 200, 90),
-                    cv2.FONT_HERSHEY_SIMPLEX, 
-                    0.6, 
-                    (0, 255, 0), 
-                    2
-                )
-                
-                # ชะลอการเล่นวิดีโอ - เพิ่มการหน่วงเวลาถ้าเป็นไฟล์วิดีโอ
-                if self.use_video_file:
-                    time.sleep(0.03)  # ปรับลดการหน่วงเวลา
+                frame, capture_time = self.read_frame()
+                if frame is None:
+                    break
                 
-                # แสดงภาพ
-                cv2.imshow("Shrimp Sorting System", display_frame)
+                # ส่งเฟรมให้ strategy ตรวจจับ (sync ตรวจจับที่นี่เลย, threaded/process ไม่รอถ้ายังไม่ว่าง)
+                self.strategy.submit(frame, capture_time)
+                frames_read += 1
                 
-                # ตรวจสอบการกดปุ่ม q เพื่อออกจากโปรแกรม
-                if cv2.waitKey(1) & 0xFF == ord("q"):
+                if not self.show_frame(frame, capture_time):
+                    break
+                if self.max_frames and frames_read >= self.max_frames:
                     break
 
         finally:
             self.cleanup()
 
+    def read_frame(self):
+        """อ่านเฟรมถัดไปและปรับขนาด คืนค่า (เฟรม, เวลาที่ได้เฟรม) หรือ (None, เวลา) ถ้าอ่านไม่ได้"""
+        ret, frame = self.cap.read()
+        # เวลาที่ได้เฟรม ใช้วัดอายุของเฟรมในทุกขั้นตอนต่อจากนี้ (อ่านหลัง read เพราะ read อาจรอเฟรมถัดไป)
+        capture_time = time.time()
+        if not ret:
+            if self.simulate and self.use_video_file:
+                log.info("End of simulated video")
+                return None, capture_time
+            # ไฟล์วิดีโอวนเล่นซ้ำใน VideoFileReader แล้ว ถ้าอ่านไม่ได้แปลว่าแหล่งภาพมีปัญหา
+            log.error("Failed to grab frame")
+            if self.black_box:
+                self.black_box.trigger("frame_grab_failed")
+            return None, capture_time
+
+        # กล้องที่ไม่ใช่ 640x480 ถูกตัดขอบให้สัดส่วนเท่ากันแล้วย่อ (ไม่ยืดภาพ) แบบเดียวกับ CheckPixel
+        # ไฟล์วิดีโอถูกปรับแบบเดียวกันใน process ถอดรหัสของ VideoFileReader แล้ว
+        frame = self.geometry.to_reference(frame)
+        
+        if self.startup.mark("first_frame"):
+            self.startup.report()
+            if self.simulate:
+                self.gpio.set_epoch(capture_time)  # เวลา 0 ของวิดีโอจำลอง
+        return frame, capture_time
+
+    def show_frame(self, frame, capture_time):
+        """วาดผลล่าสุดบนสำเนาของเฟรม เก็บลง black box และแสดงผล คืนค่า False เมื่อผู้ใช้กด q"""
+        # สร้างภาพสำหรับแสดงผล
+        display_frame = frame.copy()
+        
+        # วาดข้อมูลจาก snapshot ล่าสุด (อ่าน reference ครั้งเดียว ไม่ต้องล็อค)
+        snapshot = self.snapshot
+        self.draw_boxes(display_frame, snapshot)
+        
+        # คำนวณ FPS สำหรับการแสดงผล
+        fps_display = 1 / (capture_time - self.prev_frame_time) if self.prev_frame_time > 0 else 0
+        self.prev_frame_time = capture_time
+        
+        # แสดง FPS ของการแสดงผล
+        cv2.putText(
+            display_frame, 
+            f"Display FPS: {fps_display:.1f}", 
+            (self.frame_width - 200, 90),
+            cv2.FONT_HERSHEY_SIMPLEX, 
+            0.6, 
+            (0, 255, 0), 
+            2
+        )
+        
+        # เก็บภาพที่วาดแล้วลง black box และตรวจ FPS ที่ต่ำผิดปกติ
+        if self.black_box:
+            self.black_box.record(display_frame, capture_time)
+            if 0 < snapshot.fps < self.black_box_min_fps:
+                self.black_box.trigger("low_fps")
+        
+        if self.headless:
+            return True
+        
+        # แสดงภาพ
+        cv2.imshow("Shrimp Sorting System", display_frame)
+        
+        # ตรวจสอบการกดปุ่ม q เพื่อออกจากโปรแกรม, b เพื่อบันทึกวิดีโอย้อนหลัง
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord("q"):
+            return False
+        if key == ord("b") and self.black_box:
+            self.black_box.trigger("operator")
+        return True
+
     def cleanup(self):
         self.running = False
-        # รอให้ threads หยุดทำงาน
-        if self.detection_thread:
-            self.detection_thread.join(timeout=1.0)
-        if self.processing_thread:
-            self.processing_thread.join(timeout=1.0)
+        self.resources.leave()
+        if self.config_watcher:
+            self.config_watcher.stop()
+        # หยุด threads/process ของ strategy
+        self.strategy.stop()
+        stats = self.strategy.stats.summary()
+        print(f"Strategy {self.strategy_name}: {stats['processed']} of {stats['submitted']} frames detected, "
+              f"{stats['throughput_fps']:.1f} detections/s, latency p50 {stats['latency_p50_ms']:.0f} ms, "
+              f"p95 {stats['latency_p95_ms']:.0f} ms, std {stats['latency_std_ms']:.0f} ms")
+        self.resources.report()
+        self.watchdog.report()
+        if self.profiler:
+            self.profiler.stop()
+        if self.black_box:
+            self.black_box.close()
+        
+        # เขียนตัวนับที่เหลือลง journal และทำเครื่องหมายว่าปิดระบบเรียบร้อย
+        if self.count_journal:
+            self.count_journal.close()
+        if self.size_stats:
+            self.size_stats.close()
+        if self.telemetry:
+            self.telemetry.close()
+        if self.crop_archive:
+            self.crop_archive.close()
+        if self.contour_measurement:
+            self.contour_measurement.report()
         
         # เขียนข้อมูลที่เหลืออยู่ลงไฟล์ก่อนปิดโปรแกรม (ถ้ามี)
         if hasattr(self, 'csv_data') and self.csv_data:
             self.write_csv_batch()
         
         # บันทึกไฟล์สรุปผลลัพธ์
-        summary_file = self.save_summary_csv()
+        summary_file = self.save_summary_csv() if self.csv_filename else None
             
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"\nSummary ({timestamp})")
         for size, count in self.shrimp_counts.items():
             print(f"{size} shrimp: {count}")
         
-        print(f"\nData saved to: {self.csv_filename}")
+        if self.csv_filename:
+            print(f"\nData saved to: {self.csv_filename}")
         if summary_file:
             print(f"Summary saved to: {summary_file}")
         
         # หยุด PWM และทำความสะอาด GPIO
         for servo in self.servos.values():
             servo.stop()
-        GPIO.cleanup()
+        self.gpio.cleanup()
+        if self.simulate and self.ground_truth:
+            self.report_simulation()
             
         self.cap.release()
-        cv2.destroyAllWindows()
+        if not self.headless:
+            cv2.destroyAllWindows()
         print("System shutdown complete")
 
-def parse_arguments():
+    def report_simulation(self):
+        """เทียบการคัดแยกในโหมดจำลองกับไฟล์เฉลย แล้วแสดงความแม่นยำและอัตราการพลาดเวลาตามอัตราการไหล"""
+        try:
+            report = synthetic_conveyor.evaluate(synthetic_conveyor.read_ground_truth(self.ground_truth),
+                                                 self.gpio.actuations())
+            synthetic_conveyor.print_report(report)
+        except Exception as e:
+            print(f"Error evaluating simulation: {e}")
+
+def parse_arguments(defaults=None):
     parser = argparse.ArgumentParser(description='Shrimp Sorting System')
     parser.add_argument('--video', type=str, help='Path to video file. If not provided, camera will be used.')
+    parser.add_argument('--pace', type=str, choices=['native', 'fast'], default='native',
+                        help='Video file playback speed: native FPS or as fast as possible')
+    parser.add_argument('--video-buffer', type=int, default=8,
+                        help='Number of decoded frames to read ahead for video files')
+    parser.add_argument('--config', type=str, default='shrimp_config.json',
+                        help='Runtime config file (JSON), reloaded automatically when it changes')
+    parser.add_argument('--warmup-runs', type=int, default=2,
+                        help='Dummy inferences to run at startup before the first real frame')
+    parser.add_argument('--count-journal', type=str, default='shrimp_counts.journal',
+                        help='Crash-safe count journal file, empty string disables it')
+    parser.add_argument('--fsync-interval', type=float, default=1.0,
+                        help='Seconds between batched fsyncs of the count journal (default: 1.0)')
+    parser.add_argument('--stats-file', type=str, default='shrimp_size_rollup.jsonl',
+                        help='Per-window size statistics rollup file, empty string disables it')
+    parser.add_argument('--stats-window', type=float, default=60,
+                        help='Statistics window length in seconds (default: 60)')
+    parser.add_argument('--crop-archive', type=str, default='shrimp_crops',
+                        help='Directory for the per-shrimp crop archive, empty string disables it')
+    parser.add_argument('--crop-quota-mb', type=float, default=2048,
+                        help='Disk quota for the crop archive in MiB, oldest crops are evicted first (default: 2048)')
+    parser.add_argument('--blackbox-dir', type=str, default='blackbox',
+                        help='Directory for black box clips, empty string disables the recorder')
+    parser.add_argument('--blackbox-seconds', type=float, default=10.0,
+                        help='Seconds of recent frames kept in memory, 0 disables (default: 10)')
+    parser.add_argument('--blackbox-min-fps', type=float, default=0.0,
+                        help='Save a clip when processing FPS drops below this value, 0 disables (default: 0)')
+    parser.add_argument('--strategy', type=str, choices=STRATEGIES, default='threaded',
+                        help='Run detection inline (sync), in worker threads (threaded), in a separate process, '
+                             'or on an asyncio event loop that schedules servo moves (asyncio)')
+    parser.add_argument('--benchmark-strategies', type=str, nargs='*', choices=STRATEGIES, default=None,
+                        help='Run each strategy on the same --video headless and compare throughput and latency')
+    parser.add_argument('--benchmark-frames', type=int, default=600,
+                        help='Frames per strategy in --benchmark-strategies (default: 600)')
+    parser.add_argument('--capture-cpus', type=str, default='',
+                        help='Cores for the capture/display loop and video decoder, e.g. "0" (default: not pinned)')
+    parser.add_argument('--inference-cpus', type=str, default='',
+                        help='Cores for model inference, e.g. "2-3" (default: not pinned)')
+    parser.add_argument('--actuation-cpus', type=str, default='',
+                        help='Cores for sorting decisions and servo threads, e.g. "1" (default: not pinned)')
+    parser.add_argument('--inference-threads', type=int, default=0,
+                        help='torch intra-op threads, 0 = number of --inference-cpus (default: torch default)')
+    parser.add_argument('--actuation-priority', type=int, default=0,
+                        help='SCHED_FIFO priority for servo threads (1-99, needs root), 0 disables (default: 0)')
+    parser.add_argument('--station', type=str, default=None,
+                        help='Station name for the statistics rollup and telemetry (default: host name)')
+    parser.add_argument('--telemetry', type=str, default='',
+                        help='Stream telemetry to an aggregator at host:port or unix:/path, empty disables (default)')
+    parser.add_argument('--telemetry-interval', type=float, default=5.0,
+                        help='Seconds per telemetry batch (default: 5)')
+    parser.add_argument('--telemetry-spool', type=str, default='telemetry_spool.jsonl',
+                        help='File for unsent telemetry batches at shutdown, sent on the next start')
+    parser.add_argument('--no-csv', dest='csv', action='store_false',
+                        help='Do not write the per-detection and summary CSV files')
+    parser.add_argument('--measure', type=str, choices=['yolo', 'contour'], default='yolo',
+                        help='Size shrimp from YOLO boxes every frame, or from belt contours with periodic YOLO checks')
+    parser.add_argument('--verify-every', type=int, default=10,
+                        help='In contour mode, run YOLO every Nth frame to confirm blobs (default: 10)')
+    parser.add_argument('--contour-threshold', type=int, default=30,
+                        help='In contour mode, minimum colour difference from the belt background (default: 30)')
+    parser.add_argument('--simulate', action='store_true',
+                        help='Use simulated servos instead of RPi.GPIO and log every actuation')
+    parser.add_argument('--simulation-log', type=str, default='simulated_actuations.csv',
+                        help='Actuation log written in --simulate mode')
+    parser.add_argument('--ground-truth', type=str, default=None,
+                        help='Ground truth CSV from synthetic_conveyor.py, report accuracy on exit (--simulate)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Sample all thread stacks and write flamegraph-ready profiles')
+    parser.add_argument('--profile-hz', type=float, default=50,
+                        help='Stack sampling rate in Hz (default: 50)')
+    parser.add_argument('--profile-interval', type=float, default=5.0,
+                        help='Minutes between profile files (default: 5)')
+    parser.add_argument('--profile-alloc-top', type=int, default=0,
+                        help='Top-N allocation sites per profile file via tracemalloc; adds seconds-long '
+                             'snapshots, use only to hunt leaks (default: 0 = off)')
+    parser.add_argument('--profile-dir', type=str, default='profiles',
+                        help='Directory for profile output files')
+    add_logging_arguments(parser)
+    if defaults:
+        parser.set_defaults(**defaults)
     return parser.parse_args()
 
-if __name__ == "__main__":
-    # กำหนดเส้นทางวิดีโอโดยตรงที่นี่
-    video_path = "/home/project/Desktop/Test.mp4"  # ระบุเส้นทางวิดีโอที่ต้องการใช้
+def build_resource_planner(args):
+    """สร้าง ResourcePlanner จาก argument --*-cpus, --inference-threads และ --actuation-priority"""
+    return ResourcePlanner(
+        {
+            "capture": parse_cpu_list(args.capture_cpus),
+            "inference": parse_cpu_list(args.inference_cpus),
+            "actuation": parse_cpu_list(args.actuation_cpus)
+        },
+        inference_threads=args.inference_threads,
+        actuation_priority=args.actuation_priority
+    )
+
+def benchmark_strategies(args, video_path):
+    """รันแต่ละ strategy กับวิดีโอเดียวกันแบบไม่แสดงผล ใช้ servo จำลองและไม่เขียนไฟล์ แล้วเปรียบเทียบผล"""
+    results = {}
+    for name in args.benchmark_strategies or STRATEGIES:
+        print(f"\nBenchmarking strategy: {name}")
+        sorter = ShrimpSortingSystem(use_video_file=video_path, video_pace=args.pace, video_buffer=args.video_buffer,
+                                     config_path=args.config, warmup_runs=args.warmup_runs,
+                                     count_journal_path=None, stats_path=None, crop_archive_dir=None,
+                                     black_box_dir=None, simulate=True, simulation_log=None,
+                                     measurement=args.measure, verify_every=args.verify_every,
+                                     contour_threshold=args.contour_threshold, strategy=name,
+                                     csv_logging=False, headless=True, max_frames=args.benchmark_frames,
+                                     resources=build_resource_planner(args))
+        sorter.config_path = None  # ไม่เฝ้าดูไฟล์ config ระหว่าง benchmark
+        sorter.detection_interval = 0.0  # ตรวจจับทุกเฟรมที่ strategy รับได้
+        sorter.run()
+        results[name] = sorter.strategy.stats.summary()
+    print_comparison(results)
+
+
+def main(defaults=None):
+    args = parse_arguments(defaults)
+    setup_logging_from_args(args)
+    
+    # กำหนดเส้นทางวิดีโอโดยตรงที่นี่ (--video จะใช้แทนค่านี้)
+    video_path = args.video if args.video else "/home/project/Desktop/Test.mp4"  # ระบุเส้นทางวิดีโอที่ต้องการใช้
     
     # ถ้าต้องการใช้กล้องแทนวิดีโอ ให้กำหนดเป็น None
     # video_path = None
     
     print(f"Video path: {video_path if video_path else 'Using camera mode'}")
     
+    if args.benchmark_strategies is not None:
+        try:
+            benchmark_strategies(args, video_path)
+        finally:
+            shutdown_logging()
+        return
+    
+    # โหมด profile สำหรับดูเวลาที่ใช้ในแต่ละ thread ระหว่างทำงานจริง
+    profiler = None
+    if args.profile:
+        profiler = SamplingProfiler(
+            output_dir=args.profile_dir,
+            rate_hz=args.profile_hz,
+            interval_minutes=args.profile_interval,
+            alloc_top=args.profile_alloc_top
+        )
+    
     # เรียกใช้คลาส ShrimpSortingSystem
-    sorter = ShrimpSortingSystem(use_video_file=video_path)
-    sorter.run()
\ No newline at end of file
+    sorter = ShrimpSortingSystem(use_video_file=video_path, video_pace=args.pace, video_buffer=args.video_buffer,
+                                 config_path=args.config, warmup_runs=args.warmup_runs,
+                                 profiler=profiler, count_journal_path=args.count_journal,
+                                 fsync_interval=args.fsync_interval, stats_path=args.stats_file,
+                                 stats_window=args.stats_window, crop_archive_dir=args.crop_archive,
+                                 crop_quota_mb=args.crop_quota_mb, black_box_dir=args.blackbox_dir,
+                                 black_box_seconds=args.blackbox_seconds, black_box_min_fps=args.blackbox_min_fps,
+                                 simulate=args.simulate, simulation_log=args.simulation_log,
+                                 ground_truth=args.ground_truth, measurement=args.measure,
+                                 verify_every=args.verify_every, contour_threshold=args.contour_threshold,
+                                 strategy=args.strategy, csv_logging=args.csv,
+                                 resources=build_resource_planner(args), station=args.station,
+                                 telemetry_address=args.telemetry, telemetry_interval=args.telemetry_interval,
+                                 telemetry_spool=args.telemetry_spool)
+    try:
+        sorter.run()
+    finally:
+        shutdown_logging()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -4,28 +4,74 @@ import os
 import argparse
 from ultralytics import YOLO
 import matplotlib.pyplot as plt
-import glob
+from runtime_config import update_config_file
+from threshold_optimizer import counts_from_samples, evaluate_thresholds, parse_cost_matrix
+from streaming_calibration import StreamingCalibration
+from image_writer import ImageWriterPool, SAVE_MODES, should_save
+from dataset_index import DatasetIndex
+from grade_table import DEFAULT_GRADES, grade_color
+from inference_geometry import DEFAULT_INFERENCE_WIDTH, FAST_INFERENCE_WIDTH, REFERENCE_FRAME_SIZE, InferenceGeometry
 
 class ShrimpSizeCalibrator:
-    def __init__(self, model_path="yolov12.pt", confidence=0.7):
+    def __init__(self, model_path="yolov12.pt", confidence=0.7, config_path=None,
+                 objective="balanced_accuracy", cost_matrix=None, bootstrap=2000,
+                 streaming=False, checkpoint_path="calibration_checkpoint.json",
+                 checkpoint_every=50, bin_width=16, resume=False,
+                 save_images="all", sample_rate=0.1, jpeg_quality=95, thumbnail=None, writer_threads=2,
+                 manifest_path="dataset_manifest.json", recursive=False, grades=DEFAULT_GRADES,
+                 inference_width=DEFAULT_INFERENCE_WIDTH):
         # กำหนดค่าเริ่มต้น
         self.confidence_threshold = confidence
         
+        # ขนาดภาพเข้าโมเดลต้องเหมือนระบบคัดแยกจริง ไม่เช่นนั้นพื้นที่ที่วัดได้จะไม่ตรงกับตอนใช้งาน
+        self.inference_width = inference_width
+        self.geometry = InferenceGeometry(*REFERENCE_FRAME_SIZE, inference_width)
+        
+        # วิธีเลือก threshold: balanced accuracy สูงสุด หรือ ต้นทุนรวมต่ำสุดตาม cost matrix
+        self.objective = objective
+        self.cost_matrix = cost_matrix
+        self.bootstrap = bootstrap  # จำนวนรอบ bootstrap สำหรับช่วงความเชื่อมั่น
+        self.threshold_result = None
+        self.config_path = config_path  # ไฟล์ config ของระบบคัดแยกที่จะเขียนค่า threshold ใหม่ลงไป
+        
+        # การบันทึกภาพผลลัพธ์: none / failures (ไม่พบกุ้ง) / sampled / all
+        self.save_images = save_images
+        self.sample_rate = sample_rate
+        self.jpeg_quality = jpeg_quality
+        self.thumbnail = thumbnail
+        self.writer_threads = writer_threads
+        self.writer = None
+        
+        # ดัชนีไฟล์ภาพ (อ่านโฟลเดอร์ครั้งเดียวและใช้ manifest เดิมถ้าโฟลเดอร์ไม่เปลี่ยน)
+        self.index = DatasetIndex(manifest_path)
+        self.recursive = recursive
+        
         # โหลดโมเดล YOLO
         print(f"Loading YOLO model from {model_path}...")
         self.model = YOLO(model_path)
         
-        # ตัวแปรเก็บข้อมูลขนาด
-        self.size_data = {'small': [], 'medium': [], 'large': []}
+        # ตัวแปรเก็บข้อมูลขนาด แยกตามเกรด (เรียงจากเล็กไปใหญ่ ได้ threshold N-1 ค่า)
+        self.grades = list(grades)
+        self.size_data = {grade: [] for grade in self.grades}
+        
+        # โหมด streaming: เก็บเฉพาะสถิติและ histogram แทนข้อมูลทุกค่า และบันทึก checkpoint เป็นระยะ
+        self.streaming = streaming or resume
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.stream = None
+        if self.streaming:
+            sizes = list(self.size_data.keys())
+            if resume and os.path.exists(checkpoint_path):
+                self.stream = StreamingCalibration.load(checkpoint_path, sizes, bin_width)
+                print(f"ทำต่อจาก checkpoint {checkpoint_path} (ประมวลผลแล้ว {len(self.stream.processed)} ภาพ)")
+            else:
+                if resume:
+                    print(f"ไม่พบ checkpoint {checkpoint_path} เริ่มใหม่ตั้งแต่ต้น")
+                self.stream = StreamingCalibration(sizes, bin_width)
     
     def get_size_color(self, size):
-        """สีสำหรับแต่ละขนาด"""
-        if size == "small":
-            return (0, 255, 0)  # สีเขียว
-        elif size == "medium":
-            return (0, 165, 255)  # สีส้ม
-        else:  # large
-            return (0, 0, 255)  # สีแดง
+        """สีสำหรับแต่ละขนาด (BGR) ไล่จากเขียว (เล็กสุด) ไปแดง (ใหญ่สุด)"""
+        return grade_color(self.grades.index(size), len(self.grades))
     
     def calculate_stats(self, data):
         """คำนวณสถิติพื้นฐาน"""
@@ -39,6 +85,23 @@ class ShrimpSizeCalibrator:
             "max": np.max(data)
         }
     
+    def record_area(self, size_category, area):
+        """เก็บพื้นที่ของกุ้งหนึ่งตัว"""
+        if self.stream is not None:
+            self.stream.add(size_category, area)
+        else:
+            self.size_data[size_category].append(area)
+    
+    def get_stats(self, size):
+        """สถิติพื้นฐานของขนาดที่กำหนด"""
+        if self.stream is None:
+            return self.calculate_stats(self.size_data[size])
+        stats = self.stream.stats[size]
+        if stats.count == 0:
+            return {"count": 0, "mean": 0, "std": 0, "min": 0, "max": 0}
+        return {"count": stats.count, "mean": stats.mean, "std": stats.std,
+                "min": stats.min, "max": stats.max}
+    
     def process_image(self, image_path, size_category):
         """ประมวลผลภาพและบันทึกข้อมูลขนาด"""
         print(f"กำลังประมวลผล: {image_path}")
@@ -47,14 +110,13 @@ class ShrimpSizeCalibrator:
         image = cv2.imread(image_path)
         if image is None:
             print(f"ไม่สามารถอ่านไฟล์ภาพ: {image_path}")
-            return None
+            return None, None
         
-        # ปรับขนาดภาพ (ถ้าจำเป็น)
-        if image.shape[0] != 640 or image.shape[1] != 640:
-            image = cv2.resize(image, (640, 640))
+        # ปรับเป็นเฟรมอ้างอิง 640x480 แบบเดียวกับกล้องของระบบคัดแยก (ตัดขอบ ไม่ยืดภาพ)
+        image = self.geometry.to_reference(image)
         
-        # ตรวจจับกุ้งด้วย YOLO
-        results = self.model(image, conf=self.confidence_threshold)
+        # ตรวจจับกุ้งด้วย YOLO ที่ขนาด inference เดียวกับระบบคัดแยก
+        results = self.geometry.predict(self.model, image, conf=self.confidence_threshold)
         
         # เตรียมภาพสำหรับแสดงผล
         display_image = image.copy()
@@ -74,7 +136,7 @@ class ShrimpSizeCalibrator:
                     detect_class = "all"  # หรือเปลี่ยนเป็น "shrimp" ถ้าโมเดลสามารถตรวจจับกุ้งโดยเฉพาะ
                     
                     if (detect_class == "all" or class_name == detect_class) and conf >= self.confidence_threshold:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
+                        x1, y1, x2, y2 = map(int, self.geometry.scale_box(box.xyxy[0].tolist()))
                         width = x2 - x1
                         height = y2 - y1
                         area = width * height
@@ -102,51 +164,88 @@ class ShrimpSizeCalibrator:
         # (สมมติว่าเราต้องการวัดขนาดกุ้งตัวเดียวต่อภาพ)
         if detected_areas:
             largest_area = max(detected_areas)
-            self.size_data[size_category].append(largest_area)
+            self.record_area(size_category, largest_area)
             return display_image, largest_area
         else:
             print(f"ไม่พบกุ้งในภาพ: {image_path}")
             return display_image, None
     
-    def batch_process_images(self, folders):
-        """ประมวลผลภาพทั้งหมดในโฟลเดอร์ที่กำหนด"""
-        print("\n===== กำลังประมวลผลภาพเพื่อสอบเทียบขนาด =====")
+    def process_folder(self, size_category, folder_path):
+        """ประมวลผลภาพทั้งหมดของขนาดหนึ่ง"""
+        print(f"\nกำลังประมวลผลภาพขนาด {size_category.upper()} จาก {folder_path}")
         
-        # ประมวลผลภาพแต่ละขนาด
-        for size_category, folder_path in folders.items():
-            print(f"\nกำลังประมวลผลภาพขนาด {size_category.upper()} จาก {folder_path}")
-            
-            # หาไฟล์ภาพในโฟลเดอร์
-            image_files = []
-            for ext in ['jpg', 'jpeg', 'png']:
-                image_files.extend(glob.glob(os.path.join(folder_path, f"*.{ext}")))
-                image_files.extend(glob.glob(os.path.join(folder_path, f"*.{ext.upper()}")))
-            
-            if not image_files:
-                print(f"ไม่พบไฟล์ภาพใน {folder_path}")
-                continue
-            
-            print(f"พบภาพทั้งหมด {len(image_files)} ไฟล์")
-            
-            # สร้างโฟลเดอร์สำหรับบันทึกผลลัพธ์ (ถ้ายังไม่มี)
-            output_folder = os.path.join(os.path.dirname(folder_path), f"results_{size_category}")
+        # หาไฟล์ภาพในโฟลเดอร์
+        image_files = self.index.list_images(folder_path, recursive=self.recursive)
+        
+        if not image_files:
+            print(f"ไม่พบไฟล์ภาพใน {folder_path}")
+            return
+        
+        print(f"พบภาพทั้งหมด {len(image_files)} ไฟล์")
+        
+        # ข้ามภาพที่ประมวลผลไปแล้วใน checkpoint
+        if self.stream is not None:
+            remaining = [path for path in image_files if not self.stream.is_processed(path)]
+            if len(remaining) < len(image_files):
+                print(f"ข้ามภาพที่ประมวลผลแล้ว {len(image_files) - len(remaining)} ไฟล์")
+        else:
+            remaining = image_files
+        
+        # สร้างโฟลเดอร์สำหรับบันทึกผลลัพธ์ (ถ้ายังไม่มี)
+        output_folder = os.path.join(os.path.dirname(folder_path), f"results_{size_category}")
+        if self.writer is not None:
             os.makedirs(output_folder, exist_ok=True)
+        
+        # ประมวลผลแต่ละภาพ
+        offset = len(image_files) - len(remaining)
+        for i, image_path in enumerate(remaining, offset):
+            result_image, area = self.process_image(image_path, size_category)
+            if self.stream is not None:
+                # บันทึกว่าประมวลผลแล้วทันทีหลังเก็บพื้นที่ ให้ checkpoint ไม่นับภาพซ้ำ
+                self.stream.mark_processed(image_path)
             
-            # ประมวลผลแต่ละภาพ
-            for i, image_path in enumerate(image_files):
-                result_image, area = self.process_image(image_path, size_category)
-                
-                if result_image is not None:
-                    # บันทึกภาพผลลัพธ์
-                    filename = os.path.basename(image_path)
+            if result_image is not None:
+                # ส่งภาพผลลัพธ์ให้ writer thread บันทึก (ไม่รอดิสก์)
+                filename = os.path.basename(image_path)
+                if self.writer is not None and should_save(self.save_images, image_path,
+                                                           area is not None, self.sample_rate):
                     output_path = os.path.join(output_folder, f"result_{filename}")
-                    cv2.imwrite(output_path, result_image)
-                    
-                    # แสดงความคืบหน้า
-                    if area is not None:
-                        print(f"ประมวลผล {i+1}/{len(image_files)}: {filename} - พื้นที่ = {area:.1f} pixels²")
-                    else:
-                        print(f"ประมวลผล {i+1}/{len(image_files)}: {filename} - ไม่พบกุ้ง")
+                    self.writer.submit(output_path, result_image)
+                
+                # แสดงความคืบหน้า
+                if area is not None:
+                    print(f"ประมวลผล {i+1}/{len(image_files)}: {filename} - พื้นที่ = {area:.1f} pixels²")
+                else:
+                    print(f"ประมวลผล {i+1}/{len(image_files)}: {filename} - ไม่พบกุ้ง")
+            
+            if self.stream is not None:
+                if len(self.stream.processed) % self.checkpoint_every == 0:
+                    self.stream.save(self.checkpoint_path)
+    
+    def batch_process_images(self, folders):
+        """ประมวลผลภาพทั้งหมดในโฟลเดอร์ที่กำหนด"""
+        print("\n===== กำลังประมวลผลภาพเพื่อสอบเทียบขนาด =====")
+        
+        if self.save_images != "none":
+            self.writer = ImageWriterPool(num_workers=self.writer_threads,
+                                          jpeg_quality=self.jpeg_quality,
+                                          thumbnail=self.thumbnail,
+                                          block=self.save_images != "sampled")  # ทิ้งภาพได้เฉพาะโหมด sampled
+        
+        try:
+            # ประมวลผลภาพแต่ละขนาด
+            for size_category, folder_path in folders.items():
+                self.process_folder(size_category, folder_path)
+        finally:
+            self.index.save()
+            # รอให้บันทึกภาพที่ค้างอยู่เสร็จ
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+            # บันทึก checkpoint ล่าสุดเสมอ แม้ถูกหยุดกลางทาง (เช่น Ctrl+C)
+            if self.stream is not None:
+                self.stream.save(self.checkpoint_path)
+                print(f"บันทึก checkpoint ลงใน {self.checkpoint_path} แล้ว")
         
         # เมื่อประมวลผลเสร็จสิ้น แสดงผลสรุป
         self.show_summary()
@@ -158,25 +257,31 @@ class ShrimpSizeCalibrator:
         """สร้างกราฟแสดงการกระจายตัวของขนาดกุ้งแต่ละประเภท"""
         plt.figure(figsize=(12, 8))
         
-        colors = {'small': 'green', 'medium': 'orange', 'large': 'red'}
+        # สีเดียวกับกรอบในภาพผลลัพธ์ (แปลง BGR 0-255 เป็น RGB 0-1 ของ matplotlib)
+        colors = {size: tuple(value / 255 for value in reversed(self.get_size_color(size))) for size in self.grades}
         
-        for size, data in self.size_data.items():
-            if data:
-                plt.hist(data, bins=20, alpha=0.7, label=f'{size.upper()} (n={len(data)})', color=colors[size])
+        if self.stream is not None:
+            # วาดจาก histogram ที่สะสมไว้ (รวม bin ละเอียดให้เหลือ 20 ช่วงในช่วงข้อมูลของแต่ละขนาด)
+            centers = self.stream.bin_edges()[:-1] + self.stream.bin_width / 2
+            for k, size in enumerate(self.stream.sizes):
+                stats = self.stream.stats[size]
+                if stats.count:
+                    plt.hist(centers, bins=20, weights=self.stream.histograms[k],
+                             range=(stats.min, stats.max + self.stream.bin_width), alpha=0.7,
+                             label=f'{size.upper()} (n={stats.count})', color=colors[size])
+        else:
+            for size, data in self.size_data.items():
+                if data:
+                    plt.hist(data, bins=20, alpha=0.7, label=f'{size.upper()} (n={len(data)})', color=colors[size])
         
-        # คำนวณและแสดงเส้นแบ่งขนาด (threshold)
-        if all(len(self.size_data[size]) > 0 for size in ['small', 'medium', 'large']):
-            small_mean = np.mean(self.size_data['small'])
-            medium_mean = np.mean(self.size_data['medium'])
-            large_mean = np.mean(self.size_data['large'])
-            
-            small_medium_threshold = (small_mean + medium_mean) / 2
-            medium_large_threshold = (medium_mean + large_mean) / 2
-            
-            plt.axvline(x=small_medium_threshold, color='blue', linestyle='--', 
-                       label=f'Small-Medium Threshold: {small_medium_threshold:.1f}')
-            plt.axvline(x=medium_large_threshold, color='purple', linestyle='--', 
-                       label=f'Medium-Large Threshold: {medium_large_threshold:.1f}')
+        # แสดงเส้นแบ่งขนาด (threshold) ที่คำนวณไว้แล้ว
+        result = self.find_thresholds()
+        if result is not None:
+            for k, threshold in enumerate(result["thresholds"]):
+                plt.axvline(x=threshold, color=plt.cm.cool(k / max(len(result["thresholds"]) - 1, 1)),
+                            linestyle='--',
+                            label=f'{self.grades[k].capitalize()}-{self.grades[k + 1].capitalize()} '
+                                  f'Threshold: {threshold:.1f}')
         
         plt.title('Distribution of area size of each type of shrimp')
         plt.xlabel('Area (pixels²)')
@@ -189,19 +294,37 @@ class ShrimpSizeCalibrator:
         print("\nบันทึกกราฟการกระจายตัวเป็น shrimp_size_distribution.png")
         plt.close()
     
+    def find_thresholds(self):
+        """หา threshold ที่ดีที่สุดจากข้อมูลทั้งหมด (คำนวณครั้งเดียวแล้วเก็บไว้)"""
+        if self.threshold_result is None:
+            if not all(self.get_stats(size)['count'] for size in self.grades):
+                return None
+            if self.stream is not None:
+                cut_values, counts = self.stream.threshold_counts()
+            else:
+                cut_values, counts = counts_from_samples(
+                    [self.size_data[size] for size in self.grades]
+                )
+            self.threshold_result = evaluate_thresholds(
+                cut_values, counts,
+                objective=self.objective,
+                cost_matrix=self.cost_matrix,
+                num_resamples=self.bootstrap
+            )
+        return self.threshold_result
+    
     def show_summary(self):
         """แสดงผลสรุปและคำแนะนำ"""
         print("\n===== สรุปผลการสอบเทียบ =====")
         all_data_valid = True
         
-        for size in ['small', 'medium', 'large']:
-            data = self.size_data[size]
-            if not data:
+        for size in self.grades:
+            stats = self.get_stats(size)
+            if not stats['count']:
                 print(f"ไม่พบข้อมูลสำหรับขนาด {size.upper()}")
                 all_data_valid = False
                 continue
             
-            stats = self.calculate_stats(data)
             print(f"{size.upper()}:")
             print(f"  จำนวนตัวอย่าง: {stats['count']}")
             print(f"  ค่าเฉลี่ย: {stats['mean']:.2f} pixels²")
@@ -210,42 +333,61 @@ class ShrimpSizeCalibrator:
             print(f"  ค่าสูงสุด: {stats['max']:.2f} pixels²")
         
         if all_data_valid:
-            # คำนวณจุดตัด (threshold) ระหว่างขนาด
-            small_mean = np.mean(self.size_data['small'])
-            medium_mean = np.mean(self.size_data['medium'])
-            large_mean = np.mean(self.size_data['large'])
-            
-            small_medium_threshold = (small_mean + medium_mean) / 2
-            medium_large_threshold = (medium_mean + large_mean) / 2
+            # หาจุดตัด (threshold) ระหว่างขนาดจากทุกจุดตัดที่เป็นไปได้
+            result = self.find_thresholds()
+            thresholds = result["thresholds"]  # N-1 ค่า ขอบบนของทุกเกรดยกเว้นเกรดสุดท้าย
             
             print("\n===== ค่าแนะนำสำหรับการตั้งค่าในโค้ดหลัก =====")
             print("เพิ่มค่าต่อไปนี้ในคลาส ShrimpSortingSystem ในฟังก์ชัน __init__:")
-            print(f"""
-self.size_thresholds = {{
-    "small": {small_medium_threshold:.1f},  # พื้นที่น้อยกว่า {small_medium_threshold:.1f} pixels² = ขนาดเล็ก
-    "medium": {medium_large_threshold:.1f}  # พื้นที่ระหว่าง {small_medium_threshold:.1f}-{medium_large_threshold:.1f} pixels² = ขนาดกลาง
-                                  # พื้นที่มากกว่า {medium_large_threshold:.1f} pixels² = ขนาดใหญ่
-}}
-""")
+            print(f"\nself.grades = {self.grades}")
+            print("self.size_thresholds = {")
+            lower = None
+            for k, threshold in enumerate(thresholds):
+                separator = "," if k < len(thresholds) - 1 else ""
+                area_range = f"น้อยกว่า {threshold:.1f}" if lower is None else f"ระหว่าง {lower:.1f}-{threshold:.1f}"
+                print(f'    "{self.grades[k]}": {threshold:.1f}{separator}  # พื้นที่{area_range} pixels² = {self.grades[k]}')
+                lower = threshold
+            print(f"    # พื้นที่มากกว่า {lower:.1f} pixels² = {self.grades[-1]}")
+            print("}\n")
             
-            # ตรวจสอบความแม่นยำของการคัดแยก
-            print("\n===== ตรวจสอบความแม่นยำของเกณฑ์ที่แนะนำ =====")
-            small_correct = sum(1 for area in self.size_data['small'] if area < small_medium_threshold)
-            small_accuracy = (small_correct / len(self.size_data['small'])) * 100 if self.size_data['small'] else 0
+            # เขียนค่าลงไฟล์ config ระบบคัดแยกที่กำลังทำงานจะใช้ค่าใหม่ทันทีโดยไม่ต้องรีสตาร์ท
+            # (ถ้าชุดเกรดต่างจากที่ระบบใช้อยู่ ระบบจะใช้ค่าใหม่หลังรีสตาร์ท)
+            if self.config_path:
+                update_config_file(self.config_path, {
+                    "grades": self.grades,
+                    "inference_width": self.inference_width,
+                    "size_thresholds": {
+                        grade: round(float(threshold), 1) for grade, threshold in zip(self.grades, thresholds)
+                    }
+                })
+                print(f"บันทึกค่า threshold ลงใน {self.config_path} แล้ว")
             
-            medium_correct = sum(1 for area in self.size_data['medium'] 
-                               if small_medium_threshold <= area < medium_large_threshold)
-            medium_accuracy = (medium_correct / len(self.size_data['medium'])) * 100 if self.size_data['medium'] else 0
+            # ตรวจสอบความแม่นยำของการคัดแยก
+            objective_name = "ต้นทุนรวมต่ำสุด" if self.objective == "cost" else "balanced accuracy สูงสุด"
+            print(f"\n===== ตรวจสอบความแม่นยำของเกณฑ์ที่แนะนำ (เลือกจาก{objective_name}) =====")
+            confusion = result["confusion"]
+            ci = result["ci"]
+            level = int(result["confidence"] * 100)
+            names = {'small': 'ขนาดเล็ก', 'medium': 'ขนาดกลาง', 'large': 'ขนาดใหญ่'}
+            width = max(8, max(len(size) for size in self.grades))
             
-            large_correct = sum(1 for area in self.size_data['large'] if area >= medium_large_threshold)
-            large_accuracy = (large_correct / len(self.size_data['large'])) * 100 if self.size_data['large'] else 0
+            print("Confusion matrix (แถว = ขนาดจริง, คอลัมน์ = ขนาดที่คัดแยกได้):")
+            print(f"{'':>{width}} " + " ".join(f"{size:>{width}}" for size in self.grades))
+            for k, size in enumerate(self.grades):
+                print(f"{size:>{width}} " + " ".join(f"{int(value):>{width}}" for value in confusion[k]))
             
-            print(f"ความแม่นยำในการคัดแยกขนาดเล็ก: {small_accuracy:.1f}% ({small_correct}/{len(self.size_data['small'])})")
-            print(f"ความแม่นยำในการคัดแยกขนาดกลาง: {medium_accuracy:.1f}% ({medium_correct}/{len(self.size_data['medium'])})")
-            print(f"ความแม่นยำในการคัดแยกขนาดใหญ่: {large_accuracy:.1f}% ({large_correct}/{len(self.size_data['large'])})")
+            for k, size in enumerate(self.grades):
+                correct = int(confusion[k, k])
+                total = int(confusion[k].sum())
+                low, high = ci["per_class"][k]
+                print(f"ความแม่นยำในการคัดแยก{names.get(size, size)}: {result['per_class_accuracy'][k] * 100:.1f}% "
+                      f"({correct}/{total}) [CI {level}%: {low * 100:.1f}-{high * 100:.1f}%]")
             
-            average_accuracy = (small_accuracy + medium_accuracy + large_accuracy) / 3
-            print(f"ความแม่นยำเฉลี่ย: {average_accuracy:.1f}%")
+            average_accuracy = result["balanced_accuracy"] * 100
+            low, high = ci["balanced"]
+            print(f"ความแม่นยำเฉลี่ย: {average_accuracy:.1f}% [CI {level}%: {low * 100:.1f}-{high * 100:.1f}%]")
+            if "total_cost" in result:
+                print(f"ต้นทุนรวมตาม cost matrix: {result['total_cost']:.1f}")
             
             if average_accuracy < 90:
                 print("\nข้อควรระวัง: ความแม่นยำต่ำกว่า 90% อาจเกิดจาก:")
@@ -255,7 +397,7 @@ self.size_thresholds = {{
                 print("ควรพิจารณาเก็บตัวอย่างเพิ่มหรือปรับปรุงวิธีการวัด")
         else:
             print("\nไม่สามารถคำนวณค่าแนะนำได้เนื่องจากข้อมูลไม่ครบ")
-            print("กรุณาเก็บข้อมูลให้ครบทั้ง 3 ขนาด (small, medium, large)")
+            print(f"กรุณาเก็บข้อมูลให้ครบทั้ง {len(self.grades)} ขนาด ({', '.join(self.grades)})")
 
 # ในส่วนของ if __name__ == "__main__":
 if __name__ == "__main__":
@@ -278,18 +420,95 @@ if __name__ == "__main__":
                             help='โฟลเดอร์ที่เก็บภาพกุ้งขนาดกลาง')
         parser.add_argument('--large', type=str, default=default_large_folder,
                             help='โฟลเดอร์ที่เก็บภาพกุ้งขนาดใหญ่')
+        parser.add_argument('--grade', type=str, action='append', default=None, metavar='NAME=FOLDER',
+                            help='เกรดและโฟลเดอร์ภาพ เรียงจากเล็กไปใหญ่ ใช้ซ้ำได้หลายครั้ง (แทน --small/--medium/--large) '
+                                 'เช่น --grade XS=img/xs --grade S=img/s ... ได้ threshold N-1 ค่า')
+        parser.add_argument('--config', type=str, default=None,
+                            help='ไฟล์ config ของระบบคัดแยก (เช่น shrimp_config.json) สำหรับเขียนค่า threshold ที่แนะนำ')
+        parser.add_argument('--objective', type=str, choices=['balanced_accuracy', 'cost'], default='balanced_accuracy',
+                            help='วิธีเลือก threshold: balanced accuracy สูงสุด หรือต้นทุนรวมต่ำสุด (ต้องใช้ --cost-matrix)')
+        parser.add_argument('--cost-matrix', type=str, default=None,
+                            help='ต้นทุนการคัดแยกผิด แถว = ขนาดจริง คอลัมน์ = ขนาดที่คัดแยก เช่น "0,1,4;1,0,1;4,1,0"')
+        parser.add_argument('--bootstrap', type=int, default=2000,
+                            help='จำนวนรอบ bootstrap สำหรับช่วงความเชื่อมั่นของความแม่นยำ (default: 2000)')
+        parser.add_argument('--streaming', action='store_true',
+                            help='เก็บเฉพาะสถิติและ histogram (หน่วยความจำคงที่) และบันทึก checkpoint เป็นระยะ')
+        parser.add_argument('--resume', action='store_true',
+                            help='ทำต่อจาก checkpoint เดิม ข้ามภาพที่ประมวลผลแล้ว (ใช้โหมด streaming)')
+        parser.add_argument('--checkpoint', type=str, default='calibration_checkpoint.json',
+                            help='ไฟล์ checkpoint ของโหมด streaming (default: calibration_checkpoint.json)')
+        parser.add_argument('--checkpoint-every', type=int, default=50,
+                            help='บันทึก checkpoint ทุกกี่ภาพ (default: 50)')
+        parser.add_argument('--bin-width', type=int, default=16,
+                            help='ความกว้างของ bin ใน histogram (pixels²) ความละเอียดของ threshold ในโหมด streaming (default: 16)')
+        parser.add_argument('--save-images', type=str, choices=SAVE_MODES, default='all',
+                            help='บันทึกภาพผลลัพธ์: none, failures (เฉพาะภาพที่ไม่พบกุ้ง), sampled หรือ all (default: all)')
+        parser.add_argument('--sample-rate', type=float, default=0.1,
+                            help='สัดส่วนภาพที่บันทึกเมื่อใช้ --save-images sampled (default: 0.1)')
+        parser.add_argument('--jpeg-quality', type=int, default=95,
+                            help='คุณภาพ JPEG ของภาพผลลัพธ์ 0-100 (default: 95)')
+        parser.add_argument('--thumbnail', type=int, default=None,
+                            help='ย่อภาพผลลัพธ์ให้ด้านที่ยาวที่สุดไม่เกินค่านี้ (pixels)')
+        parser.add_argument('--writer-threads', type=int, default=2,
+                            help='จำนวน thread สำหรับบันทึกภาพ (default: 2)')
+        parser.add_argument('--recursive', action='store_true',
+                            help='ค้นหาภาพในโฟลเดอร์ย่อยด้วย')
+        parser.add_argument('--manifest', type=str, default='dataset_manifest.json',
+                            help='ไฟล์ manifest รายการภาพ ใช้ซ้ำเมื่อโฟลเดอร์ไม่เปลี่ยน ("" = ไม่ใช้) (default: dataset_manifest.json)')
+        parser.add_argument('--inference-width', type=int, default=DEFAULT_INFERENCE_WIDTH,
+                            help=f'ความกว้างภาพเข้าโมเดล ต้องตรงกับระบบคัดแยก ({FAST_INFERENCE_WIDTH} = โหมดเร็ว) '
+                                 f'(default: {DEFAULT_INFERENCE_WIDTH})')
         
         args = parser.parse_args()
         
-        # เตรียมข้อมูลโฟลเดอร์
-        folders = {
-            'small': args.small,
-            'medium': args.medium,
-            'large': args.large
-        }
+        # เตรียมข้อมูลโฟลเดอร์ (ลำดับของ dict คือลำดับเกรดจากเล็กไปใหญ่)
+        if args.grade:
+            folders = {}
+            for item in args.grade:
+                name, separator, folder = item.partition('=')
+                if not separator or not name or not folder:
+                    parser.error(f'--grade ต้องอยู่ในรูป NAME=FOLDER: {item}')
+                if name in folders:
+                    parser.error(f'เกรด {name} ซ้ำ')
+                folders[name] = folder
+            if len(folders) < 2:
+                parser.error('ต้องมีอย่างน้อย 2 เกรด')
+        else:
+            folders = {
+                'small': args.small,
+                'medium': args.medium,
+                'large': args.large
+            }
         
         # สร้างและเริ่มตัวสอบเทียบ
-        calibrator = ShrimpSizeCalibrator(model_path=args.model, confidence=args.conf)
+        if args.objective == 'cost' and not args.cost_matrix:
+            parser.error('--objective cost ต้องระบุ --cost-matrix')
+        cost_matrix = parse_cost_matrix(args.cost_matrix) if args.cost_matrix else None
+        if args.inference_width < 64 or args.inference_width % 32:
+            parser.error('--inference-width ต้องเป็นผลคูณของ 32 และไม่น้อยกว่า 64')
+        
+        calibrator = ShrimpSizeCalibrator(
+            model_path=args.model,
+            confidence=args.conf,
+            config_path=args.config,
+            objective=args.objective,
+            cost_matrix=cost_matrix,
+            bootstrap=args.bootstrap,
+            streaming=args.streaming,
+            checkpoint_path=args.checkpoint,
+            checkpoint_every=args.checkpoint_every,
+            bin_width=args.bin_width,
+            resume=args.resume,
+            save_images=args.save_images,
+            sample_rate=args.sample_rate,
+            jpeg_quality=args.jpeg_quality,
+            thumbnail=args.thumbnail,
+            writer_threads=args.writer_threads,
+            manifest_path=args.manifest or None,
+            recursive=args.recursive,
+            grades=list(folders),
+            inference_width=args.inference_width
+        )
         calibrator.batch_process_images(folders)
     except Exception as e:
         print(f"\nเกิดข้อผิดพลาด: {e}")
\ No newline at end of file
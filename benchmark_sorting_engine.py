@@ -0,0 +1,139 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from sorting_engine import Detection, SortingEngine
+
+SHRIMP_PER_FRAME = (1, 10, 100)
+
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+FRAME_INTERVAL = 1 / 30
+SIZE_THRESHOLDS = {"small": 32519.3, "medium": 48045.8}
+SIZES = ("small", "medium", "large")
+
+
+def make_frames(num_shrimp, num_frames, seed=0):
+    """สร้างผลการตรวจจับจำลองที่กุ้งเคลื่อนที่ผ่านเฟรมและมี track ใหม่เข้ามาตลอด"""
+    rng = random.Random(seed)
+    next_id = 1
+
+    def new_shrimp(x):
+        nonlocal next_id
+        width = rng.uniform(150, 300)
+        height = rng.uniform(120, 220)
+        shrimp = {
+            "id": next_id,
+            "x": x,
+            "y": rng.uniform(0, FRAME_HEIGHT - height),
+            "w": width,
+            "h": height,
+            "speed": rng.uniform(8, 20),
+            "conf": rng.uniform(0.4, 0.99)
+        }
+        next_id += 1
+        return shrimp
+
+    shrimps = [new_shrimp(rng.uniform(-300, FRAME_WIDTH)) for _ in range(num_shrimp)]
+    frames = []
+    for _ in range(num_frames):
+        detections = []
+        for i, shrimp in enumerate(shrimps):
+            shrimp["x"] += shrimp["speed"]
+            if shrimp["x"] > FRAME_WIDTH:
+                # กุ้งออกจากเฟรมแล้ว ให้ตัวใหม่เข้ามาแทน
+                shrimp = new_shrimp(-shrimp["w"])
+                shrimps[i] = shrimp
+            box = (shrimp["x"], shrimp["y"], shrimp["x"] + shrimp["w"], shrimp["y"] + shrimp["h"])
+            detections.append(Detection(shrimp["id"], "shrimp", shrimp["conf"], box))
+        frames.append(detections)
+    return frames
+
+
+def bench_step(num_shrimp, num_frames=300, repeats=5):
+    """วัดเวลาที่ใช้ใน SortingEngine.step ต่อหนึ่งเฟรม (ไมโครวินาที)"""
+    frames = make_frames(num_shrimp, num_frames)
+    samples = []
+    for _ in range(repeats):
+        engine = SortingEngine(SIZE_THRESHOLDS, SIZES, FRAME_WIDTH, FRAME_HEIGHT)
+        timestamp = 0.0
+        for detections in frames:
+            start = time.perf_counter_ns()
+            engine.step(detections, timestamp)
+            samples.append(time.perf_counter_ns() - start)
+            timestamp += FRAME_INTERVAL
+
+    samples.sort()
+    return {
+        "shrimp_per_frame": num_shrimp,
+        "samples": len(samples),
+        "mean_us": statistics.fmean(samples) / 1000,
+        "median_us": samples[len(samples) // 2] / 1000,
+        "p95_us": samples[int(len(samples) * 0.95)] / 1000,
+        "max_us": samples[-1] / 1000
+    }
+
+
+def compare(results, baseline, tolerance):
+    """เทียบ median กับผลที่บันทึกไว้ คืนรายการกรณีที่ช้าลงเกิน tolerance"""
+    previous = {str(r["shrimp_per_frame"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(str(result["shrimp_per_frame"]))
+        if old is None:
+            continue
+        ratio = result["median_us"] / old["median_us"] if old["median_us"] > 0 else 1.0
+        result["baseline_median_us"] = old["median_us"]
+        result["ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark for SortingEngine.step')
+    parser.add_argument('--frames', type=int, default=300, help='Frames per run')
+    parser.add_argument('--repeats', type=int, default=5, help='Runs per case')
+    parser.add_argument('--save', type=str, help='Save results as a baseline JSON file')
+    parser.add_argument('--compare', type=str, help='Baseline JSON file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown of the median before it counts as a regression (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    results = [bench_step(n, args.frames, args.repeats) for n in SHRIMP_PER_FRAME]
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    print(f"SortingEngine.step ({args.frames} frames x {args.repeats} runs, Python {platform.python_version()})")
+    print(f"{'shrimp/frame':>12} {'median us':>10} {'p95 us':>10} {'max us':>10} {'vs baseline':>12}")
+    for result in results:
+        ratio = f"{result['ratio']:.2f}x" if "ratio" in result else "-"
+        print(f"{result['shrimp_per_frame']:>12} {result['median_us']:>10.1f} {result['p95_us']:>10.1f} "
+              f"{result['max_us']:>10.1f} {ratio:>12}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "results": results
+            }, f, indent=4)
+        print(f"Baseline saved to: {args.save}")
+
+    if regressions:
+        for result in regressions:
+            print(f"REGRESSION: {result['shrimp_per_frame']} shrimp/frame is {result['ratio']:.2f}x slower "
+                  f"than baseline ({result['baseline_median_us']:.1f} us -> {result['median_us']:.1f} us)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import datetime
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class _FrameRing:
+    """ring buffer ของเฟรมที่จองหน่วยความจำไว้ล่วงหน้าทั้งหมด"""
+
+    def __init__(self, num_slots, height, width):
+        self.frames = np.zeros((num_slots, height, width, 3), dtype=np.uint8)
+        self.timestamps = np.zeros(num_slots, dtype=np.float64)
+        self.next_slot = 0
+        self.filled = 0
+
+    def reset(self):
+        self.next_slot = 0
+        self.filled = 0
+
+    def ordered_slots(self):
+        """ลำดับ slot จากเฟรมเก่าที่สุดไปใหม่ที่สุด"""
+        num_slots = len(self.frames)
+        start = (self.next_slot - self.filled) % num_slots
+        return [(start + i) % num_slots for i in range(self.filled)]
+
+
+class BlackBoxRecorder:
+    """เก็บเฟรมล่าสุด (พร้อมกรอบที่วาดแล้ว) ไว้ในหน่วยความจำตลอดเวลา และบันทึกเป็นวิดีโอเมื่อมีเหตุการณ์
+
+    ใช้ ring buffer สองชุดที่จองไว้ล่วงหน้า เมื่อ trigger แล้วเก็บเฟรมต่ออีก post_seconds
+    จากนั้นสลับ buffer ให้ thread เบื้องหลังเขียนไฟล์ ส่วน loop หลักเก็บเฟรมต่อใน buffer อีกชุดทันที
+    """
+
+    def __init__(self, output_dir="blackbox", seconds=10.0, post_seconds=2.0, fps=15.0,
+                 frame_size=(640, 480), scale=0.5, cooldown=30.0):
+        self.output_dir = output_dir
+        self.fps = fps
+        self.post_frames = int(post_seconds * fps)
+        self.cooldown = cooldown
+        self.width = max(2, int(frame_size[0] * scale) // 2 * 2)
+        self.height = max(2, int(frame_size[1] * scale) // 2 * 2)
+
+        num_slots = max(1, int(seconds * fps))
+        self.active = _FrameRing(num_slots, self.height, self.width)
+        self.spare = _FrameRing(num_slots, self.height, self.width)
+        self.last_record_time = 0.0
+
+        self._lock = threading.Lock()
+        self._pending_reason = None
+        self._last_trigger_time = 0.0
+        self._post_remaining = None
+        self._dump_reason = None
+
+        self._dump_ready = threading.Event()  # มี buffer รอเขียน
+        self._spare_free = threading.Event()  # buffer สำรองว่าง (เขียนไฟล์เสร็จแล้ว)
+        self._spare_free.set()
+        self._dump_ring = None
+        self.running = True
+        self.clips_written = 0
+        self.triggers_skipped = 0
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.thread = threading.Thread(target=self._writer_loop, name="black_box")
+        self.thread.daemon = True
+        self.thread.start()
+        memory_mb = 2 * self.active.frames.nbytes / 1024 / 1024
+        print(f"Black box recorder: last {seconds:.0f} s at {fps:.0f} fps, "
+              f"{self.width}x{self.height}, {memory_mb:.0f} MiB preallocated")
+
+    def trigger(self, reason):
+        """แจ้งเหตุการณ์ (เรียกจาก thread ใดก็ได้) เหตุการณ์ซ้ำภายในช่วง cooldown จะถูกข้าม"""
+        with self._lock:
+            now = time.time()
+            if self._pending_reason is not None or self._post_remaining is not None:
+                return False
+            if now - self._last_trigger_time < self.cooldown:
+                self.triggers_skipped += 1
+                return False
+            self._last_trigger_time = now
+            self._pending_reason = reason
+        print(f"Black box triggered: {reason}")
+        return True
+
+    def record(self, frame, timestamp=None):
+        """เก็บเฟรมลง buffer (เรียกจาก loop หลักเท่านั้น) ไม่มีการจองหน่วยความจำใหม่ต่อเฟรม"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        if self._pending_reason is not None:
+            with self._lock:
+                self._dump_reason = self._pending_reason
+                self._pending_reason = None
+                self._post_remaining = self.post_frames
+
+        if timestamp - self.last_record_time < 1.0 / self.fps:
+            return
+        self.last_record_time = timestamp
+
+        ring = self.active
+        slot = ring.next_slot
+        if frame.shape[1] == self.width and frame.shape[0] == self.height:
+            np.copyto(ring.frames[slot], frame)
+        else:
+            cv2.resize(frame, (self.width, self.height), dst=ring.frames[slot], interpolation=cv2.INTER_AREA)
+        ring.timestamps[slot] = timestamp
+        ring.next_slot = (slot + 1) % len(ring.frames)
+        ring.filled = min(ring.filled + 1, len(ring.frames))
+
+        if self._post_remaining is not None:
+            self._post_remaining -= 1
+            if self._post_remaining <= 0:
+                self._hand_off()
+
+    def _hand_off(self):
+        """สลับ buffer ให้ writer thread (ถ้า buffer สำรองยังเขียนไม่เสร็จ จะข้ามคลิปนี้)"""
+        reason = self._dump_reason
+        with self._lock:
+            self._post_remaining = None
+            self._dump_reason = None
+        if not self._spare_free.is_set():
+            self.triggers_skipped += 1
+            print(f"Black box busy, skipped clip for: {reason}")
+            return
+        self._spare_free.clear()
+        self.active, self.spare = self.spare, self.active
+        self.active.reset()
+        self._dump_ring = (self.spare, reason)
+        self._dump_ready.set()
+
+    def _write_clip(self, ring, reason):
+        slots = ring.ordered_slots()
+        if not slots:
+            return
+        start = datetime.datetime.fromtimestamp(ring.timestamps[slots[0]]).strftime("%Y%m%d_%H%M%S")
+        safe_reason = "".join(c if c.isalnum() else "_" for c in reason)
+        filename = os.path.join(self.output_dir, f"blackbox_{start}_{safe_reason}.mp4")
+        writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (self.width, self.height))
+        try:
+            for slot in slots:
+                writer.write(ring.frames[slot])
+        finally:
+            writer.release()
+        self.clips_written += 1
+        print(f"Black box clip saved to: {filename} ({len(slots)} frames)")
+
+    def _writer_loop(self):
+        while self.running or self._dump_ready.is_set():
+            if not self._dump_ready.wait(timeout=0.5):
+                continue
+            self._dump_ready.clear()
+            ring, reason = self._dump_ring
+            try:
+                self._write_clip(ring, reason)
+            except Exception as e:
+                print(f"Error writing black box clip: {e}")
+            finally:
+                ring.reset()
+                self._spare_free.set()
+
+    def close(self):
+        """ถ้ามีเหตุการณ์ค้างอยู่ ให้บันทึกเฟรมที่มีทันที (ไม่รอเฟรมหลังเหตุการณ์) แล้วหยุด writer thread"""
+        with self._lock:
+            pending = self._pending_reason
+            self._pending_reason = None
+        if pending is not None or self._post_remaining is not None:
+            # รอคลิปก่อนหน้าเขียนเสร็จ เพื่อให้มี buffer ว่างสำหรับคลิปสุดท้าย
+            self._spare_free.wait(timeout=30.0)
+        if pending is not None:
+            self._dump_reason = pending
+            self._hand_off()
+        elif self._post_remaining is not None:
+            self._hand_off()
+        self.running = False
+        self.thread.join()
@@ -0,0 +1,242 @@
+import cv2
+import numpy as np
+
+from sorting_engine import Detection, box_area
+
+
+def _iou(a, b):
+    x1 = max(a[0], b[0])
+    y1 = max(a[1], b[1])
+    x2 = min(a[2], b[2])
+    y2 = min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = box_area(a) + box_area(b) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def yolo_boxes(results, names):
+    """กล่องจาก model.predict เป็น [(box, class_name, confidence)] (ไม่ต้องมี track id)"""
+    boxes = []
+    for result in results or []:
+        if result.boxes is None:
+            continue
+        for box, cls, conf in zip(result.boxes.xyxy.tolist(), result.boxes.cls.int().tolist(),
+                                  result.boxes.conf.tolist()):
+            boxes.append((tuple(box), names[cls], conf))
+    return boxes
+
+
+class BeltSegmenter:
+    """แยกกุ้งออกจากพื้นสายพานที่สีสม่ำเสมอ ด้วยความต่างจากภาพพื้นหลังและ cv2.findContours
+
+    ภาพพื้นหลังเริ่มจาก median ของ bootstrap_frames เฟรมแรก (เก็บทุก bootstrap_step เฟรม) กุ้งที่อยู่ในเฟรมแรก ๆ
+    จึงไม่ติดอยู่ในพื้นหลัง หลังจากนั้นปรับตามแสงด้วย learning_rate ในบริเวณที่เป็นสายพาน และด้วย
+    foreground_rate ที่ช้ากว่ามากในบริเวณที่เป็นวัตถุ สิ่งที่ค้างอยู่นิ่ง (เงา หรือรอยที่เหลือจากวัตถุที่ออกไปแล้ว)
+    จึงค่อย ๆ กลายเป็นพื้นหลัง ส่วนกุ้งที่วิ่งผ่านแทบไม่ถูกกลืนเข้าไป
+    """
+
+    def __init__(self, diff_threshold=30, min_area=2000, roi=None, learning_rate=0.02, kernel_size=5,
+                 foreground_rate=0.005, bootstrap_frames=9, bootstrap_step=5):
+        self.diff_threshold = diff_threshold
+        self.min_area = min_area
+        self.roi = roi  # (x1, y1, x2, y2) หรือ None = ทั้งเฟรม
+        self.learning_rate = learning_rate
+        self.foreground_rate = foreground_rate
+        self.bootstrap_frames = max(1, bootstrap_frames)
+        self.bootstrap_step = max(1, bootstrap_step)
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
+        self.background = None
+        self._samples = []
+        self._seen = 0
+
+    def _bootstrap(self, frame):
+        """เก็บเฟรมตัวอย่าง คืนค่า True เมื่อสร้างพื้นหลังจาก median ของตัวอย่างได้แล้ว"""
+        if self._samples and self._samples[0].shape != frame.shape:
+            self._samples = []
+            self._seen = 0
+        if self._seen % self.bootstrap_step == 0:
+            self._samples.append(frame.copy())
+        self._seen += 1
+        if len(self._samples) < self.bootstrap_frames:
+            return False
+        self.background = np.median(np.stack(self._samples), axis=0).astype(np.float32)
+        self._samples = []
+        self._seen = 0
+        return True
+
+    def segment(self, frame):
+        """คืนค่า [(พื้นที่ pixel ของ contour, กรอบ (x1, y1, x2, y2) ในพิกัดเฟรม)]"""
+        offset_x = offset_y = 0
+        if self.roi:
+            offset_x, offset_y, x2, y2 = self.roi
+            frame = frame[offset_y:y2, offset_x:x2]
+
+        if self.background is not None and self.background.shape != frame.shape:
+            self.background = None
+        if self.background is None and not self._bootstrap(frame):
+            return []  # ยังสร้างพื้นหลังไม่เสร็จ
+        background = cv2.convertScaleAbs(self.background)
+        diff = cv2.absdiff(frame, background).max(axis=2)
+        _, mask = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel)
+
+        blobs = []
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area < self.min_area:
+                continue
+            x, y, w, h = cv2.boundingRect(contour)
+            blobs.append((area, (x + offset_x, y + offset_y, x + w + offset_x, y + h + offset_y)))
+
+        # ปรับพื้นหลังส่วนที่เป็นสายพานตามปกติ (ขยาย mask ออกเล็กน้อยกันขอบกุ้งปนเข้าไป)
+        # ส่วนที่เป็นวัตถุปรับช้า ๆ เพื่อให้สิ่งที่ค้างนิ่งไม่ถูกนับเป็น blob ตลอดไป
+        foreground = cv2.dilate(mask, self.kernel, iterations=2)
+        cv2.accumulateWeighted(frame, self.background, self.learning_rate, mask=cv2.bitwise_not(foreground))
+        if self.foreground_rate > 0:
+            cv2.accumulateWeighted(frame, self.background, self.foreground_rate, mask=foreground)
+        return blobs
+
+
+class ContourMeasurement:
+    """วัดขนาดและติดตามกุ้งด้วย contour ทุกเฟรม และเรียกโมเดล YOLO เป็นระยะเพื่อยืนยันว่าเป็นกุ้ง
+
+    YOLO ทำงานทุก verify_every เฟรม หรือทันทีเมื่อมี blob กำกวม (พื้นที่ใกล้ threshold หรือใหญ่เกิน
+    กุ้งหนึ่งตัวซึ่งอาจเป็นกุ้งติดกัน) track จะถูกส่งให้ SortingEngine หลังจาก YOLO ยืนยันแล้วเท่านั้น
+    ในเฟรมที่ยืนยัน blob กำกวม จะใช้กรอบของ YOLO วัดขนาดแทน
+    ผลที่ได้คือรายการ Detection แบบเดียวกับเส้นทาง YOLO จึงใช้กับ SortingEngine ได้โดยตรง
+    """
+
+    def __init__(self, engine, verify_every=10, ambiguity=0.05, max_area=None, match_iou=0.3,
+                 max_missed=5, segmenter=None):
+        self.engine = engine  # ใช้ classify_area และ size_thresholds ล่าสุด
+        self.verify_every = max(1, verify_every)
+        self.ambiguity = ambiguity  # สัดส่วนรอบ threshold ที่ถือว่ากำกวม
+        self.max_area = max_area  # พื้นที่กรอบสูงสุดของกุ้งหนึ่งตัว (None = ไม่ตรวจ)
+        self.match_iou = match_iou
+        self.max_missed = max_missed
+        self.segmenter = segmenter or BeltSegmenter()
+
+        self.tracks = {}  # track_id -> ข้อมูล track
+        self.next_id = 1
+        self.frame_index = 0
+
+        # สถิติเทียบกับเส้นทาง YOLO
+        self.frames = 0
+        self.yolo_runs = 0
+        self.size_pairs = 0
+        self.size_agree = 0
+        self.blobs_confirmed = 0
+        self.blobs_rejected = 0
+        self.yolo_missed = 0  # กล่องของ YOLO ที่ไม่มี blob ตรงกัน
+        self.pixel_to_box = 0.0  # ผลรวมอัตราส่วนพื้นที่ pixel ต่อพื้นที่กรอบ
+
+    def _is_ambiguous(self, box):
+        area = box_area(box)
+        if self.max_area and area > self.max_area:
+            return True
+        for threshold in self.engine.size_thresholds.values():
+            if abs(area - threshold) <= threshold * self.ambiguity:
+                return True
+        return False
+
+    def _update_tracks(self, blobs):
+        """จับคู่ blob กับ track เดิมด้วย IoU (มากไปน้อย) blob ที่เหลือเป็น track ใหม่"""
+        pairs = []
+        for track_id, track in self.tracks.items():
+            for index, (_, box) in enumerate(blobs):
+                iou = _iou(track["box"], box)
+                if iou >= self.match_iou:
+                    pairs.append((iou, track_id, index))
+        pairs.sort(reverse=True)
+
+        assigned = {}
+        used_tracks = set()
+        for _, track_id, index in pairs:
+            if track_id in used_tracks or index in assigned:
+                continue
+            used_tracks.add(track_id)
+            assigned[index] = track_id
+
+        for index, (area, box) in enumerate(blobs):
+            track_id = assigned.get(index)
+            if track_id is None:
+                track_id = self.next_id
+                self.next_id += 1
+                self.tracks[track_id] = {"confirmed": None, "class_name": None, "confidence": 0.0}
+            track = self.tracks[track_id]
+            track.update(box=box, pixel_area=area, missed=0, seen=self.frame_index, yolo_box=None)
+
+        for track_id in list(self.tracks):
+            track = self.tracks[track_id]
+            if track["seen"] != self.frame_index:
+                track["missed"] += 1
+                if track["missed"] > self.max_missed:
+                    del self.tracks[track_id]
+
+    def _verify(self, frame, model, confidence, geometry=None):
+        """รัน YOLO หนึ่งครั้ง ยืนยัน/ปฏิเสธ track ที่เห็นในเฟรมนี้ และเก็บสถิติความตรงกัน"""
+        self.yolo_runs += 1
+        if geometry is None:
+            boxes = yolo_boxes(model.predict(frame, conf=confidence, verbose=False), model.names)
+        else:
+            # ย่อภาพตาม InferenceGeometry แล้วแปลงกรอบกลับเป็นพิกัดเฟรมเพื่อเทียบกับ blob
+            boxes = [(geometry.scale_box(box), class_name, conf) for box, class_name, conf
+                     in yolo_boxes(geometry.predict(model, frame, conf=confidence, verbose=False), model.names)]
+        visible = [track_id for track_id, track in self.tracks.items() if track["seen"] == self.frame_index]
+
+        matched_boxes = set()
+        for track_id in visible:
+            track = self.tracks[track_id]
+            best = None
+            best_iou = self.match_iou
+            for index, (box, _, _) in enumerate(boxes):
+                iou = _iou(track["box"], box)
+                if index not in matched_boxes and iou >= best_iou:
+                    best, best_iou = index, iou
+            if best is None:
+                track["confirmed"] = False
+                self.blobs_rejected += 1
+                continue
+
+            matched_boxes.add(best)
+            box, class_name, conf = boxes[best]
+            track.update(confirmed=True, class_name=class_name, confidence=conf, yolo_box=box)
+            self.blobs_confirmed += 1
+            self.size_pairs += 1
+            if self.engine.classify_area(box_area(track["box"])) == self.engine.classify_area(box_area(box)):
+                self.size_agree += 1
+            if box_area(track["box"]) > 0:
+                self.pixel_to_box += track["pixel_area"] / box_area(track["box"])
+        self.yolo_missed += len(boxes) - len(matched_boxes)
+
+    def measure(self, frame, model, confidence, geometry=None):
+        """วัดกุ้งในเฟรม คืนค่ารายการ Detection ของ track ที่ YOLO ยืนยันแล้ว (geometry = InferenceGeometry ของ YOLO)"""
+        self.frame_index += 1
+        self.frames += 1
+        self._update_tracks(self.segmenter.segment(frame))
+
+        visible = [track for track in self.tracks.values() if track["seen"] == self.frame_index]
+        periodic = self.frame_index % self.verify_every == 0
+        urgent = any(track["confirmed"] is None and self._is_ambiguous(track["box"]) for track in visible)
+        if visible and (periodic or urgent):
+            self._verify(frame, model, confidence, geometry)
+
+        detections = []
+        for track_id, track in self.tracks.items():
+            if track["seen"] != self.frame_index or not track["confirmed"]:
+                continue
+            box = track["yolo_box"] if track["yolo_box"] and self._is_ambiguous(track["box"]) else track["box"]
+            detections.append(Detection(track_id, track["class_name"], track["confidence"], box))
+        return detections
+
+    def report(self):
+        yolo_share = self.yolo_runs / self.frames if self.frames else 0.0
+        agreement = self.size_agree / self.size_pairs if self.size_pairs else 0.0
+        fill = self.pixel_to_box / self.size_pairs if self.size_pairs else 0.0
+        print(f"Contour measurement: {self.frames} frames, YOLO ran on {self.yolo_runs} ({yolo_share:.1%})")
+        print(f"  Size agreement with YOLO boxes: {agreement:.1%} of {self.size_pairs} verified shrimp")
+        print(f"  Blobs confirmed: {self.blobs_confirmed}, rejected: {self.blobs_rejected}, "
+              f"YOLO shrimp without a blob: {self.yolo_missed}")
+        print(f"  Mean shrimp pixel area / box area: {fill:.2f}")
@@ -0,0 +1,173 @@
+import json
+import os
+import queue
+import threading
+import time
+
+
+class CountJournal:
+    """บันทึกจำนวนกุ้งแบบ append-only ด้วย thread เบื้องหลัง และ fsync เป็นชุดตามช่วงเวลา
+
+    ไฟล์ journal เก็บทีละบรรทัด "<seq> <time> <size>" ส่วนไฟล์ checkpoint (JSON)
+    เก็บยอดรวมถึง seq ล่าสุด เมื่อ checkpoint เสร็จแล้ว journal จะถูกตัดทิ้งเพื่อให้ไฟล์เล็กเสมอ
+    """
+
+    def __init__(self, path, sizes, fsync_interval=1.0, checkpoint_every=1000):
+        self.path = path
+        self.checkpoint_path = f"{path}.checkpoint"
+        self.sizes = tuple(sizes)
+        self.fsync_interval = fsync_interval
+        self.checkpoint_every = checkpoint_every
+
+        self.pending = queue.SimpleQueue()  # hot path แค่ put ลง queue
+        self.running = False
+        self.thread = None
+        self.file = None
+
+        # สถานะที่เขียนลงดิสก์แล้ว (ใช้เฉพาะใน writer thread)
+        self.seq = 0
+        self.counts = {size: 0 for size in self.sizes}
+        self.records_since_checkpoint = 0
+
+        # สถิติต้นทุนของความทนทาน
+        self.records_written = 0
+        self.fsync_count = 0
+        self.fsync_time = 0.0
+
+    def recover(self):
+        """อ่าน checkpoint และ journal ที่ค้างอยู่ คืนค่ายอดนับถ้าครั้งก่อนปิดไม่เรียบร้อย ไม่เช่นนั้นคืน None"""
+        checkpoint = None
+        if os.path.exists(self.checkpoint_path):
+            try:
+                with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                    checkpoint = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Cannot read count checkpoint {self.checkpoint_path}: {e}")
+
+        if checkpoint is not None and checkpoint.get("clean", False):
+            # ครั้งก่อนปิดระบบตามปกติ เริ่มกะใหม่จากศูนย์
+            return None
+
+        counts = {size: 0 for size in self.sizes}
+        last_seq = 0
+        if checkpoint is not None:
+            last_seq = checkpoint.get("seq", 0)
+            for size, count in checkpoint.get("counts", {}).items():
+                if size in counts:
+                    counts[size] = int(count)
+
+        replayed = 0
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    # บรรทัดสุดท้ายอาจเขียนไม่ครบถ้าไฟดับ ให้ข้ามไป
+                    if not line.endswith("\n"):
+                        break
+                    parts = line.split()
+                    if len(parts) != 3:
+                        continue
+                    try:
+                        seq = int(parts[0])
+                    except ValueError:
+                        continue
+                    size = parts[2]
+                    if seq <= last_seq or size not in counts:
+                        continue
+                    counts[size] += 1
+                    last_seq = seq
+                    replayed += 1
+
+        if checkpoint is None and replayed == 0:
+            return None
+
+        self.seq = last_seq
+        print(f"Recovered shrimp counts from {self.path} ({replayed} journal records replayed)")
+        return counts
+
+    def start(self, counts):
+        """เริ่ม writer thread โดยใช้ยอดนับเริ่มต้นที่กำหนด (จาก recover หรือศูนย์)"""
+        self.counts = {size: counts.get(size, 0) for size in self.sizes}
+        self._write_checkpoint(clean=False)
+        self.file = open(self.path, "w", encoding="utf-8")
+
+        self.running = True
+        self.thread = threading.Thread(target=self._writer_loop, name="count_journal")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def record(self, shrimp_size):
+        """บันทึกกุ้งหนึ่งตัว (เรียกจาก hot path ไม่มีการเขียนไฟล์ที่นี่)"""
+        self.pending.put((time.time(), shrimp_size))
+
+    def _write_checkpoint(self, clean):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "seq": self.seq,
+                "counts": self.counts,
+                "clean": clean,
+                "time": time.time()
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _drain(self):
+        """เขียนรายการที่รออยู่ทั้งหมดแล้ว fsync ครั้งเดียว"""
+        lines = []
+        while True:
+            try:
+                timestamp, shrimp_size = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            self.seq += 1
+            self.counts[shrimp_size] = self.counts.get(shrimp_size, 0) + 1
+            lines.append(f"{self.seq} {timestamp:.3f} {shrimp_size}\n")
+
+        if not lines:
+            return
+
+        self.file.write("".join(lines))
+        self.file.flush()
+        start = time.perf_counter()
+        os.fsync(self.file.fileno())
+        self.fsync_time += time.perf_counter() - start
+        self.fsync_count += 1
+        self.records_written += len(lines)
+        self.records_since_checkpoint += len(lines)
+
+        # ย่อ journal ด้วย checkpoint เมื่อมีรายการสะสมมากพอ
+        if self.records_since_checkpoint >= self.checkpoint_every:
+            self._write_checkpoint(clean=False)
+            self.file.close()
+            self.file = open(self.path, "w", encoding="utf-8")
+            self.records_since_checkpoint = 0
+
+    def _writer_loop(self):
+        while self.running:
+            time.sleep(self.fsync_interval)
+            try:
+                self._drain()
+            except Exception as e:
+                print(f"Error writing count journal: {e}")
+
+    def close(self):
+        """เขียนรายการที่เหลือ แล้วบันทึก checkpoint ว่าปิดระบบเรียบร้อย"""
+        if not self.running:
+            return
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=self.fsync_interval + 1.0)
+        try:
+            self._drain()
+            self._write_checkpoint(clean=True)
+            self.file.close()
+            open(self.path, "w").close()
+        except Exception as e:
+            print(f"Error closing count journal: {e}")
+
+        if self.records_written:
+            avg_fsync_ms = self.fsync_time / self.fsync_count * 1000
+            per_record_us = self.fsync_time / self.records_written * 1e6
+            print(f"Count journal: {self.records_written} records, {self.fsync_count} fsyncs "
+                  f"(avg {avg_fsync_ms:.2f} ms, {per_record_us:.1f} us per shrimp)")
@@ -0,0 +1,262 @@
+import argparse
+import datetime
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+# หนึ่งรายการใน index: เวลา, ตำแหน่งและความยาวของ JPEG ใน pack, track id, พื้นที่, ขนาด, กรอบ (x1, y1, x2, y2), ความเชื่อมั่น
+_INDEX = struct.Struct("<dQIiIB3x5f")
+
+CropRecord = namedtuple("CropRecord", [
+    "timestamp", "shrimp_size", "track_id", "confidence", "area", "box", "jpeg"
+])
+
+
+def _segment_paths(directory, seq):
+    base = os.path.join(directory, f"crops_{seq:06d}")
+    return f"{base}.pack", f"{base}.idx"
+
+
+def _list_segments(directory):
+    """หมายเลข segment ที่มีอยู่ เรียงจากเก่าไปใหม่"""
+    segments = []
+    if not os.path.isdir(directory):
+        return segments
+    for name in os.listdir(directory):
+        if name.startswith("crops_") and name.endswith(".idx"):
+            try:
+                segments.append(int(name[6:-4]))
+            except ValueError:
+                continue
+    return sorted(segments)
+
+
+class CropArchiveWriter:
+    """เก็บภาพ crop ของกุ้งแต่ละตัวลงไฟล์ pack แบบ append-only ด้วย thread เบื้องหลัง
+
+    แต่ละ segment มีไฟล์ .pack (JPEG ต่อกัน) และ .idx (รายการขนาดคงที่ชี้ตำแหน่งใน pack)
+    index ถูกเขียนหลังข้อมูลเสมอ ถ้าไฟดับระหว่างเขียน ข้อมูลที่ไม่มี index จะถูกมองข้าม
+    เมื่อพื้นที่รวมเกิน quota จะลบ segment ที่เก่าที่สุดก่อน
+    """
+
+    def __init__(self, directory, sizes, quota_bytes=2 * 1024 ** 3, segment_bytes=64 * 1024 ** 2,
+                 jpeg_quality=90, padding=8, max_queue=64):
+        self.directory = directory
+        self.sizes = list(sizes)
+        self.quota_bytes = quota_bytes
+        self.segment_bytes = min(segment_bytes, max(1, quota_bytes // 4))
+        self.jpeg_quality = jpeg_quality
+        self.padding = padding
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self.evicted_segments = 0
+        self.thread = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._write_meta()
+        self.segments = _list_segments(directory)
+        self.total_bytes = sum(self._segment_bytes(seq) for seq in self.segments)
+        self.pack = None
+        self.index = None
+        self.segment_seq = self.segments[-1] if self.segments else 0
+        self.pack_offset = 0
+
+    def _write_meta(self):
+        meta_path = os.path.join(self.directory, "meta.json")
+        sizes = self.sizes
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                known = json.load(f).get("sizes", [])
+            # เพิ่มชื่อขนาดใหม่ต่อท้าย รหัสของขนาดเดิมจึงไม่เปลี่ยน
+            sizes = known + [size for size in self.sizes if size not in known]
+        self.size_codes = {size: code for code, size in enumerate(sizes)}
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"sizes": sizes, "index_format": _INDEX.format}, f)
+        os.replace(tmp_path, meta_path)
+
+    def _segment_bytes(self, seq):
+        total = 0
+        for path in _segment_paths(self.directory, seq):
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def start(self):
+        self.thread = threading.Thread(target=self._writer_loop, name="crop_archive")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, frame, box, shrimp_size, track_id, confidence, area, timestamp):
+        """ส่ง crop ของกุ้งหนึ่งตัว (ตัดและคัดลอกเฉพาะส่วนเล็ก ๆ ที่นี่ การ encode ทำใน thread เบื้องหลัง)"""
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = map(int, box)
+        x1 = max(0, x1 - self.padding)
+        y1 = max(0, y1 - self.padding)
+        x2 = min(width, x2 + self.padding)
+        y2 = min(height, y2 + self.padding)
+        if x2 <= x1 or y2 <= y1:
+            return False
+        crop = frame[y1:y2, x1:x2].copy()
+        try:
+            self.queue.put_nowait((crop, box, shrimp_size, track_id, confidence, area, timestamp))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _open_segment(self):
+        self._close_segment()
+        self.segment_seq += 1
+        pack_path, index_path = _segment_paths(self.directory, self.segment_seq)
+        self.pack = open(pack_path, "ab")
+        self.index = open(index_path, "ab")
+        self.pack_offset = 0
+        self.segments.append(self.segment_seq)
+
+    def _close_segment(self):
+        if self.pack:
+            self.pack.close()
+            self.index.close()
+            self.pack = None
+            self.index = None
+
+    def _evict(self):
+        """ลบ segment เก่าที่สุดจนพื้นที่รวมไม่เกิน quota (ไม่ลบ segment ที่กำลังเขียน)"""
+        while self.total_bytes > self.quota_bytes and len(self.segments) > 1:
+            seq = self.segments.pop(0)
+            size = self._segment_bytes(seq)
+            for path in _segment_paths(self.directory, seq):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.total_bytes -= size
+            self.evicted_segments += 1
+
+    def _write(self, item):
+        crop, box, shrimp_size, track_id, confidence, area, timestamp = item
+        ok, encoded = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return
+        data = encoded.tobytes()
+
+        if self.pack is None or self.pack_offset + len(data) > self.segment_bytes:
+            self._open_segment()
+
+        self.pack.write(data)
+        self.pack.flush()
+        x1, y1, x2, y2 = box
+        self.index.write(_INDEX.pack(timestamp, self.pack_offset, len(data), int(track_id), int(area),
+                                     self.size_codes.get(shrimp_size, 255), x1, y1, x2, y2, confidence))
+        self.index.flush()
+        self.pack_offset += len(data)
+        self.total_bytes += len(data) + _INDEX.size
+        self.written += 1
+        self._evict()
+
+    def _writer_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                self._write(item)
+            except Exception as e:
+                print(f"Error writing crop archive: {e}")
+
+    def close(self):
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self._close_segment()
+        print(f"Crop archive: {self.written} crops written, {self.dropped} dropped, "
+              f"{self.evicted_segments} old segments evicted, {self.total_bytes / 1024 ** 2:.1f} MiB on disk")
+
+
+class CropArchiveReader:
+    """อ่านภาพ crop จาก archive ตามช่วงเวลาหรือขนาดกุ้ง"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            self.sizes = json.load(f)["sizes"]
+
+    def iter_crops(self, start=None, end=None, sizes=None):
+        """วนอ่าน CropRecord ที่เวลาอยู่ใน [start, end) และขนาดอยู่ใน sizes (None = ทั้งหมด)"""
+        codes = None if sizes is None else {self.sizes.index(size) for size in sizes if size in self.sizes}
+        for seq in _list_segments(self.directory):
+            pack_path, index_path = _segment_paths(self.directory, seq)
+            try:
+                with open(index_path, "rb") as f:
+                    index_data = f.read()
+                pack = open(pack_path, "rb")
+            except OSError:
+                continue  # segment อาจถูกลบระหว่างอ่าน
+
+            with pack:
+                pack_size = os.fstat(pack.fileno()).st_size
+                usable = len(index_data) - len(index_data) % _INDEX.size
+                for (timestamp, offset, length, track_id, area, code,
+                     x1, y1, x2, y2, confidence) in _INDEX.iter_unpack(index_data[:usable]):
+                    if start is not None and timestamp < start:
+                        continue
+                    if end is not None and timestamp >= end:
+                        break  # index ในแต่ละ segment เรียงตามเวลา
+                    if codes is not None and code not in codes:
+                        continue
+                    if offset + length > pack_size:
+                        break
+                    pack.seek(offset)
+                    shrimp_size = self.sizes[code] if code < len(self.sizes) else "unknown"
+                    yield CropRecord(timestamp, shrimp_size, track_id, confidence, area,
+                                     (x1, y1, x2, y2), pack.read(length))
+
+
+def _parse_time(text):
+    if text is None:
+        return None
+    return datetime.datetime.fromisoformat(text).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List or export shrimp crops from a crop archive')
+    parser.add_argument('archive', help='Crop archive directory')
+    parser.add_argument('--since', type=str, default=None, help='Start time, e.g. "2025-01-01 08:00"')
+    parser.add_argument('--until', type=str, default=None, help='End time (exclusive)')
+    parser.add_argument('--size', type=str, action='append', default=None,
+                        help='Size class to include (repeatable), default all')
+    parser.add_argument('--export', type=str, default=None, help='Write matching crops as JPEG files here')
+    args = parser.parse_args()
+
+    reader = CropArchiveReader(args.archive)
+    if args.export:
+        os.makedirs(args.export, exist_ok=True)
+
+    counts = {}
+    for record in reader.iter_crops(_parse_time(args.since), _parse_time(args.until), args.size):
+        counts[record.shrimp_size] = counts.get(record.shrimp_size, 0) + 1
+        if args.export:
+            label = time.strftime("%Y%m%d_%H%M%S", time.localtime(record.timestamp))
+            filename = f"{label}_{int(record.timestamp * 1000) % 1000:03d}_{record.shrimp_size}_{record.track_id}.jpg"
+            with open(os.path.join(args.export, filename), "wb") as f:
+                f.write(record.jpeg)
+
+    for size, count in sorted(counts.items()):
+        print(f"{size}: {count}")
+    print(f"total: {sum(counts.values())}")
+
+
+if __name__ == "__main__":
+    main()
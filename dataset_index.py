@@ -0,0 +1,102 @@
+import json
+import os
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+MANIFEST_VERSION = 2  # 2: ไฟล์เก็บเฉพาะ (device, inode)
+
+
+class DatasetIndex:
+    """หาไฟล์ภาพในโฟลเดอร์ด้วย os.scandir รอบเดียว และเก็บ manifest ไว้ใช้ซ้ำ
+
+    manifest เก็บรายชื่อไฟล์ (พร้อม device, inode ไว้กันไฟล์เดียวกันถูกนับซ้ำ) ของแต่ละโฟลเดอร์และ mtime ของโฟลเดอร์
+    ถ้า mtime ของโฟลเดอร์ไม่เปลี่ยน (ไม่มีไฟล์เพิ่ม/ลบ/เปลี่ยนชื่อ) จะใช้รายการเดิมโดยไม่ต้องอ่านโฟลเดอร์ใหม่
+    ไฟล์ที่ถูกเขียนทับในที่เดิมไม่ต้องอ่านรายการใหม่ เพราะเนื้อภาพอ่านจากดิสก์ทุกครั้งอยู่แล้ว
+    """
+
+    def __init__(self, manifest_path=None, extensions=IMAGE_EXTENSIONS):
+        self.manifest_path = manifest_path
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.directories = {}
+        self.seen = set()  # ไฟล์ที่ส่งออกไปแล้วในการรันนี้ (กันไฟล์เดียวกันถูกนับซ้ำ)
+        self.dirs_scanned = 0
+        self.dirs_cached = 0
+        self.changed = False
+
+        if manifest_path and os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION and tuple(data.get("extensions", ())) == self.extensions:
+                    self.directories = data.get("directories", {})
+            except (OSError, ValueError) as e:
+                print(f"Cannot read dataset manifest {manifest_path}: {e}")
+
+    def _scan_directory(self, path, mtime_ns):
+        """อ่านรายการในโฟลเดอร์หนึ่งครั้งด้วย scandir (ได้ข้อมูล stat มาพร้อมกัน)"""
+        files = {}
+        subdirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        subdirs.append(entry.name)
+                    elif entry.is_file() and entry.name.lower().endswith(self.extensions):
+                        stat = entry.stat()
+                        files[entry.name] = [stat.st_dev, stat.st_ino]
+                except OSError:
+                    continue
+        self.dirs_scanned += 1
+        self.changed = True
+        record = {"mtime": mtime_ns, "files": files, "subdirs": sorted(subdirs)}
+        self.directories[path] = record
+        return record
+
+    def _directory(self, path):
+        mtime_ns = os.stat(path).st_mtime_ns
+        record = self.directories.get(path)
+        if record is not None and record["mtime"] == mtime_ns:
+            self.dirs_cached += 1
+            return record
+        return self._scan_directory(path, mtime_ns)
+
+    def _file_key(self, path, info):
+        # ใช้ (device, inode) ถ้ามี ไม่เช่นนั้นใช้ path แบบไม่สนตัวพิมพ์ใหญ่เล็กบนระบบที่เป็นเช่นนั้น
+        dev, ino = info
+        if ino:
+            return (dev, ino)
+        return os.path.normcase(path)
+
+    def list_images(self, folder, recursive=False):
+        """รายการไฟล์ภาพในโฟลเดอร์ เรียงตามชื่อ ไฟล์ที่เคยส่งออกไปแล้วจะไม่ถูกส่งซ้ำ"""
+        images = []
+        pending = [os.path.abspath(folder)]
+        while pending:
+            path = pending.pop()
+            try:
+                record = self._directory(path)
+            except OSError as e:
+                print(f"Cannot read folder {path}: {e}")
+                continue
+
+            for name in sorted(record["files"]):
+                file_path = os.path.join(path, name)
+                key = self._file_key(file_path, record["files"][name])
+                if key in self.seen:
+                    continue
+                self.seen.add(key)
+                images.append(file_path)
+
+            if recursive:
+                pending.extend(os.path.join(path, name) for name in reversed(record["subdirs"]))
+        return images
+
+    def save(self):
+        """บันทึก manifest แบบ atomic (เฉพาะเมื่อมีโฟลเดอร์ที่ถูกอ่านใหม่)"""
+        if not self.manifest_path or not self.changed:
+            return
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "extensions": list(self.extensions),
+                       "directories": self.directories}, f)
+        os.replace(tmp_path, self.manifest_path)
+        self.changed = False
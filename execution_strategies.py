@@ -0,0 +1,607 @@
+import asyncio
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from resource_planner import pin_current_thread, set_inference_threads
+from shrimp_logging import get_logger
+
+log = get_logger("strategy")
+
+STRATEGIES = ("threaded", "sync", "process", "asyncio")
+
+
+class StrategyStats:
+    """จำนวนเฟรมและเวลาแฝง (ตั้งแต่ได้เฟรมจากกล้องจนประมวลผลเสร็จ) ของ strategy หนึ่ง"""
+
+    def __init__(self, max_samples=10000):
+        self.submitted = 0
+        self.skipped = 0  # เฟรมที่ไม่ได้ตรวจจับ (ยังไม่ถึง detection_interval, คิวเต็ม หรือเก่าเกินจนถูกทิ้ง)
+        self.processed = 0
+        self.latencies = deque(maxlen=max_samples)
+        self.start_time = None
+        self.last_time = None  # เวลาที่ประมวลผลเฟรมล่าสุดเสร็จ
+        self.listener = None  # callable รับเวลาแฝงของทุกเฟรม (เช่น TelemetryClient.record_latency)
+        self.lock = threading.Lock()
+
+    def record(self, capture_time):
+        now = time.time()
+        latency = now - capture_time
+        with self.lock:
+            self.last_time = now
+            self.processed += 1
+            self.latencies.append(latency)
+        if self.listener:
+            self.listener(latency)
+
+    def summary(self):
+        with self.lock:
+            elapsed = self.last_time - self.start_time if self.start_time and self.last_time else 0.0
+            latencies = sorted(self.latencies)
+            processed = self.processed
+
+        def percentile(fraction):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+        mean = sum(latencies) / len(latencies) if latencies else 0.0
+        variance = sum((value - mean) ** 2 for value in latencies) / len(latencies) if latencies else 0.0
+        return {
+            "submitted": self.submitted,
+            "skipped": self.skipped,
+            "processed": processed,
+            "elapsed": elapsed,
+            "throughput_fps": processed / elapsed if elapsed > 0 else 0.0,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+            "latency_max_ms": latencies[-1] * 1000 if latencies else 0.0,
+            "latency_std_ms": variance ** 0.5 * 1000
+        }
+
+
+class _Strategy:
+    """ส่วนที่ทุก strategy ใช้ร่วมกัน การตรวจจับและการคัดแยกเรียกผ่าน sorter.detect() และ sorter.handle_detections()"""
+
+    main_stages = ("capture",)  # ขั้นตอนที่ loop หลักทำ (ใช้ผูก core ด้วย ResourcePlanner)
+    owns_main_loop = False  # True = strategy รับ/แสดงเฟรมเอง (run()) แทน loop หลักของ sorter
+
+    def __init__(self, sorter):
+        self.sorter = sorter
+        self.stats = StrategyStats()
+        self.last_detection_time = 0
+
+    def start(self):
+        self.stats.start_time = time.time()
+
+    def _due(self, capture_time):
+        """ถึงเวลาตรวจจับเฟรมถัดไปหรือยัง (ตาม detection_interval)"""
+        if capture_time - self.last_detection_time < self.sorter.detection_interval:
+            self.stats.skipped += 1
+            return False
+        return True
+
+    def _fresh(self, capture_time):
+        """เฟรมยังใหม่พอจะตรวจจับหรือไม่ (ตาม max_frame_age.inference) เฟรมที่เก่าเกินนับเป็น skipped"""
+        if self.sorter.frame_is_fresh(capture_time):
+            return True
+        self.stats.skipped += 1
+        return False
+
+    def actuate(self, shrimp_size):
+        """สั่ง servo หนึ่งรอบ ค่าเริ่มต้นคือ thread ละหนึ่งรอบ (sorter.move_servo)"""
+        thread = threading.Thread(
+            target=self.sorter.move_servo,
+            args=(shrimp_size,),
+            name=f"move_servo_{shrimp_size}"
+        )
+        thread.start()
+
+    def stop(self):
+        pass
+
+
+class SyncStrategy(_Strategy):
+    """ตรวจจับและคัดแยกใน loop หลักทันที (ไม่มีคิวและ thread เพิ่ม) หน้าจอจะช้าลงตามเวลาของโมเดล"""
+
+    main_stages = ("capture", "inference")
+
+    def submit(self, frame, capture_time):
+        self.stats.submitted += 1
+        if not self._due(capture_time):
+            return
+        self.last_detection_time = capture_time
+        if not self._fresh(capture_time):
+            return
+        detections = self.sorter.detect(frame)
+        self.sorter.handle_detections(frame, detections, capture_time)
+        self.stats.record(capture_time)
+
+
+class ThreadedStrategy(_Strategy):
+    """thread ตรวจจับและ thread ประมวลผลแยกจาก loop หลัก เชื่อมกันด้วยคิวขนาดเล็ก"""
+
+    def __init__(self, sorter):
+        super().__init__(sorter)
+        self.frame_queue = queue.Queue(maxsize=2)
+        self.processed_frame_queue = queue.Queue(maxsize=2)  # queue สำหรับเฟรมที่ตรวจจับเสร็จแล้ว
+        self.detection_thread = None
+        self.processing_thread = None
+
+    def start(self):
+        super().start()
+        self.detection_thread = threading.Thread(target=self.detection_loop, name="detection_loop")
+        self.detection_thread.daemon = True  # ให้ thread ปิดเมื่อโปรแกรมหลักปิด
+        self.detection_thread.start()
+
+        self.processing_thread = threading.Thread(target=self.processing_loop, name="processing_loop")
+        self.processing_thread.daemon = True
+        self.processing_thread.start()
+
+    def submit(self, frame, capture_time):
+        self.stats.submitted += 1
+        # ใส่เฟรมเข้า queue สำหรับการตรวจจับ โดยไม่รอถ้า queue เต็ม
+        if self.frame_queue.full():
+            self.stats.skipped += 1
+            return
+        self.frame_queue.put((frame.copy(), capture_time), block=False)
+
+    def detection_loop(self):
+        """Thread แยกสำหรับการตรวจจับ object"""
+        with self.sorter.resources.stage("inference"):
+            self._detection_loop()
+
+    def _detection_loop(self):
+        while self.sorter.running:
+            try:
+                if self.frame_queue.empty():
+                    time.sleep(0.01)
+                    continue
+
+                current_time = time.time()
+                if current_time - self.last_detection_time < self.sorter.detection_interval:
+                    time.sleep(0.005)  # ลดเวลารอลงเพื่อตอบสนองเร็วขึ้น
+                    continue
+
+                # ดึงเฟรมล่าสุดจาก queue
+                frame, capture_time = self.frame_queue.get(timeout=0.5)
+                # เฟรมที่รอในคิวนานเกินไป กุ้งในเฟรมอาจผ่านประตูไปแล้ว ไม่ต้องเสียเวลาตรวจจับ
+                if not self._fresh(capture_time):
+                    continue
+                detections = self.sorter.detect(frame)
+
+                # ใส่ผลลัพธ์ลงใน queue สำหรับการประมวลผลต่อไป
+                self.processed_frame_queue.put((frame, detections, capture_time))
+                self.last_detection_time = current_time
+
+            except queue.Empty:
+                continue
+            except Exception as e:
+                log.error("Detection error: %s", e)
+
+    def processing_loop(self):
+        """Thread แยกสำหรับการประมวลผลหลังจากตรวจจับวัตถุเสร็จ"""
+        with self.sorter.resources.stage("actuation"):
+            self._processing_loop()
+
+    def _processing_loop(self):
+        while self.sorter.running:
+            try:
+                if self.processed_frame_queue.empty():
+                    time.sleep(0.01)
+                    continue
+
+                frame, detections, capture_time = self.processed_frame_queue.get(timeout=0.5)
+                self.sorter.handle_detections(frame, detections, capture_time)
+                self.stats.record(capture_time)
+
+            except queue.Empty:
+                continue
+            except Exception as e:
+                log.error("Processing error: %s", e)
+
+    def stop(self):
+        # รอให้ threads หยุดทำงาน (sorter.running ถูกตั้งเป็น False แล้ว)
+        if self.detection_thread:
+            self.detection_thread.join(timeout=1.0)
+        if self.processing_thread:
+            self.processing_thread.join(timeout=1.0)
+
+
+def _detector_worker(settings, shm_name, num_slots, frame_shape, free_slots, requests, results):
+    """Process ตรวจจับ: โหลดโมเดลเอง อ่านเฟรมจาก shared memory และส่งรายการ Detection กลับ"""
+    from contour_measure import BeltSegmenter, ContourMeasurement
+    from inference_geometry import InferenceGeometry
+    from sorting_engine import SortingEngine, detections_from_results
+    from startup import load_model, warm_up_model
+
+    # process ลูกได้ core ของ thread ที่สร้าง (loop หลัก) จึงต้องผูกกับ core ของ inference เอง
+    pin_current_thread(set(settings["inference_cpus"]))
+    set_inference_threads(settings["inference_threads"])
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((num_slots,) + frame_shape, dtype=np.uint8, buffer=shm.buf)
+    height, width = frame_shape[:2]
+    contour = None
+    try:
+        model_path = settings["model_path"]
+        geometry = InferenceGeometry(width, height, settings["inference_width"])
+        model = warm_up_model(load_model(model_path), *geometry.inference_size, settings["warmup_runs"],
+                              settings["confidence"])
+        if settings["measurement"] == "contour":
+            # engine ใช้เพียง classify_area และ threshold ล่าสุดที่ส่งมากับแต่ละเฟรม
+            engine = SortingEngine(settings["size_thresholds"], settings["grades"], width, height)
+            contour = ContourMeasurement(engine, verify_every=settings["verify_every"],
+                                         segmenter=BeltSegmenter(diff_threshold=settings["contour_threshold"]))
+        results.put(("ready", None))
+
+        while True:
+            item = requests.get()
+            if item is None:
+                break
+            slot, seq, capture_time, config = item
+            try:
+                # ตรวจอายุเฟรมที่นี่ (ก่อนเข้าโมเดล) เพราะเฟรมอาจรอในคิว requests
+                age = time.time() - capture_time
+                max_age = config["max_inference_age"]
+                if max_age and age > max_age:
+                    results.put(("stale", (seq, age, max_age)))
+                    continue
+                if config["inference_width"] != geometry.inference_width:
+                    geometry = InferenceGeometry(width, height, config["inference_width"])
+                if config["model_path"] != model_path:
+                    model_path = config["model_path"]
+                    model = warm_up_model(load_model(model_path), *geometry.inference_size, 1, config["confidence"])
+                frame = slots[slot]
+                if contour:
+                    contour.engine.size_thresholds = config["size_thresholds"]
+                    detections = contour.measure(frame, model, config["confidence"], geometry)
+                else:
+                    output = geometry.track(model, frame, persist=True, conf=config["confidence"], verbose=False)
+                    detections = geometry.scale_detections(detections_from_results(output, model.names))
+                results.put(("detections", (seq, capture_time, detections)))
+            except Exception as e:
+                results.put(("error", (seq, str(e))))
+            finally:
+                free_slots.put(slot)
+    except Exception as e:
+        results.put(("error", (None, str(e))))
+    finally:
+        if contour:
+            contour.report()
+        times = os.times()
+        results.put(("cpu", times.user + times.system))
+        results.put(None)
+        del slots
+        shm.close()
+
+
+class ProcessStrategy(_Strategy):
+    """ตรวจจับใน process แยก (ไม่แย่ง GIL กับหน้าจอและการคัดแยก) ส่งเฟรมผ่าน shared memory
+
+    process ลูกโหลดโมเดลเอง ค่า config ล่าสุด (threshold, ความเชื่อมั่น, model_path) ถูกส่งไปพร้อมทุกเฟรม
+    """
+
+    def __init__(self, sorter, num_slots=3):
+        super().__init__(sorter)
+        self.num_slots = num_slots
+        self.pending = {}  # seq -> เฟรมที่รอผลการตรวจจับ
+        self.seq = 0
+        self.process = None
+        self.receiver = None
+        self._shm = None
+
+    def start(self):
+        sorter = self.sorter
+        frame_shape = (sorter.frame_height, sorter.frame_width, 3)
+        self._shm = shared_memory.SharedMemory(create=True, size=self.num_slots * int(np.prod(frame_shape)))
+        self.slots = np.ndarray((self.num_slots,) + frame_shape, dtype=np.uint8, buffer=self._shm.buf)
+
+        ctx = mp.get_context("spawn")
+        self.free_slots = ctx.Queue()
+        self.requests = ctx.Queue()
+        self.results = ctx.Queue()
+        for i in range(self.num_slots):
+            self.free_slots.put(i)
+
+        settings = {
+            "model_path": sorter.model_path,
+            "confidence": sorter.confidence_threshold,
+            "size_thresholds": dict(sorter.size_thresholds),
+            "grades": list(sorter.grades),
+            "warmup_runs": sorter.warmup_runs,
+            "measurement": sorter.measurement,
+            "verify_every": sorter.verify_every,
+            "contour_threshold": sorter.contour_threshold,
+            "inference_width": sorter.inference_width,
+            "inference_cpus": sorted(sorter.resources.cpus_for("inference")),
+            "inference_threads": sorter.resources.inference_threads
+        }
+        self.process = ctx.Process(
+            target=_detector_worker,
+            args=(settings, self._shm.name, self.num_slots, frame_shape,
+                  self.free_slots, self.requests, self.results),
+            name="detector_process",
+            daemon=True
+        )
+        self.process.start()
+
+        # รอให้ process ลูกโหลดโมเดลเสร็จก่อนเริ่มส่งเฟรม
+        with sorter.startup.phase("wait_model"):
+            message = self.results.get()
+        if message is None or message[0] != "ready":
+            error = message[1][1] if message else "detector process exited"
+            self.stop()
+            raise RuntimeError(f"Detector process failed to start: {error}")
+
+        super().start()
+        self.receiver = threading.Thread(target=self.processing_loop, name="processing_loop")
+        self.receiver.daemon = True
+        self.receiver.start()
+
+    def submit(self, frame, capture_time):
+        self.stats.submitted += 1
+        if not self._due(capture_time):
+            return
+        try:
+            slot = self.free_slots.get_nowait()
+        except queue.Empty:
+            self.stats.skipped += 1  # process ลูกยังตรวจจับเฟรมก่อนหน้าไม่เสร็จ
+            return
+        self.last_detection_time = capture_time
+
+        np.copyto(self.slots[slot], frame)
+        with self.sorter.config_lock:
+            config = {
+                "model_path": self.sorter.model_path,
+                "confidence": self.sorter.confidence_threshold,
+                "size_thresholds": dict(self.sorter.size_thresholds),
+                "max_inference_age": self.sorter.max_frame_age["inference"],
+                "inference_width": self.sorter.inference_width
+            }
+        self.seq += 1
+        self.pending[self.seq] = frame  # loop หลักไม่แก้ไขเฟรมนี้ (วาดบนสำเนา)
+        self.requests.put((slot, self.seq, capture_time, config))
+
+    def processing_loop(self):
+        """รับผลการตรวจจับจาก process ลูกแล้วคัดแยกใน thread นี้"""
+        with self.sorter.resources.stage("actuation"):
+            self._processing_loop()
+
+    def _processing_loop(self):
+        while True:
+            try:
+                message = self.results.get(timeout=0.5)
+            except queue.Empty:
+                if not self.sorter.running and not self.process.is_alive():
+                    break
+                continue
+            if message is None:
+                break
+
+            kind, payload = message
+            if kind == "cpu":
+                self.sorter.resources.add_cpu("inference", payload)
+                continue
+            if kind == "stale":
+                seq, age, max_age = payload
+                self.pending.pop(seq, None)
+                self.stats.skipped += 1
+                self.sorter.watchdog.record_drop(age, max_age)
+                continue
+            if kind == "error":
+                seq, error = payload
+                self.pending.pop(seq, None)
+                log.error("Detection error: %s", error)
+                continue
+            seq, capture_time, detections = payload
+            frame = self.pending.pop(seq, None)
+            if frame is None or not self.sorter.running:
+                continue
+            try:
+                self.sorter.handle_detections(frame, detections, capture_time)
+                self.stats.record(capture_time)
+            except Exception as e:
+                log.error("Processing error: %s", e)
+
+    def stop(self):
+        if self.process is not None:
+            self.requests.put(None)
+            self.process.join(timeout=5.0)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout=1.0)
+        if self.receiver is not None:
+            self.receiver.join(timeout=1.0)
+            self.receiver = None
+        self.process = None
+        if self._shm is not None:
+            self.slots = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+class AsyncioStrategy(_Strategy):
+    """ทั้ง pipeline อยู่บน asyncio event loop เดียว ซึ่งเป็นตัวตัดสินเวลาทั้งหมด
+
+    การรับ/แสดงเฟรมและการตรวจจับรันใน executor (thread ละหนึ่งตัว) ส่วนการคัดแยกทำบน loop
+    การหมุน servo ทุกขั้นถูกตั้งเวลาด้วย loop.call_at บนนาฬิกา monotonic เดียวกับเวลาที่ได้เฟรม
+    (ไม่มี thread ที่ sleep ต่อ servo) จึงวัดได้ว่าแต่ละขั้นทำงานช้ากว่าเวลาที่ตั้งไว้เท่าไร
+    ปิดระบบด้วยการ cancel task และยกเลิกคำสั่ง servo ที่ยังไม่ถึงเวลา แทนการรอ thread
+    """
+
+    main_stages = ("actuation",)  # loop thread ทำการคัดแยกและสั่ง servo
+    owns_main_loop = True
+
+    def __init__(self, sorter, max_samples=10000):
+        super().__init__(sorter)
+        self.loop = None
+        self.capture_executor = None
+        self.inference_executor = None
+        self.frame_capture_clock = None  # เวลา monotonic ที่ได้เฟรมที่กำลังคัดแยก (ใช้ใน actuate)
+        self.handles = set()  # คำสั่ง servo ที่ตั้งเวลาไว้และยังไม่ทำงาน
+        self.deflected = set()  # servo ที่หมุนไปตำแหน่งคัดแยกแล้วยังไม่หมุนกลับ
+        self.lateness = deque(maxlen=max_samples)  # เวลาที่แต่ละขั้นของ servo ทำงานช้ากว่าที่ตั้งไว้
+        self.capture_to_actuation = deque(maxlen=max_samples)  # ตั้งแต่ได้เฟรมจนสั่ง servo ขั้นแรก
+
+    def submit(self, frame, capture_time):
+        raise RuntimeError("The asyncio strategy reads frames itself, use run()")
+
+    def run(self):
+        """รัน pipeline จนกว่าวิดีโอหมด ผู้ใช้กด q หรือครบ max_frames (Ctrl+C จะ cancel task ทั้งหมด)"""
+        resources = self.sorter.resources
+        # thread ของ executor ผูกกับ core ของขั้นตอนตัวเองตั้งแต่สร้าง
+        self.capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture",
+                                                   initializer=resources.enter, initargs=("capture",))
+        self.inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference",
+                                                     initializer=resources.enter, initargs=("inference",))
+        try:
+            asyncio.run(self._pipeline())
+        finally:
+            for executor in (self.capture_executor, self.inference_executor):
+                executor.submit(resources.leave)
+                executor.shutdown(wait=True)
+
+    async def _pipeline(self):
+        self.loop = asyncio.get_running_loop()
+        frames = asyncio.Queue(maxsize=1)
+        inference = asyncio.create_task(self._inference(frames), name="inference")
+        try:
+            await self._capture(frames)
+        finally:
+            inference.cancel()
+            await asyncio.gather(inference, return_exceptions=True)
+            self._cancel_servos()
+
+    def _read(self):
+        frame, capture_time = self.sorter.read_frame()
+        return frame, capture_time, time.monotonic()
+
+    async def _capture(self, frames):
+        frames_read = 0
+        while True:
+            frame, capture_time, capture_clock = await self.loop.run_in_executor(self.capture_executor, self._read)
+            if frame is None:
+                return
+            self.stats.submitted += 1
+            frames_read += 1
+            if self._due(capture_time):
+                self.last_detection_time = capture_time
+                if frames.full():
+                    # โมเดลยังไม่ว่าง แทนที่เฟรมที่รออยู่ด้วยเฟรมใหม่ล่าสุด
+                    frames.get_nowait()
+                    self.stats.skipped += 1
+                frames.put_nowait((frame, capture_time, capture_clock))
+
+            keep_running = await self.loop.run_in_executor(self.capture_executor, self.sorter.show_frame,
+                                                           frame, capture_time)
+            if not keep_running or (self.sorter.max_frames and frames_read >= self.sorter.max_frames):
+                return
+
+    async def _inference(self, frames):
+        while True:
+            frame, capture_time, capture_clock = await frames.get()
+            if not self._fresh(capture_time):
+                continue
+            try:
+                detections = await self.loop.run_in_executor(self.inference_executor, self.sorter.detect, frame)
+            except Exception as e:
+                log.error("Detection error: %s", e)
+                continue
+            # คัดแยกบน loop คำสั่ง servo ที่เกิดขึ้นจะถูกตั้งเวลาผ่าน actuate()
+            self.frame_capture_clock = capture_clock
+            try:
+                self.sorter.handle_detections(frame, detections, capture_time)
+                self.stats.record(capture_time)
+            except Exception as e:
+                log.error("Processing error: %s", e)
+
+    def actuate(self, shrimp_size):
+        """ตั้งเวลาทุกขั้นของการหมุน servo หนึ่งรอบด้วย call_at (เรียกบน loop ระหว่าง handle_detections)"""
+        start = self.loop.time()
+        self.capture_to_actuation.append(start - self.frame_capture_clock)
+        for offset, duty in self.sorter.servo_plan(shrimp_size):
+            self._call_at(start + offset, self._set_duty, shrimp_size, duty, offset == 0)
+
+    def _call_at(self, when, callback, *args):
+        handle = None
+
+        def run():
+            self.handles.discard(handle)
+            self.lateness.append(self.loop.time() - when)
+            callback(*args)
+
+        handle = self.loop.call_at(when, run)
+        self.handles.add(handle)
+
+    def _set_duty(self, shrimp_size, duty, deflect):
+        try:
+            self.sorter.servos[shrimp_size].ChangeDutyCycle(duty)
+        except Exception as e:
+            self.sorter.servo_error(shrimp_size, e)
+            return
+        if deflect:
+            self.deflected.add(shrimp_size)
+        elif duty > 0:
+            self.deflected.discard(shrimp_size)  # หมุนกลับตำแหน่งเริ่มต้นแล้ว
+
+    def _cancel_servos(self):
+        """ยกเลิกขั้นของ servo ที่ยังไม่ถึงเวลา และหมุน servo ที่ค้างอยู่ที่ตำแหน่งคัดแยกกลับ"""
+        for handle in self.handles:
+            handle.cancel()
+        if self.handles:
+            log.info("Cancelled %d scheduled servo steps at shutdown", len(self.handles))
+        self.handles.clear()
+        if self.deflected:
+            self.sorter.home_servos()
+            self.deflected.clear()
+
+    def stop(self):
+        if not self.lateness:
+            return
+
+        def percentiles(samples):
+            values = sorted(samples)
+            return tuple(values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+                         for fraction in (0.5, 0.95, 1.0))
+
+        print("Scheduler lateness of servo steps: p50 %.1f ms, p95 %.1f ms, max %.1f ms (%d steps)"
+              % (percentiles(self.lateness) + (len(self.lateness),)))
+        if self.capture_to_actuation:
+            print("Capture to servo command: p50 %.0f ms, p95 %.0f ms, max %.0f ms"
+                  % percentiles(self.capture_to_actuation))
+
+
+def create_strategy(name, sorter):
+    if name == "sync":
+        return SyncStrategy(sorter)
+    if name == "threaded":
+        return ThreadedStrategy(sorter)
+    if name == "process":
+        return ProcessStrategy(sorter)
+    if name == "asyncio":
+        return AsyncioStrategy(sorter)
+    raise ValueError(f"Unknown execution strategy: {name}")
+
+
+def print_comparison(results):
+    """ตารางเปรียบเทียบ strategy: {ชื่อ: StrategyStats.summary()}"""
+    print("\nExecution strategy benchmark")
+    print(f"{'strategy':<10} {'frames':>7} {'detected':>9} {'det/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} "
+          f"{'std ms':>8}")
+    for name, summary in results.items():
+        print(f"{name:<10} {summary['submitted']:7d} {summary['processed']:9d} {summary['throughput_fps']:7.1f} "
+              f"{summary['latency_p50_ms']:8.1f} {summary['latency_p95_ms']:8.1f} {summary['latency_max_ms']:8.1f} "
+              f"{summary['latency_std_ms']:8.1f}")
+    if results:
+        fastest = max(results, key=lambda name: results[name]["throughput_fps"])
+        quickest = min(results, key=lambda name: results[name]["latency_p95_ms"])
+        print(f"Highest throughput: {fastest}, lowest p95 latency: {quickest}")
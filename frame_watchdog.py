@@ -0,0 +1,86 @@
+import threading
+import time
+
+from shrimp_logging import get_logger
+
+log = get_logger("watchdog")
+
+# อายุสูงสุดของเฟรม (วินาทีนับจากได้เฟรมจากกล้อง) ในแต่ละขั้นตอน 0 = ไม่ตรวจ
+DEFAULT_MAX_FRAME_AGE = {
+    "inference": 1.0,  # เฟรมที่รอนานกว่านี้ถูกทิ้งก่อนเข้าโมเดล
+    "actuation": 2.0   # กุ้งจากเฟรมที่เก่ากว่านี้ตอนจะสั่ง servo ถือว่าพลาดกำหนดเวลา (ผ่านประตูไปแล้ว)
+}
+
+
+class FrameWatchdog:
+    """ตรวจอายุของเฟรมในแต่ละขั้นตอน นับและ log เฟรมที่ถูกทิ้งและกุ้งที่พลาดกำหนดเวลาสั่ง servo
+
+    ค่าอายุสูงสุดส่งเข้ามาทุกครั้งที่ตรวจ (อ่านจาก config ปัจจุบัน จึงปรับได้ขณะทำงาน)
+    เรียกได้จากหลาย thread
+    """
+
+    def __init__(self):
+        self.dropped = 0  # เฟรมที่ถูกทิ้งก่อนตรวจจับ
+        self.missed = {}  # เกรด -> จำนวนกุ้งที่พลาดกำหนดเวลา
+        self.rejected = 0  # กุ้งที่พลาดแล้วถูกส่งไปช่อง reject (ไม่นับที่ปล่อยไปท้ายสายพาน)
+        self.worst_age = {"inference": 0.0, "actuation": 0.0}
+        self._lock = threading.Lock()
+
+    def _age(self, stage, capture_time, now):
+        age = (time.time() if now is None else now) - capture_time
+        with self._lock:
+            if age > self.worst_age[stage]:
+                self.worst_age[stage] = age
+        return age
+
+    def fresh_for_inference(self, capture_time, max_age, now=None):
+        """True ถ้าเฟรมยังใหม่พอจะตรวจจับ ถ้าเก่าเกินจะนับเป็นเฟรมที่ถูกทิ้ง"""
+        age = self._age("inference", capture_time, now)
+        if not max_age or age <= max_age:
+            return True
+        self.record_drop(age, max_age)
+        return False
+
+    def record_drop(self, age, max_age):
+        """นับเฟรมที่ถูกทิ้งก่อนตรวจจับ (ใช้ตรงกับ process ตรวจจับที่ตรวจอายุเอง)"""
+        with self._lock:
+            self.dropped += 1
+            if age > self.worst_age["inference"]:
+                self.worst_age["inference"] = age
+        log.warning("Dropped stale frame before inference: %.0f ms old (limit %.0f ms)",
+                    age * 1000, max_age * 1000)
+
+    def deadline_met(self, capture_time, max_age, grade, reject_lane=None, now=None):
+        """True ถ้ายังสั่ง servo ของเกรดนี้ทันเวลา ถ้าไม่ทันจะนับเป็นการพลาดกำหนดเวลา"""
+        age = self._age("actuation", capture_time, now)
+        if not max_age or age <= max_age:
+            return True
+        with self._lock:
+            self.missed[grade] = self.missed.get(grade, 0) + 1
+            if reject_lane:
+                self.rejected += 1
+        lane = f"reject lane ({reject_lane})" if reject_lane else "end of the belt"
+        log.warning("Missed actuation deadline for %s shrimp: frame %.0f ms old (limit %.0f ms), sent to %s",
+                    grade, age * 1000, max_age * 1000, lane)
+        return False
+
+    def summary(self):
+        with self._lock:
+            return {
+                "stale_frames_dropped": self.dropped,
+                "deadline_misses": sum(self.missed.values()),
+                "deadline_misses_by_grade": dict(self.missed),
+                "rejected": self.rejected,
+                "worst_inference_age_ms": round(self.worst_age["inference"] * 1000),
+                "worst_actuation_age_ms": round(self.worst_age["actuation"] * 1000)
+            }
+
+    def report(self):
+        summary = self.summary()
+        print(f"Frame watchdog: {summary['stale_frames_dropped']} stale frames dropped before inference, "
+              f"{summary['deadline_misses']} actuation deadlines missed ({summary['rejected']} to the reject lane), "
+              f"worst frame age {summary['worst_inference_age_ms']} ms at inference, "
+              f"{summary['worst_actuation_age_ms']} ms at actuation")
+        if summary["deadline_misses_by_grade"]:
+            print("  Missed by grade: " + ", ".join(f"{grade}: {count}" for grade, count
+                                                   in summary["deadline_misses_by_grade"].items()))
@@ -0,0 +1,92 @@
+from bisect import bisect_right
+
+import numpy as np
+
+DEFAULT_GRADES = ("small", "medium", "large")
+
+
+class GradeTable:
+    """ตารางเกรดขนาดกุ้ง N เกรด เรียงจากเล็กไปใหญ่ พร้อมขอบบนของทุกเกรดยกเว้นเกรดสุดท้าย (N-1 ค่า)
+
+    พื้นที่น้อยกว่าขอบบนของเกรดใดจัดเป็นเกรดนั้น (พื้นที่เท่ากับขอบพอดีเป็นเกรดถัดไป)
+    ค้นหาด้วย bisect จึงใช้เวลา O(log N) ไม่ว่าจะมีกี่เกรด
+    """
+
+    def __init__(self, names, boundaries):
+        self.names = tuple(names)
+        self.boundaries = tuple(float(value) for value in boundaries)
+        if len(self.names) < 2:
+            raise ValueError("At least two grades are required")
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Grade names must be unique: {list(self.names)}")
+        if len(self.boundaries) != len(self.names) - 1:
+            raise ValueError(f"{len(self.names)} grades need {len(self.names) - 1} thresholds, "
+                             f"got {len(self.boundaries)}")
+        for lower, upper, name, next_name in zip(self.boundaries, self.boundaries[1:], self.names, self.names[1:]):
+            if lower >= upper:
+                raise ValueError(f"size_thresholds.{name} must be less than size_thresholds.{next_name}")
+
+    @classmethod
+    def from_thresholds(cls, size_thresholds, grades):
+        """สร้างจาก size_thresholds แบบ {เกรด: ขอบบน} ตามลำดับเกรด (เกรดสุดท้ายไม่มีขอบบน)"""
+        grades = tuple(grades)
+        missing = [name for name in grades[:-1] if name not in size_thresholds]
+        if missing:
+            raise ValueError(f"Missing size threshold(s): {', '.join(missing)}")
+        extra = set(size_thresholds) - set(grades[:-1])
+        if extra:
+            raise ValueError(f"Unknown size threshold(s): {', '.join(sorted(extra))}")
+        return cls(grades, [size_thresholds[name] for name in grades[:-1]])
+
+    def __len__(self):
+        return len(self.names)
+
+    def classify(self, area):
+        """เกรดของพื้นที่หนึ่งค่า"""
+        return self.names[bisect_right(self.boundaries, area)]
+
+    def classify_many(self, areas):
+        """เกรดของพื้นที่หลายค่าพร้อมกัน (vectorized ด้วย numpy.searchsorted)"""
+        indexes = np.searchsorted(self.boundaries, np.asarray(areas, dtype=np.float64), side="right")
+        return [self.names[index] for index in indexes]
+
+    def thresholds(self):
+        """กลับเป็นรูปแบบ size_thresholds {เกรด: ขอบบน}"""
+        return dict(zip(self.names, self.boundaries))
+
+    def ranges(self):
+        """[(เกรด, ขอบล่าง, ขอบบน)] ขอบล่างของเกรดแรกและขอบบนของเกรดสุดท้ายเป็น None"""
+        lowers = (None,) + self.boundaries
+        uppers = self.boundaries + (None,)
+        return list(zip(self.names, lowers, uppers))
+
+    def describe(self, short=False):
+        """ข้อความอธิบายช่วงของทุกเกรด เช่น "small< 32519, medium: 32519-48046, large> 48046"
+
+        short=True ใช้อักษรตัวแรกของชื่อเกรด (ถ้าไม่ซ้ำกัน) สำหรับแสดงบนหน้าจอ
+        """
+        initials = [name[0].upper() for name in self.names]
+        short = short and len(set(initials)) == len(initials)
+        parts = []
+        for name, lower, upper in self.ranges():
+            label = name[0].upper() if short else name
+            if lower is None:
+                parts.append(f"{label}< {upper:.0f}")
+            elif upper is None:
+                parts.append(f"{label}> {lower:.0f}")
+            else:
+                parts.append(f"{label}: {lower:.0f}-{upper:.0f}")
+        return ", ".join(parts)
+
+
+# สีหลัก (BGR) ของเกรดเล็กสุด กลาง และใหญ่สุด เกรดอื่นไล่สีระหว่างสีเหล่านี้
+_COLOR_STOPS = ((0, 255, 0), (0, 165, 255), (0, 0, 255))  # เขียว ส้ม แดง
+
+
+def grade_color(index, count):
+    """สี BGR ของเกรดลำดับ index จาก count เกรด (3 เกรดได้ เขียว ส้ม แดง เหมือนสีเดิมของ small/medium/large)"""
+    position = index / max(count - 1, 1) * (len(_COLOR_STOPS) - 1)
+    stop = min(int(position), len(_COLOR_STOPS) - 2)
+    fraction = position - stop
+    start, end = _COLOR_STOPS[stop], _COLOR_STOPS[stop + 1]
+    return tuple(int(round(a + (b - a) * fraction)) for a, b in zip(start, end))
@@ -0,0 +1,103 @@
+import os
+import queue
+import threading
+import zlib
+
+import cv2
+
+SAVE_MODES = ("none", "failures", "sampled", "all")
+
+
+class ImageWriterPool:
+    """เขียนไฟล์ภาพด้วย thread เบื้องหลัง (cv2 ปล่อย GIL ระหว่าง encode จึงทำงานขนานกับ inference ได้)
+
+    queue มีขนาดจำกัด ถ้าเต็มจะทิ้งภาพนั้นแทนการรอ เพื่อไม่ให้ thread หลักต้องรอดิสก์
+    ยกเว้นเมื่อ block=True (ต้องได้ภาพครบ) ซึ่งจะรอให้คิวว่างแทน
+    """
+
+    def __init__(self, num_workers=2, max_queue=32, jpeg_quality=90, thumbnail=None, block=False):
+        self.block = block
+        self.jpeg_quality = jpeg_quality
+        self.thumbnail = thumbnail  # ความยาวด้านที่ยาวที่สุด (pixels) หรือ None = ขนาดเต็ม
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._count_lock = threading.Lock()
+
+        self.threads = []
+        for i in range(num_workers):
+            thread = threading.Thread(target=self._worker, name=f"image_writer_{i}")
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, path, image):
+        """ส่งภาพเข้าคิว คืนค่า False ถ้าคิวเต็ม (ภาพถูกทิ้ง)"""
+        if self.block:
+            self.queue.put((path, image))
+            return True
+        try:
+            self.queue.put_nowait((path, image))
+            return True
+        except queue.Full:
+            with self._count_lock:
+                self.dropped += 1
+            return False
+
+    def _encode_params(self, path):
+        ext = os.path.splitext(path)[1].lower()
+        if ext in (".jpg", ".jpeg"):
+            return [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        return []
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+            path, image = item
+            try:
+                if self.thumbnail:
+                    height, width = image.shape[:2]
+                    scale = self.thumbnail / max(height, width)
+                    if scale < 1:
+                        image = cv2.resize(image, (int(width * scale), int(height * scale)),
+                                           interpolation=cv2.INTER_AREA)
+                ok = cv2.imwrite(path, image, self._encode_params(path))
+                with self._count_lock:
+                    if ok:
+                        self.written += 1
+                    else:
+                        self.failed += 1
+            except Exception as e:
+                print(f"Error writing image {path}: {e}")
+                with self._count_lock:
+                    self.failed += 1
+            finally:
+                self.queue.task_done()
+
+    def close(self):
+        """รอให้เขียนภาพที่ค้างในคิวเสร็จ แล้วหยุด thread ทั้งหมด"""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        print(f"Image writer: {self.written} written, {self.dropped} dropped (queue full), "
+              f"{self.failed} failed")
+
+
+def should_save(mode, image_path, detected, sample_rate=0.1):
+    """ตัดสินว่าจะบันทึกภาพผลลัพธ์หรือไม่
+
+    mode "sampled" เลือกจาก hash ของชื่อไฟล์ ภาพเดิมจึงถูกเลือกเหมือนเดิมทุกครั้งที่รัน
+    """
+    if mode == "all":
+        return True
+    if mode == "failures":
+        return not detected
+    if mode == "sampled":
+        bucket = zlib.crc32(os.path.basename(image_path).encode("utf-8")) % 10000
+        return bucket < sample_rate * 10000
+    return False
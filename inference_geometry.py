@@ -0,0 +1,81 @@
+import cv2
+
+STRIDE = 32  # ขนาดภาพเข้าโมเดล YOLO ต้องหารด้วย stride ลงตัว
+REFERENCE_FRAME_SIZE = (640, 480)  # เฟรมอ้างอิง (กว้าง, สูง) ที่ใช้วัดพื้นที่และ threshold ทั้งระบบ
+DEFAULT_INFERENCE_WIDTH = 640
+FAST_INFERENCE_WIDTH = 480  # โหมดเร็ว: 480x352 สำหรับกล้อง 640x480
+
+
+def aligned_size(frame_width, frame_height, inference_width, stride=STRIDE):
+    """ขนาด (กว้าง, สูง) ที่หารด้วย stride ลงตัวและสัดส่วนใกล้กับกล้องที่สุด เช่น 640x480 -> 480x352"""
+    width = max(stride, round(inference_width / stride) * stride)
+    height = max(stride, round(width * frame_height / frame_width / stride) * stride)
+    return width, height
+
+
+class InferenceGeometry:
+    """การเตรียมภาพเข้าโมเดลที่ใช้ร่วมกันทั้งตอนสอบเทียบ (CheckPixel) และตอนคัดแยกจริง
+
+    ภาพทุกภาพถูกปรับเป็นเฟรมอ้างอิงขนาดเท่ากล้อง (frame_width x frame_height) ก่อน แล้วย่อเป็นขนาด
+    inference ที่สัดส่วนเท่ากล้องและหารด้วย stride ลงตัว โมเดลจึงไม่ต้องเติมขอบ (letterbox) หรือยืดภาพ
+    กรอบที่ได้ถูกแปลงกลับเป็นพิกัดของเฟรมอ้างอิงเสมอ พื้นที่ (pixels²) และ threshold จึงไม่เปลี่ยน
+    เมื่อลดขนาด inference เพื่อเพิ่ม FPS
+    """
+
+    def __init__(self, frame_width=REFERENCE_FRAME_SIZE[0], frame_height=REFERENCE_FRAME_SIZE[1],
+                 inference_width=DEFAULT_INFERENCE_WIDTH, stride=STRIDE):
+        self.frame_size = (frame_width, frame_height)
+        self.inference_width = inference_width
+        self.inference_size = aligned_size(frame_width, frame_height, inference_width, stride)
+        self.scale_x = frame_width / self.inference_size[0]
+        self.scale_y = frame_height / self.inference_size[1]
+
+    @property
+    def imgsz(self):
+        """ขนาดสำหรับ argument imgsz ของ ultralytics (สูง, กว้าง)"""
+        return self.inference_size[1], self.inference_size[0]
+
+    def describe(self):
+        width, height = self.inference_size
+        if self.inference_size == self.frame_size:
+            return f"{width}x{height}"
+        return f"{width}x{height} (boxes rescaled to {self.frame_size[0]}x{self.frame_size[1]})"
+
+    def to_reference(self, image):
+        """ปรับภาพขนาดใดก็ได้เป็นเฟรมอ้างอิง: ตัดขอบตรงกลางให้สัดส่วนเท่ากล้องแล้วย่อ/ขยาย (ไม่ยืดภาพ)"""
+        height, width = image.shape[:2]
+        if (width, height) == self.frame_size:
+            return image
+        frame_width, frame_height = self.frame_size
+        if width * frame_height > height * frame_width:
+            crop_width = round(height * frame_width / frame_height)
+            left = (width - crop_width) // 2
+            image = image[:, left:left + crop_width]
+        elif width * frame_height < height * frame_width:
+            crop_height = round(width * frame_height / frame_width)
+            top = (height - crop_height) // 2
+            image = image[top:top + crop_height]
+        return cv2.resize(image, self.frame_size, interpolation=cv2.INTER_AREA)
+
+    def model_input(self, frame):
+        """ย่อเฟรมอ้างอิงเป็นขนาด inference (ไม่ทำอะไรถ้าขนาดเท่ากัน)"""
+        if self.inference_size == self.frame_size:
+            return frame
+        return cv2.resize(frame, self.inference_size, interpolation=cv2.INTER_AREA)
+
+    def predict(self, model, frame, **kwargs):
+        return model.predict(self.model_input(frame), imgsz=self.imgsz, **kwargs)
+
+    def track(self, model, frame, **kwargs):
+        return model.track(self.model_input(frame), imgsz=self.imgsz, **kwargs)
+
+    def scale_box(self, box):
+        """กรอบในพิกัดภาพ inference -> พิกัดเฟรมอ้างอิง"""
+        x1, y1, x2, y2 = box
+        return (x1 * self.scale_x, y1 * self.scale_y, x2 * self.scale_x, y2 * self.scale_y)
+
+    def scale_detections(self, detections):
+        """แปลงกรอบของรายการ Detection (หรือ namedtuple อื่นที่มี box) เป็นพิกัดเฟรมอ้างอิง"""
+        if self.inference_size == self.frame_size:
+            return detections
+        return [detection._replace(box=self.scale_box(detection.box)) for detection in detections]
@@ -0,0 +1,368 @@
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from grade_table import DEFAULT_GRADES, GradeTable
+from inference_geometry import DEFAULT_INFERENCE_WIDTH, InferenceGeometry
+from runtime_config import load_config_file
+from sorting_engine import SortingEngine, box_area, detections_from_results
+from startup import load_model
+
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+DEFAULT_SETTINGS = {
+    "model_path": "/home/project/Desktop/ShrimpDetection last.pt",
+    "grades": list(DEFAULT_GRADES),
+    "size_thresholds": {"small": 32519.3, "medium": 48045.8},
+    "confidence_threshold": 0.6,
+    "stale_timeout": 0.5,
+    "inference_width": DEFAULT_INFERENCE_WIDTH
+}
+
+RECORD_FIELDS = ['shrimp_id', 'video_time', 'frame', 'class_name', 'shrimp_size', 'area', 'confidence',
+                 'x1', 'y1', 'x2', 'y2', 'shard', 'track_id']
+
+_model = None  # โมเดลของแต่ละ process (โหลดครั้งเดียวตอนเริ่ม process)
+
+
+def load_settings(config_path=None):
+    """ค่าที่ใช้วิเคราะห์ (threshold, ความเชื่อมั่น, โมเดล) จากไฟล์ config ของระบบคัดแยก"""
+    settings = dict(DEFAULT_SETTINGS)
+    settings["size_thresholds"] = dict(DEFAULT_SETTINGS["size_thresholds"])
+    if config_path:
+        data = load_config_file(config_path)
+        if "grades" in data:
+            # ชุดเกรดของไฟล์ config ใช้ threshold จากไฟล์เท่านั้น
+            settings["grades"] = list(data["grades"])
+            settings["size_thresholds"] = {}
+        settings["size_thresholds"].update(data.get("size_thresholds", {}))
+        for key in ("confidence_threshold", "model_path", "inference_width"):
+            if key in data:
+                settings[key] = data[key]
+    return settings
+
+
+def plan_shards(total_frames, shard_frames, overlap_frames):
+    """แบ่งเฟรมเป็นช่วงหลัก (core) ที่ต่อกัน และขยายแต่ละช่วงออกไปข้างละ overlap_frames
+
+    ช่วงที่ซ้อนกันใช้ให้ tracker ของแต่ละ shard เริ่มทำงานก่อนถึงช่วงหลัก และใช้ต่อ track ข้าม shard
+    """
+    shards = []
+    for index, core_start in enumerate(range(0, total_frames, shard_frames)):
+        core_end = min(core_start + shard_frames, total_frames)
+        shards.append({
+            "index": index,
+            "core_start": core_start,
+            "core_end": core_end,
+            "start": max(0, core_start - overlap_frames),
+            "end": min(total_frames, core_end + overlap_frames)
+        })
+    return shards
+
+
+def _init_worker(model_path):
+    global _model
+    cv2.setNumThreads(1)  # แต่ละ process ใช้ core ของตัวเอง ไม่แย่ง thread ของ OpenCV กัน
+    _model = load_model(model_path)
+
+
+def _reset_tracker(model):
+    """ล้างสถานะ tracker ของโมเดล (ถ้ามี) ให้ shard ถัดไปใน process เดียวกันเริ่ม track ใหม่
+
+    ต้องล้างเองเพราะ ultralytics อ่านค่า persist เฉพาะตอนสร้าง tracker ครั้งแรกเท่านั้น
+    """
+    predictor = getattr(model, "predictor", None)
+    for tracker in getattr(predictor, "trackers", None) or []:
+        tracker.reset()
+
+
+def analyze_shard(video_path, shard, settings, overlap_frames, frame_step=1):
+    """ตรวจจับ ติดตาม และแยกขนาดกุ้งในช่วงเฟรมหนึ่ง (ทำงานใน process ของ pool)
+
+    ใช้ SortingEngine ตัวเดียวกับระบบจริง โดยเวลาเป็นเวลาในวิดีโอ (frame / fps)
+    คืนค่ากุ้งที่ถูกคัดแยก และกรอบของแต่ละ track ในเฟรมที่ shard ข้างเคียงประมวลผลด้วย
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    if shard["start"] > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, shard["start"])
+
+    engine = SortingEngine(
+        settings["size_thresholds"],
+        settings["grades"],
+        FRAME_WIDTH,
+        FRAME_HEIGHT,
+        confidence_threshold=settings["confidence_threshold"],
+        stale_timeout=settings["stale_timeout"]
+    )
+    confidence_threshold = settings["confidence_threshold"]
+    geometry = InferenceGeometry(FRAME_WIDTH, FRAME_HEIGHT, settings["inference_width"])  # เหมือนระบบคัดแยกจริง
+    head_end = shard["core_start"] + overlap_frames
+    tail_start = shard["core_end"] - overlap_frames
+
+    records = []
+    boundary_boxes = {}  # track_id -> {frame: box}
+    frames_processed = 0
+    frame_index = shard["start"]
+    _reset_tracker(_model)  # ไม่ต่อ track จาก shard ก่อนหน้าใน process เดียวกัน
+
+    try:
+        while frame_index < shard["end"]:
+            if frame_index % frame_step:
+                # ข้ามเฟรมโดยไม่แปลงเป็นภาพ (นับจากต้นวิดีโอ ช่วง overlap ของ shard ที่ติดกันจึงใช้เฟรมเดียวกัน)
+                if not cap.grab():
+                    break
+                frame_index += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame = geometry.to_reference(frame)
+
+            results = geometry.track(_model, frame, persist=True, conf=confidence_threshold, verbose=False)
+            frames_processed += 1
+
+            detections = geometry.scale_detections(detections_from_results(results, _model.names))
+            _, events = engine.step(detections, frame_index / fps)
+
+            for event in events:
+                if event.processed:
+                    records.append({
+                        "frame": frame_index,
+                        "track_id": event.track_id,
+                        "class_name": event.class_name,
+                        "shrimp_size": event.shrimp_size,
+                        "area": box_area(event.box),
+                        "confidence": event.confidence,
+                        "box": event.box
+                    })
+
+            if frame_index < head_end or frame_index >= tail_start:
+                for detection in detections:
+                    if detection.confidence >= confidence_threshold:
+                        boundary_boxes.setdefault(detection.track_id, {})[frame_index] = detection.box
+
+            frame_index += 1
+    finally:
+        cap.release()
+
+    return {
+        "index": shard["index"],
+        "shard": shard,
+        "records": records,
+        "boundary_boxes": boundary_boxes,
+        "frames_processed": frames_processed
+    }
+
+
+def _iou(a, b):
+    x1 = max(a[0], b[0])
+    y1 = max(a[1], b[1])
+    x2 = min(a[2], b[2])
+    y2 = min(a[3], b[3])
+    intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def match_tracks(prev_boxes, next_boxes, min_common=3, min_iou=0.5):
+    """จับคู่ track ของสอง shard ที่ติดกันจาก IoU เฉลี่ยในเฟรมที่ทั้งสองประมวลผล คืนค่า {next_track: prev_track}"""
+    candidates = []
+    for prev_id, prev_track in prev_boxes.items():
+        for next_id, next_track in next_boxes.items():
+            common = prev_track.keys() & next_track.keys()
+            if len(common) < min_common:
+                continue
+            score = sum(_iou(prev_track[f], next_track[f]) for f in common) / len(common)
+            if score >= min_iou:
+                candidates.append((score, prev_id, next_id))
+
+    # จับคู่แบบ greedy จากคู่ที่ซ้อนกันมากที่สุดก่อน
+    matches = {}
+    used_prev = set()
+    for score, prev_id, next_id in sorted(candidates, reverse=True):
+        if next_id in matches or prev_id in used_prev:
+            continue
+        matches[next_id] = prev_id
+        used_prev.add(prev_id)
+    return matches
+
+
+def stitch_shards(shard_results, min_common=3, min_iou=0.5):
+    """รวมผลของทุก shard เป็นรายการกุ้งที่ไม่ซ้ำกัน เรียงตามเวลา
+
+    track ที่ต่อข้ามรอยต่อได้ถือเป็นกุ้งตัวเดียว ใช้การคัดแยกครั้งแรกสุด
+    track ที่ไม่ได้ต่อข้าม shard นับเฉพาะเมื่อถูกคัดแยกในช่วงหลักของ shard ตัวเอง
+    (ช่วงที่ซ้อนกันเป็นของ shard ข้างเคียง)
+    """
+    shard_results = sorted(shard_results, key=lambda result: result["index"])
+    parent = {}
+
+    def find(key):
+        parent.setdefault(key, key)
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    stitched = set()
+    for prev, current in zip(shard_results, shard_results[1:]):
+        matches = match_tracks(prev["boundary_boxes"], current["boundary_boxes"], min_common, min_iou)
+        for next_id, prev_id in matches.items():
+            root = find((prev["index"], prev_id))
+            parent[find((current["index"], next_id))] = root
+            stitched.add(root)
+    stitched = {find(key) for key in stitched}
+
+    groups = {}
+    for result in shard_results:
+        shard = result["shard"]
+        for record in result["records"]:
+            root = find((result["index"], record["track_id"]))
+            if root not in stitched and not shard["core_start"] <= record["frame"] < shard["core_end"]:
+                continue
+            groups.setdefault(root, []).append(dict(record, shard=result["index"]))
+
+    shrimp = []
+    for root, records in groups.items():
+        if root in stitched:
+            shrimp.append(min(records, key=lambda record: record["frame"]))
+        else:
+            shrimp.extend(records)
+    shrimp.sort(key=lambda record: record["frame"])
+    return shrimp
+
+
+def analyze_video(video_path, settings, workers=4, shard_seconds=600, overlap_seconds=2.0, frame_step=1):
+    """วิเคราะห์วิดีโอทั้งไฟล์แบบขนาน คืนค่ารายการกุ้งที่ต่อ track ข้าม shard แล้ว"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video file: {video_path}")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+
+    overlap_frames = max(1, int(overlap_seconds * fps))
+    shards = plan_shards(total_frames, max(overlap_frames * 2, int(shard_seconds * fps)), overlap_frames)
+    print(f"{video_path}: {total_frames} frames at {fps:.1f} fps, {len(shards)} shards, {workers} workers")
+
+    start = time.perf_counter()
+    results = []
+    # ใช้ spawn เพื่อไม่ให้ process ลูกสืบทอดสถานะของ CUDA/OpenCV จาก process หลัก
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                             initializer=_init_worker, initargs=(settings["model_path"],)) as pool:
+        futures = [pool.submit(analyze_shard, video_path, shard, settings, overlap_frames, frame_step)
+                   for shard in shards]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            elapsed = time.perf_counter() - start
+            print(f"Shard {result['index'] + 1}/{len(shards)} done ({done}/{len(shards)}, "
+                  f"{len(result['records'])} shrimp, {elapsed:.1f} s)")
+
+    frames_processed = sum(result["frames_processed"] for result in results)
+    elapsed = time.perf_counter() - start
+    print(f"Processed {frames_processed} frames in {elapsed:.1f} s "
+          f"({frames_processed / elapsed:.1f} frames/s, {total_frames / fps / elapsed:.1f}x real time)")
+
+    shrimp = stitch_shards(results)
+    for shrimp_id, record in enumerate(shrimp, 1):
+        record["shrimp_id"] = shrimp_id
+        record["video_time"] = round(record["frame"] / fps, 3)
+    return shrimp
+
+
+def write_records(path, shrimp):
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(RECORD_FIELDS)
+        for record in shrimp:
+            x1, y1, x2, y2 = record["box"]
+            writer.writerow([record["shrimp_id"], record["video_time"], record["frame"], record["class_name"],
+                             record["shrimp_size"], record["area"], f"{record['confidence']:.3f}",
+                             int(x1), int(y1), int(x2), int(y2), record["shard"], record["track_id"]])
+
+
+def read_records(path):
+    shrimp = []
+    with open(path, 'r', newline='', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            shrimp.append({
+                "shrimp_id": int(row["shrimp_id"]),
+                "video_time": float(row["video_time"]),
+                "frame": int(row["frame"]),
+                "class_name": row["class_name"],
+                "shrimp_size": row["shrimp_size"],
+                "area": int(row["area"]),
+                "confidence": float(row["confidence"]),
+                "box": tuple(int(row[key]) for key in ("x1", "y1", "x2", "y2")),
+                "shard": int(row["shard"]),
+                "track_id": int(row["track_id"])
+            })
+    return shrimp
+
+
+def regrade(shrimp, settings):
+    """แยกขนาดใหม่จากพื้นที่ที่บันทึกไว้ด้วย threshold ชุดใหม่ โดยไม่ต้องรันโมเดลซ้ำ
+
+    ปรับความเชื่อมั่นได้เฉพาะให้สูงขึ้น (กุ้งที่ต่ำกว่าค่าเดิมไม่ถูกบันทึกไว้ตั้งแต่แรก)
+    """
+    table = GradeTable.from_thresholds(settings["size_thresholds"], settings["grades"])
+    kept = [record for record in shrimp if record["confidence"] >= settings["confidence_threshold"]]
+    # แยกเกรดทุกตัวพร้อมกันด้วย searchsorted แทนการเรียกทีละตัว
+    grades = table.classify_many([record["area"] for record in kept])
+    return [dict(record, shrimp_size=grade) for record, grade in zip(kept, grades)]
+
+
+def print_counts(shrimp, grades):
+    counts = {size: 0 for size in grades}
+    for record in shrimp:
+        counts[record["shrimp_size"]] = counts.get(record["shrimp_size"], 0) + 1
+    print("\nShrimp counts:")
+    for size, count in counts.items():
+        print(f"  {size}: {count}")
+    print(f"  total: {len(shrimp)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline shrimp sizing of recorded belt video')
+    parser.add_argument('video', nargs='?', help='Recorded video file')
+    parser.add_argument('--config', type=str, default=None,
+                        help='Sorter config file (grades, size_thresholds, confidence_threshold, model_path)')
+    parser.add_argument('--model', type=str, default=None, help='YOLO model path (overrides config)')
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                        help='Number of worker processes')
+    parser.add_argument('--shard-minutes', type=float, default=10.0, help='Length of each shard in minutes')
+    parser.add_argument('--overlap-seconds', type=float, default=2.0,
+                        help='Frames shared by neighbouring shards for tracker warm-up and track stitching')
+    parser.add_argument('--frame-step', type=int, default=1, help='Run detection on every Nth frame')
+    parser.add_argument('--regrade', type=str, default=None,
+                        help='Re-grade an existing per-shrimp CSV with new thresholds instead of running the model')
+    parser.add_argument('--output', type=str, default='offline_shrimp.csv', help='Per-shrimp output CSV')
+    args = parser.parse_args()
+
+    settings = load_settings(args.config)
+    if args.model:
+        settings["model_path"] = args.model
+
+    if args.regrade:
+        shrimp = regrade(read_records(args.regrade), settings)
+    elif args.video:
+        shrimp = analyze_video(args.video, settings, args.workers, args.shard_minutes * 60,
+                               args.overlap_seconds, args.frame_step)
+    else:
+        parser.error('a video file or --regrade is required')
+
+    write_records(args.output, shrimp)
+    print(f"Per-shrimp records saved to: {args.output}")
+    print_counts(shrimp, settings["grades"])
+
+
+if __name__ == "__main__":
+    main()
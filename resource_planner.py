@@ -0,0 +1,200 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from shrimp_logging import get_logger
+
+log = get_logger("resources")
+
+STAGES = ("capture", "inference", "actuation")
+
+# sched_setaffinity/sched_setscheduler มีเฉพาะบน Linux (เช่น Raspberry Pi OS)
+HAS_AFFINITY = hasattr(os, "sched_setaffinity")
+
+
+def parse_cpu_list(text):
+    """แปลงรายการ core แบบ "0-1,3" เป็น set ของหมายเลข core ("" = ไม่กำหนด)"""
+    cpus = set()
+    for part in (text or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def pin_current_thread(cpus):
+    """ผูก thread ที่เรียกไว้กับ core ที่กำหนด (บน Linux pid 0 หมายถึง thread นี้เท่านั้น)
+
+    thread และ thread pool ที่สร้างจาก thread นี้ภายหลัง (เช่น intra-op threads ของ torch) จะได้ core ชุดเดียวกัน
+    """
+    if cpus and HAS_AFFINITY:
+        os.sched_setaffinity(0, cpus)
+
+
+def set_inference_threads(count):
+    """กำหนดจำนวน intra-op threads ของ torch (ถ้ามี torch) คืนค่า True ถ้าตั้งได้"""
+    if count <= 0:
+        return False
+    try:
+        import torch
+    except ImportError:
+        return False
+    torch.set_num_threads(count)
+    return True
+
+
+def _process_cpu_seconds(pid):
+    """เวลา CPU (user + system) ของ process อื่นจาก /proc"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class ResourcePlanner:
+    """แบ่ง core ให้แต่ละขั้นตอน (capture, inference, actuation) และวัดเวลา CPU ที่แต่ละขั้นตอนใช้
+
+    แต่ละ thread เรียก stage() หรือ enter()/leave() เพื่อผูกตัวเองกับ core ของขั้นตอนนั้น
+    ขั้นตอนที่ไม่ได้กำหนด core จะไม่ถูกผูก แต่ยังวัดเวลา CPU เหมือนเดิม
+    """
+
+    def __init__(self, stage_cpus=None, inference_threads=0, actuation_priority=0):
+        self.stage_cpus = {stage: set(cpus) for stage, cpus in (stage_cpus or {}).items() if cpus}
+        unknown = set(self.stage_cpus) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+        if self.stage_cpus and HAS_AFFINITY:
+            available = os.sched_getaffinity(0)
+            for stage, cpus in self.stage_cpus.items():
+                missing = cpus - available
+                if missing:
+                    raise ValueError(f"CPU(s) {sorted(missing)} for {stage} are not available "
+                                     f"(available: {sorted(available)})")
+
+        # จำนวน thread ของ torch (0 = เท่ากับจำนวน core ของ inference ถ้ากำหนดไว้)
+        self.inference_threads = inference_threads or len(self.stage_cpus.get("inference", ()))
+        self.actuation_priority = actuation_priority  # SCHED_FIFO priority ของ thread servo (0 = ไม่เปลี่ยน)
+
+        self.start_time = time.time()
+        self.cpu_time = defaultdict(float)  # ชื่อขั้นตอน -> วินาที CPU ของ thread ที่ออกจากขั้นตอนแล้ว
+        self.thread_counts = defaultdict(int)
+        self.processes = {}  # pid -> (ชื่อขั้นตอน, วินาที CPU ล่าสุดที่อ่านได้)
+        self._torch_configured = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def cpus_for(self, *stages):
+        """core ของขั้นตอนที่ระบุ (หลายขั้นตอนในหนึ่ง thread ใช้ core รวมกัน) set ว่าง = ไม่ผูก"""
+        cpus = set()
+        for stage in stages:
+            cpus |= self.stage_cpus.get(stage, set())
+        return cpus
+
+    def apply(self):
+        """ตั้งค่าระดับ process ตอนเริ่มระบบ และแสดงแผนการใช้ core"""
+        if self.stage_cpus and not HAS_AFFINITY:
+            log.warning("CPU affinity is not supported on this platform, stages will not be pinned")
+        if "capture" in self.stage_cpus:
+            # thread pool ของ OpenCV ใช้ร่วมกันทั้ง process จำกัดไว้ไม่ให้แย่ง core ของ inference
+            import cv2
+            cv2.setNumThreads(len(self.stage_cpus["capture"]))
+        if not self.stage_cpus and not self.actuation_priority:
+            return
+        print("CPU plan:")
+        for stage in STAGES:
+            cpus = self.stage_cpus.get(stage)
+            detail = f"cores {sorted(cpus)}" if cpus else "not pinned"
+            if stage == "inference" and self.inference_threads:
+                detail += f", {self.inference_threads} torch threads"
+            if stage == "capture" and cpus:
+                detail += f", {len(cpus)} OpenCV threads"
+            if stage == "actuation" and self.actuation_priority:
+                detail += f", SCHED_FIFO priority {self.actuation_priority}"
+            print(f"  - {stage:<10} {detail}")
+
+    def enter(self, *stages):
+        """ผูก thread ปัจจุบันกับขั้นตอน (core, จำนวน thread ของ torch, priority) และเริ่มนับเวลา CPU"""
+        try:
+            pin_current_thread(self.cpus_for(*stages))
+        except OSError as e:
+            log.warning("Cannot pin %s thread: %s", "+".join(stages), e)
+        if "inference" in stages and not self._torch_configured:
+            self._torch_configured = True
+            set_inference_threads(self.inference_threads)
+        if "actuation" in stages and self.actuation_priority:
+            self._raise_priority()
+        self._local.stage = ("+".join(stages), time.thread_time())
+
+    def leave(self):
+        """หยุดนับเวลา CPU ของ thread ปัจจุบัน"""
+        current = getattr(self._local, "stage", None)
+        if current is None:
+            return
+        name, start = current
+        self._local.stage = None
+        self.add_cpu(name, time.thread_time() - start)
+
+    @contextmanager
+    def stage(self, *stages):
+        self.enter(*stages)
+        try:
+            yield
+        finally:
+            self.leave()
+
+    def add_cpu(self, name, seconds, threads=1):
+        """เพิ่มเวลา CPU ที่วัดจากที่อื่น (เช่น process ตรวจจับส่งกลับมาตอนปิด)"""
+        with self._lock:
+            self.cpu_time[name] += seconds
+            self.thread_counts[name] += threads
+
+    def add_process(self, stage, pid):
+        """ผูก process ลูกทั้ง process กับขั้นตอน และวัดเวลา CPU ของ process นั้นจาก /proc"""
+        try:
+            if self.cpus_for(stage) and HAS_AFFINITY:
+                os.sched_setaffinity(pid, self.cpus_for(stage))
+        except OSError as e:
+            log.warning("Cannot pin %s process %s: %s", stage, pid, e)
+        with self._lock:
+            self.processes[pid] = (stage, 0.0)
+
+    def _raise_priority(self):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.actuation_priority))
+        except (AttributeError, OSError) as e:
+            # ต้องเป็น root หรือมี CAP_SYS_NICE แจ้งครั้งเดียวแล้วไม่ลองอีก
+            log.warning("Cannot raise actuation priority (needs root or CAP_SYS_NICE): %s", e)
+            self.actuation_priority = 0
+
+    def usage(self):
+        """เวลา CPU ต่อขั้นตอน {ชื่อ: (วินาที CPU, จำนวน thread และ process)}"""
+        with self._lock:
+            for pid, (stage, _) in list(self.processes.items()):
+                try:
+                    self.processes[pid] = (stage, _process_cpu_seconds(pid))
+                except (OSError, ValueError, IndexError):
+                    pass  # process จบแล้ว ใช้ค่าล่าสุดที่อ่านได้
+            usage = {name: (seconds, self.thread_counts[name]) for name, seconds in self.cpu_time.items()}
+            for stage, seconds in self.processes.values():
+                total, count = usage.get(stage, (0.0, 0))
+                usage[stage] = (total + seconds, count + 1)
+        return usage
+
+    def report(self):
+        usage = self.usage()
+        if not usage:
+            return
+        elapsed = time.time() - self.start_time
+        print(f"CPU usage by stage over {elapsed:.1f} s:")
+        for name, (seconds, count) in sorted(usage.items()):
+            cpus = self.cpus_for(*name.split("+"))
+            where = f"cores {sorted(cpus)}" if cpus else "not pinned"
+            share = seconds / elapsed if elapsed > 0 else 0.0
+            print(f"  - {name:<18} {seconds:7.1f} s CPU  {share:6.1%} of one core  "
+                  f"({count} worker(s), {where})")
@@ -0,0 +1,293 @@
+import copy
+import json
+import os
+import threading
+import time
+
+from grade_table import GradeTable
+from inference_geometry import STRIDE
+
+# ค่าที่สามารถเปลี่ยนได้ขณะระบบทำงานผ่านไฟล์ config (grades และ pin ของ servo เปลี่ยนได้เฉพาะตอนเริ่มระบบ)
+RUNTIME_KEYS = (
+    "grades",
+    "size_thresholds",
+    "servo_configs",
+    "confidence_threshold",
+    "detection_interval",
+    "model_path",
+    "max_frame_age",
+    "reject_lane",
+    "inference_width",
+)
+
+SERVO_KEYS = ("pin", "initial_angle", "target_angle", "hold_time", "delay")
+
+FRAME_AGE_STAGES = ("inference", "actuation")
+
+
+class ConfigError(ValueError):
+    """ไฟล์ config ไม่ถูกต้อง"""
+
+
+def load_config_file(path):
+    """อ่านไฟล์ config (JSON) คืนค่าเป็น dict"""
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ConfigError(f"Invalid JSON in {path}: {e}")
+    if not isinstance(data, dict):
+        raise ConfigError(f"{path} must contain a JSON object")
+    return data
+
+
+def update_config_file(path, updates):
+    """รวมค่าใหม่เข้ากับไฟล์ config เดิมแล้วเขียนทับแบบ atomic"""
+    data = {}
+    if os.path.exists(path):
+        data = load_config_file(path)
+    data.update(updates)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    # os.replace ทำให้ watcher ไม่เห็นไฟล์ที่เขียนไม่ครบ
+    os.replace(tmp_path, path)
+
+
+def _number(value, name, minimum=None, maximum=None):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ConfigError(f"{name} must be a number, got {value!r}")
+    if minimum is not None and value < minimum:
+        raise ConfigError(f"{name} must be >= {minimum}, got {value}")
+    if maximum is not None and value > maximum:
+        raise ConfigError(f"{name} must be <= {maximum}, got {value}")
+    return value
+
+
+def validate_config(data, current, allow_pin_change=False):
+    """ตรวจสอบค่าจากไฟล์และรวมกับค่าปัจจุบัน คืนค่าชุดใหม่ที่ครบทุก key"""
+    unknown = set(data) - set(RUNTIME_KEYS)
+    if unknown:
+        raise ConfigError(f"Unknown config keys: {', '.join(sorted(unknown))}")
+
+    merged = copy.deepcopy(current)
+
+    if "grades" in data:
+        grades = data["grades"]
+        if (not isinstance(grades, list) or len(grades) < 2
+                or not all(isinstance(name, str) and name for name in grades)):
+            raise ConfigError("grades must be a list of at least two non-empty names, smallest first")
+        if len(set(grades)) != len(grades):
+            raise ConfigError(f"grades must be unique: {grades}")
+        if grades != list(merged["grades"]):
+            if not allow_pin_change:
+                raise ConfigError("grades cannot be changed while running (restart required)")
+            # ชุดเกรดใหม่: ทิ้ง threshold และ servo ของเกรดที่ไม่อยู่ในรายการ ที่เหลือต้องกำหนดในไฟล์
+            merged["grades"] = list(grades)
+            merged["size_thresholds"] = {name: value for name, value in merged["size_thresholds"].items()
+                                         if name in grades[:-1]}
+            merged["servo_configs"] = {name: config for name, config in merged["servo_configs"].items()
+                                       if name in grades}
+    grades = list(merged["grades"])
+
+    if "size_thresholds" in data:
+        thresholds = data["size_thresholds"]
+        if not isinstance(thresholds, dict):
+            raise ConfigError("size_thresholds must be an object")
+        new_thresholds = dict(merged["size_thresholds"])
+        for key, value in thresholds.items():
+            if key not in grades[:-1]:
+                raise ConfigError(f"Unknown size threshold: {key} (the largest grade has no threshold)")
+            new_thresholds[key] = float(_number(value, f"size_thresholds.{key}", minimum=0))
+        merged["size_thresholds"] = new_thresholds
+    try:
+        # ต้องมี threshold ครบ N-1 ค่าและเพิ่มขึ้นตามลำดับเกรด
+        GradeTable.from_thresholds(merged["size_thresholds"], grades)
+    except ValueError as e:
+        raise ConfigError(str(e))
+
+    if "servo_configs" in data:
+        servo_configs = data["servo_configs"]
+        if not isinstance(servo_configs, dict):
+            raise ConfigError("servo_configs must be an object")
+        for size, values in servo_configs.items():
+            if size not in grades:
+                raise ConfigError(f"Unknown servo: {size} (not in grades)")
+            if not isinstance(values, dict):
+                raise ConfigError(f"servo_configs.{size} must be an object")
+            # เกรดที่ไม่มี servo จะไม่ถูกดีดออก (ไหลไปท้ายสายพาน) การเพิ่ม servo ทำได้เฉพาะตอนเริ่มระบบ
+            config = dict(merged["servo_configs"].get(size, {}))
+            for key, value in values.items():
+                if key not in SERVO_KEYS:
+                    raise ConfigError(f"Unknown servo setting: servo_configs.{size}.{key}")
+                config[key] = value
+            missing = [key for key in SERVO_KEYS if key not in config]
+            if missing:
+                raise ConfigError(f"servo_configs.{size} is missing: {', '.join(missing)}")
+
+            name = f"servo_configs.{size}"
+            previous_pin = current["servo_configs"].get(size, {}).get("pin")
+            if config["pin"] != previous_pin and not allow_pin_change:
+                raise ConfigError(f"{name}.pin cannot be changed while running (restart required)")
+            _number(config["pin"], f"{name}.pin", minimum=1)
+            _number(config["initial_angle"], f"{name}.initial_angle", 0, 180)
+            _number(config["target_angle"], f"{name}.target_angle", 0, 180)
+            _number(config["hold_time"], f"{name}.hold_time", minimum=0)
+            _number(config["delay"], f"{name}.delay", minimum=0)
+            merged["servo_configs"][size] = config
+        pins = [config["pin"] for config in merged["servo_configs"].values()]
+        if len(set(pins)) != len(pins):
+            raise ConfigError(f"servo_configs use the same pin more than once: {sorted(pins)}")
+
+    if "confidence_threshold" in data:
+        merged["confidence_threshold"] = float(
+            _number(data["confidence_threshold"], "confidence_threshold", 0, 1))
+
+    if "detection_interval" in data:
+        merged["detection_interval"] = float(
+            _number(data["detection_interval"], "detection_interval", minimum=0))
+
+    if "model_path" in data:
+        model_path = data["model_path"]
+        if not isinstance(model_path, str) or not model_path:
+            raise ConfigError("model_path must be a non-empty string")
+        merged["model_path"] = model_path
+
+    if "inference_width" in data:
+        inference_width = data["inference_width"]
+        if isinstance(inference_width, bool) or not isinstance(inference_width, int) or inference_width % STRIDE:
+            raise ConfigError(f"inference_width must be a whole multiple of {STRIDE}, got {inference_width!r}")
+        merged["inference_width"] = _number(inference_width, "inference_width", minimum=2 * STRIDE, maximum=1920)
+
+    if "max_frame_age" in data:
+        max_frame_age = data["max_frame_age"]
+        if not isinstance(max_frame_age, dict):
+            raise ConfigError("max_frame_age must be an object")
+        new_ages = dict(merged["max_frame_age"])
+        for stage, value in max_frame_age.items():
+            if stage not in FRAME_AGE_STAGES:
+                raise ConfigError(f"Unknown max_frame_age stage: {stage} (use {', '.join(FRAME_AGE_STAGES)})")
+            new_ages[stage] = float(_number(value, f"max_frame_age.{stage}", minimum=0))
+        merged["max_frame_age"] = new_ages
+
+    if "reject_lane" in data:
+        merged["reject_lane"] = data["reject_lane"]
+    reject_lane = merged["reject_lane"]
+    if reject_lane is not None and reject_lane not in merged["servo_configs"]:
+        # null = กุ้งที่พลาดกำหนดเวลาไม่ถูกดีดออก (ไหลไปท้ายสายพาน)
+        raise ConfigError(f"reject_lane must be null or a grade with a servo, got {reject_lane!r}")
+
+    return merged
+
+
+def current_config(system):
+    """ดึงค่าที่ปรับได้ขณะทำงานจากระบบคัดแยก"""
+    return {
+        "grades": system.grades,
+        "size_thresholds": system.size_thresholds,
+        "servo_configs": system.servo_configs,
+        "confidence_threshold": system.confidence_threshold,
+        "detection_interval": system.detection_interval,
+        "model_path": system.model_path,
+        "max_frame_age": system.max_frame_age,
+        "reject_lane": system.reject_lane,
+        "inference_width": system.inference_width,
+    }
+
+
+def _assign(system, config, model):
+    system.grades = config["grades"]
+    system.size_thresholds = config["size_thresholds"]
+    system.servo_configs = config["servo_configs"]
+    system.confidence_threshold = config["confidence_threshold"]
+    system.detection_interval = config["detection_interval"]
+    system.model_path = config["model_path"]
+    system.max_frame_age = config["max_frame_age"]
+    system.reject_lane = config["reject_lane"]
+    system.inference_width = config["inference_width"]
+    system.model = model
+
+
+def apply_config(system, data, load_model, home_servo=None):
+    """ตรวจสอบและสลับค่าทั้งหมดพร้อมกันภายใต้ config_lock หากผิดพลาดจะคืนค่าเดิม"""
+    previous = current_config(system)
+    new_config = validate_config(data, previous)
+
+    # โหลดโมเดลใหม่นอก lock เพื่อไม่ให้ loop หลักต้องรอ ถ้าโหลดไม่ได้ค่าเดิมจะไม่ถูกแตะเลย
+    previous_model = system.model
+    new_model = previous_model
+    if new_config["model_path"] != previous["model_path"]:
+        new_model = load_model(new_config["model_path"])
+
+    with system.config_lock:
+        _assign(system, new_config, new_model)
+
+    # ย้าย servo ไปยังองศาเริ่มต้นใหม่ (ทำนอก lock เพราะต้องรอ servo เคลื่อนที่)
+    try:
+        if home_servo is not None:
+            for size, config in new_config["servo_configs"].items():
+                if config["initial_angle"] != previous["servo_configs"][size]["initial_angle"]:
+                    home_servo(size, config["initial_angle"])
+    except Exception:
+        # rollback ให้กลับเป็นค่าชุดเดิมทั้งหมด
+        with system.config_lock:
+            _assign(system, previous, previous_model)
+        if home_servo is not None:
+            for size, config in previous["servo_configs"].items():
+                home_servo(size, config["initial_angle"])
+        raise
+
+    return [key for key in RUNTIME_KEYS if new_config[key] != previous[key]]
+
+
+class ConfigWatcher:
+    """Thread เฝ้าดูไฟล์ config และนำค่าใหม่ไปใช้ทันทีเมื่อไฟล์เปลี่ยน"""
+
+    def __init__(self, path, on_change, poll_interval=0.1):
+        self.path = path
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.running = False
+        self.thread = None
+        self._last_signature = self._signature()
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._watch_loop, name="config_watcher")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+
+    def _watch_loop(self):
+        while self.running:
+            time.sleep(self.poll_interval)
+            signature = self._signature()
+            if signature is None or signature == self._last_signature:
+                continue
+            self._last_signature = signature
+
+            start = time.time()
+            try:
+                data = load_config_file(self.path)
+                changed = self.on_change(data)
+            except Exception as e:
+                print(f"Config reload rejected ({self.path}): {e}")
+                continue
+
+            elapsed_ms = (time.time() - start) * 1000
+            if changed:
+                print(f"Config reloaded in {elapsed_ms:.1f} ms: {', '.join(changed)}")
@@ -0,0 +1,165 @@
+import datetime
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+
+class SamplingProfiler:
+    """สุ่มเก็บ stack ของทุก thread เป็นระยะ แล้วเขียนไฟล์ collapsed stack (ใช้กับ flamegraph ได้ทันที)
+
+    การเขียนไฟล์ทำใน thread แยก การเก็บ stack จึงไม่หยุดระหว่างเขียน
+    รายงานการจองหน่วยความจำ (tracemalloc) ปิดเป็นค่าเริ่มต้น เพราะ snapshot ของ process ที่มี object
+    หลายแสนตัวใช้เวลาหลายวินาทีและถือ GIL ไว้ ใช้เฉพาะตอนหา memory leak
+    """
+
+    def __init__(self, output_dir="profiles", rate_hz=50, interval_minutes=5.0,
+                 alloc_top=0, alloc_frames=1, max_depth=64):
+        self.output_dir = output_dir
+        self.rate_hz = rate_hz
+        self.interval = interval_minutes * 60
+        self.alloc_top = alloc_top  # 0 = ไม่ติดตามการจองหน่วยความจำ
+        self.alloc_frames = alloc_frames
+        self.max_depth = max_depth
+
+        self.running = False
+        self.thread = None
+        self.stacks = Counter()
+        self.samples = 0
+        self.sample_time = 0.0  # เวลาที่ใช้ในการเก็บตัวอย่างเอง เพื่อรายงาน overhead
+        self.window_start = None
+        self.flush_count = 0
+        self._labels = {}  # cache ชื่อฟังก์ชันต่อ code object
+        self._lock = threading.Lock()
+        self._writer = None  # thread ที่กำลังเขียนไฟล์ของช่วงก่อนหน้า
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.alloc_top > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.alloc_frames)
+        self.running = True
+        self.window_start = time.time()
+        self.thread = threading.Thread(target=self._sample_loop, name="sampling_profiler")
+        self.thread.daemon = True
+        self.thread.start()
+        print(f"Sampling profiler started: {self.rate_hz} Hz, writing to {self.output_dir} "
+              f"every {self.interval / 60:.1f} min")
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        if self._writer:
+            self._writer.join()
+        self.flush()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _sample(self):
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+
+        with self._lock:
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                depth = 0
+                while frame is not None and depth < self.max_depth:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                    depth += 1
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stack.reverse()
+                self.stacks[";".join(stack)] += 1
+            self.samples += 1
+        # ปล่อย reference ของ frame ทันทีเพื่อไม่ให้ค้างหน่วยความจำ
+        del frames
+
+    def _sample_loop(self):
+        period = 1.0 / self.rate_hz
+        next_sample = time.monotonic()
+        next_flush = next_sample + self.interval
+
+        while self.running:
+            start = time.monotonic()
+            self._sample()
+            now = time.monotonic()
+            self.sample_time += now - start
+
+            # เขียนไฟล์ใน thread แยก ถ้าไฟล์ของช่วงก่อนยังเขียนไม่เสร็จให้เลื่อนไปก่อน
+            if now >= next_flush and (self._writer is None or not self._writer.is_alive()):
+                self._writer = threading.Thread(target=self.flush, name="profile_writer")
+                self._writer.daemon = True
+                self._writer.start()
+                next_flush = now + self.interval
+
+            # ตั้งเวลาตามรอบที่กำหนด ถ้าช้ากว่ากำหนดให้ข้ามไปรอบถัดไปแทนการเก็บถี่ขึ้น
+            next_sample += period
+            if next_sample < now:
+                next_sample = now + period
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+
+    def flush(self):
+        """เขียน stack ที่เก็บได้และสรุปการจองหน่วยความจำลงไฟล์ แล้วเริ่มช่วงเวลาใหม่"""
+        with self._lock:
+            stacks = self.stacks
+            samples = self.samples
+            sample_time = self.sample_time
+            self.stacks = Counter()
+            self.samples = 0
+            self.sample_time = 0.0
+        window_seconds = time.time() - self.window_start if self.window_start else 0
+        self.window_start = time.time()
+
+        # ใส่ลำดับไฟล์ต่อท้ายเพื่อไม่ให้ไฟล์ที่เขียนในวินาทีเดียวกันทับกัน
+        self.flush_count += 1
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + f"_{self.flush_count:04d}"
+        stack_filename = os.path.join(self.output_dir, f"profile_{timestamp}.folded")
+        try:
+            with open(stack_filename, "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+            overhead = (sample_time / window_seconds * 100) if window_seconds > 0 else 0
+            print(f"Profile saved to: {stack_filename} ({samples} samples, "
+                  f"sampler overhead {overhead:.2f}% of one core)")
+
+            if tracemalloc.is_tracing() and self.alloc_top > 0:
+                self._write_alloc_report(timestamp)
+        except Exception as e:
+            print(f"Error writing profile: {e}")
+
+    def _write_alloc_report(self, timestamp):
+        start = time.monotonic()
+        snapshot = tracemalloc.take_snapshot()
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        stats = snapshot.statistics("lineno")
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot_ms = (time.monotonic() - start) * 1000
+
+        alloc_filename = os.path.join(self.output_dir, f"alloc_{timestamp}.txt")
+        with open(alloc_filename, "w", encoding="utf-8") as f:
+            f.write(f"Traced memory: current {current / 1024 / 1024:.1f} MiB, "
+                    f"peak {peak / 1024 / 1024:.1f} MiB\n")
+            f.write(f"Snapshot of {len(snapshot.traces)} blocks took {snapshot_ms:.0f} ms\n")
+            f.write(f"Top {self.alloc_top} allocation sites:\n")
+            for i, stat in enumerate(stats[:self.alloc_top], 1):
+                f.write(f"{i:3d}. {stat}\n")
+        tracemalloc.reset_peak()
+        print(f"Allocation report saved to: {alloc_filename} (snapshot took {snapshot_ms:.0f} ms)")
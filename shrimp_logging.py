@@ -0,0 +1,161 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+
+ROOT_LOGGER = "shrimp"
+
+# ชื่อ attribute มาตรฐานของ LogRecord ใช้แยกค่าที่ส่งมาทาง extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+def get_logger(name):
+    """logger ของแต่ละส่วนของระบบ เช่น get_logger("servo") -> "shrimp.servo" """
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """ส่ง record เข้าคิวโดยไม่จัดรูปแบบข้อความใน thread ที่เรียก (listener thread จัดรูปแบบแทน)"""
+
+    def prepare(self, record):
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """ให้ข้อความที่ซ้ำกัน (logger, ระดับ และข้อความหลังใส่ค่าแล้วเหมือนกัน) ผ่านได้ไม่เกินหนึ่งครั้งต่อ interval วินาที
+
+    ข้อความที่มีค่าต่างกัน (เช่นเกรดหรือ ID ต่างกัน) ไม่ถูกนับรวมกัน และไม่จำกัดระดับ ERROR ขึ้นไป
+    เมื่อข้อความถูกปล่อยผ่านอีกครั้ง จะบอกจำนวนที่ถูกตัดไประหว่างนั้น
+    """
+
+    def __init__(self, interval=5.0):
+        super().__init__()
+        self.interval = interval
+        self._last = {}  # key -> (เวลาที่ปล่อยผ่านล่าสุด, จำนวนที่ถูกตัด)
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.interval <= 0 or record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = record.created
+        with self._lock:
+            last_time, suppressed = self._last.get(key, (None, 0))
+            if last_time is not None and now - last_time < self.interval:
+                self._last[key] = (last_time, suppressed + 1)
+                return False
+            self._last[key] = (now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(threadName)s] %(message)s")
+
+    def format(self, record):
+        text = super().format(record)
+        fields = {key: value for key, value in vars(record).items()
+                  if key not in _RECORD_ATTRS and key != "suppressed"}
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" ({suppressed} similar messages suppressed)"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """หนึ่งบรรทัดต่อหนึ่ง record พร้อมค่าจาก extra={...} เป็น field แยก"""
+
+    def format(self, record):
+        data = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def parse_module_levels(values):
+    """แปลง ["servo=DEBUG", "csv=WARNING"] เป็น {"servo": "DEBUG", "csv": "WARNING"}"""
+    levels = {}
+    for value in values or []:
+        name, sep, level = value.partition("=")
+        if not sep or not name or not level:
+            raise ValueError(f"Invalid module level {value!r}, expected name=LEVEL")
+        levels[name] = level.upper()
+    return levels
+
+
+def setup_logging(level="INFO", module_levels=None, rate_limit=5.0, log_format="text", log_file=None):
+    """ตั้งค่า logging แบบ asynchronous: thread ที่เรียก log แค่ใส่ record ลงคิว
+    ส่วนการจัดรูปแบบและเขียนออก stdout/ไฟล์ทำใน listener thread
+    """
+    global _listener
+    shutdown_logging()
+
+    formatter = JsonFormatter() if log_format == "json" else TextFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024,
+                                                             backupCount=5, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger(ROOT_LOGGER)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    # จำกัดข้อความซ้ำครั้งเดียวก่อนเข้าคิว ทุก handler จึงได้ record ชุดเดียวกัน
+    queue_handler = _LocalQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(rate_limit))
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+    root.propagate = False
+
+    for name, module_level in (module_levels or {}).items():
+        logger_name = name if name.startswith(f"{ROOT_LOGGER}.") else f"{ROOT_LOGGER}.{name}"
+        logging.getLogger(logger_name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """เขียนข้อความที่ค้างในคิวให้หมดแล้วหยุด listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def add_logging_arguments(parser):
+    parser.add_argument('--log-level', type=str, default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Default log level (per-shrimp messages are DEBUG)')
+    parser.add_argument('--log-module', type=str, action='append', default=[], metavar='NAME=LEVEL',
+                        help='Per-module log level, e.g. --log-module servo=DEBUG (repeatable)')
+    parser.add_argument('--log-rate-limit', type=float, default=5.0,
+                        help='Seconds between repeats of the same message, 0 disables (default: 5)')
+    parser.add_argument('--log-format', type=str, choices=['text', 'json'], default='text',
+                        help='Log line format')
+    parser.add_argument('--log-file', type=str, default=None, help='Also write logs to this rotating file')
+
+
+def setup_logging_from_args(args):
+    return setup_logging(args.log_level, parse_module_levels(args.log_module), args.log_rate_limit,
+                         args.log_format, args.log_file)
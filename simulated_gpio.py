@@ -0,0 +1,107 @@
+import csv
+import threading
+import time
+
+SERVO_MOVE_TIME = 0.5  # เวลาที่ servo ใช้หมุนไปถึงตำแหน่ง (เท่ากับที่ระบบคัดแยกรอ)
+
+
+class _SimulatedPWM:
+    def __init__(self, gpio, pin, frequency):
+        self.gpio = gpio
+        self.pin = pin
+        self.frequency = frequency
+        self.duty = 0
+
+    def start(self, duty):
+        self.duty = duty
+
+    def ChangeDutyCycle(self, duty):
+        self.duty = duty
+        if duty > 0:
+            # duty = 2 + angle / 18 แบบเดียวกับที่ระบบคัดแยกใช้
+            self.gpio.record_move(self.pin, (duty - 2) * 18)
+
+    def stop(self):
+        self.duty = 0
+
+
+class SimulatedGPIO:
+    """ใช้แทน RPi.GPIO บนเครื่องที่ไม่มี GPIO (โหมด --simulate) และบันทึกการหมุนของ servo ทุกครั้ง
+
+    รองรับเฉพาะส่วนที่ระบบคัดแยกใช้: setmode, setup, PWM, cleanup
+    """
+
+    BOARD = 10
+    BCM = 11
+    OUT = 0
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self.pin_labels = {}
+        self.moves = []  # (เวลา, pin, มุม)
+        self.commands = []  # (เวลา, ชื่อ servo, กรอบ) จากระบบคัดแยก ใช้จับคู่กับกุ้งในเฉลย
+        self.epoch = None  # เวลาของเฟรมแรก (เวลา 0 ของวิดีโอ)
+        self._lock = threading.Lock()
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pin, mode):
+        pass
+
+    def PWM(self, pin, frequency):
+        return _SimulatedPWM(self, pin, frequency)
+
+    def label_pins(self, labels):
+        """ตั้งชื่อ pin (เช่น {11: "small"}) เพื่อให้ log อ่านง่ายและใช้ประเมินผลได้"""
+        self.pin_labels.update(labels)
+
+    def set_epoch(self, timestamp=None):
+        self.epoch = time.time() if timestamp is None else timestamp
+
+    def record_move(self, pin, angle):
+        with self._lock:
+            self.moves.append((time.time(), pin, angle))
+
+    def record_command(self, label, box, timestamp):
+        """บันทึกคำสั่งคัดแยกพร้อมกรอบของกุ้ง (เรียกก่อนเริ่มหมุน servo ของคำสั่งนั้น)"""
+        with self._lock:
+            self.commands.append((timestamp, label, tuple(box)))
+
+    def actuations(self):
+        """การหมุนไปยังมุมคัดแยก (ไม่นับการตั้งค่าเริ่มต้นและการหมุนกลับ) เวลาทั้งหมดเทียบกับเฟรมแรก
+
+        คืนค่า [(เวลาที่ servo เริ่มหมุน, ชื่อ servo, เวลาที่สั่ง, กรอบ)] มุมแรกที่แต่ละ pin ได้รับคือมุมเริ่มต้น
+        จากการ home servo การหมุนไปมุมอื่นนับเป็นการคัดแยกหนึ่งครั้ง และจับคู่กับคำสั่งของ servo นั้นตามลำดับ
+        """
+        epoch = self.epoch or 0.0
+        home_angles = {}
+        with self._lock:
+            moves = list(self.moves)
+            commands = list(self.commands)
+        pending = {}
+        for command in commands:
+            pending.setdefault(command[1], []).append(command)
+
+        result = []
+        for timestamp, pin, angle in moves:
+            home = home_angles.setdefault(pin, angle)
+            if abs(angle - home) <= 1e-6 or (self.epoch is not None and timestamp < self.epoch):
+                continue
+            label = self.pin_labels.get(pin, str(pin))
+            queue = pending.get(label)
+            command_time, _, box = queue.pop(0) if queue else (timestamp, label, None)
+            result.append((timestamp - epoch, label, command_time - epoch, box))
+        return result
+
+    def cleanup(self):
+        """เขียน log การคัดแยกลงไฟล์ (ถ้ากำหนด)"""
+        if not self.log_path:
+            return
+        with open(self.log_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["video_time", "servo", "command_time", "x1", "y1", "x2", "y2"])
+            for video_time, label, command_time, box in self.actuations():
+                coords = [f"{value:.1f}" for value in box] if box else ["", "", "", ""]
+                writer.writerow([f"{video_time:.4f}", label, f"{command_time:.4f}"] + coords)
+        print(f"Simulated actuations saved to: {self.log_path}")
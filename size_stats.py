@@ -0,0 +1,286 @@
+import argparse
+import json
+import math
+import socket
+import threading
+import time
+
+
+class RunningStats:
+    """ค่าเฉลี่ยและความแปรปรวนแบบ streaming (Welford) รวมข้ามหน้าต่างเวลาได้"""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """รวมสถิติอีกชุดเข้ามา (สูตรของ Chan)"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count > 0 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2,
+                "min": self.min if self.count else None, "max": self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count = data["count"]
+        stats.mean = data["mean"]
+        stats.m2 = data["m2"]
+        if stats.count:
+            stats.min = data["min"]
+            stats.max = data["max"]
+        return stats
+
+
+class AreaSketch:
+    """Quantile sketch แบบ log-bucket (ความคลาดเคลื่อนสัมพัทธ์คงที่) รวมกันได้แบบไม่สูญเสีย
+
+    พื้นที่ในเฟรม 640x480 มีได้ไม่เกิน ~630 bucket ที่ความแม่นยำ 1% หน่วยความจำจึงจำกัดเสมอ
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0  # ค่าที่ <= 1 pixel²
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 1:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # จุดกึ่งกลางของ bucket (ค่าคลาดเคลื่อนไม่เกิน relative_accuracy)
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_dict(self):
+        return {"alpha": self.relative_accuracy, "zero": self.zero_count,
+                "buckets": {str(index): count for index, count in self.buckets.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["alpha"])
+        sketch.zero_count = data["zero"]
+        sketch.buckets = {int(index): count for index, count in data["buckets"].items()}
+        sketch.count = sketch.zero_count + sum(sketch.buckets.values())
+        return sketch
+
+
+class SizeSummary:
+    """สถิติของพื้นที่กุ้งหนึ่งขนาดในหนึ่งช่วงเวลา"""
+
+    def __init__(self, relative_accuracy=0.01):
+        self.stats = RunningStats()
+        self.sketch = AreaSketch(relative_accuracy)
+
+    def add(self, area):
+        self.stats.add(area)
+        self.sketch.add(area)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    def to_dict(self):
+        return {"stats": self.stats.to_dict(), "sketch": self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data["sketch"]["alpha"])
+        summary.stats = RunningStats.from_dict(data["stats"])
+        summary.sketch = AreaSketch.from_dict(data["sketch"])
+        return summary
+
+
+class WindowedSizeStats:
+    """สะสมสถิติพื้นที่ต่อขนาดกุ้งทีละช่วงเวลา แล้วเขียนสรุปต่อท้ายไฟล์ rollup (JSON lines)
+
+    หลัง start() จะมี thread คอยเขียนช่วงที่หมดเวลาแล้ว ช่วงสุดท้ายจึงถูกบันทึกแม้สายพานว่าง
+    """
+
+    def __init__(self, path, sizes, window_seconds=60, relative_accuracy=0.01, station=None):
+        self.path = path
+        self.sizes = tuple(sizes)
+        self.window_seconds = window_seconds
+        self.relative_accuracy = relative_accuracy
+        self.station = station or socket.gethostname()
+        self.window_start = None
+        self.summaries = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._flush_loop, name="size_stats")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _flush_loop(self):
+        # ตรวจบ่อยกว่าความยาวช่วง ช่วงที่หมดเวลาจึงถูกเขียนช้าไม่เกินไม่กี่วินาที
+        while not self.stop_event.wait(min(5.0, self.window_seconds)):
+            self.flush_expired()
+
+    def flush_expired(self, now=None):
+        """เขียนช่วงปัจจุบันลงไฟล์ถ้าหมดเวลาแล้ว (ไม่ต้องรอกุ้งตัวถัดไป)"""
+        now = time.time() if now is None else now
+        with self.lock:
+            if self.window_start is not None and now >= self.window_start + self.window_seconds:
+                self._flush()
+
+    def _new_window(self, window_start):
+        self.window_start = window_start
+        self.summaries = {size: SizeSummary(self.relative_accuracy) for size in self.sizes}
+
+    def add(self, shrimp_size, area, timestamp=None):
+        """เพิ่มกุ้งหนึ่งตัว ถ้าข้ามไปช่วงเวลาใหม่จะเขียนสรุปช่วงก่อนหน้าลงไฟล์"""
+        if timestamp is None:
+            timestamp = time.time()
+        window_start = math.floor(timestamp / self.window_seconds) * self.window_seconds
+        with self.lock:
+            if window_start != self.window_start:
+                self._flush()
+                self._new_window(window_start)
+            self.summaries[shrimp_size].add(area)
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self.summaries is None or not any(s.stats.count for s in self.summaries.values()):
+            return
+        record = {
+            "station": self.station,
+            "window_start": self.window_start,
+            "window_end": self.window_start + self.window_seconds,
+            "sizes": {size: summary.to_dict() for size, summary in self.summaries.items()}
+        }
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            print(f"Error writing size statistics: {e}")
+        self.summaries = None
+        self.window_start = None
+
+    def close(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+
+def local_period_start(timestamp, period_seconds=86400):
+    """จุดเริ่มของช่วง (ต้นชั่วโมง/เที่ยงคืน) ตามเวลาท้องถิ่นที่ timestamp อยู่ period_seconds ต้องหาร 86400 ลงตัว"""
+    local = time.localtime(timestamp)
+    midnight = time.mktime((local.tm_year, local.tm_mon, local.tm_mday, 0, 0, 0, 0, 0, -1))
+    seconds_into_day = local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec
+    return int(midnight) + seconds_into_day // period_seconds * period_seconds
+
+
+def merge_rollups(paths, period_seconds=86400):
+    """รวมไฟล์ rollup หลายไฟล์ (หลายเครื่อง/หลายช่วงเวลา) เป็นสรุปตามช่วงที่กำหนด (ตามวัน/ชั่วโมงของเวลาท้องถิ่น)"""
+    merged = {}
+    stations = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                period = local_period_start(record["window_start"], period_seconds)
+                stations.setdefault(period, set()).add(record.get("station", "unknown"))
+                period_sizes = merged.setdefault(period, {})
+                for size, data in record["sizes"].items():
+                    summary = SizeSummary.from_dict(data)
+                    if size in period_sizes:
+                        period_sizes[size].merge(summary)
+                    else:
+                        period_sizes[size] = summary
+    return merged, stations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge shrimp size rollup files into periodic reports')
+    parser.add_argument('rollups', nargs='+', help='Rollup files (JSON lines) from one or more stations')
+    parser.add_argument('--period', choices=['hour', 'day'], default='day', help='Report period')
+    args = parser.parse_args()
+
+    period_seconds = 3600 if args.period == 'hour' else 86400
+    merged, stations = merge_rollups(args.rollups, period_seconds)
+
+    for period in sorted(merged):
+        label = time.strftime("%Y-%m-%d %H:%M" if args.period == 'hour' else "%Y-%m-%d", time.localtime(period))
+        print(f"\n{label} (stations: {', '.join(sorted(stations[period]))})")
+        print(f"  {'size':<8} {'count':>7} {'mean':>10} {'std':>10} {'p10':>10} {'p50':>10} {'p90':>10}")
+        for size, summary in merged[period].items():
+            stats = summary.stats
+            if stats.count == 0:
+                continue
+            p10, p50, p90 = (summary.sketch.quantile(q) for q in (0.1, 0.5, 0.9))
+            print(f"  {size:<8} {stats.count:>7} {stats.mean:>10.1f} {stats.std:>10.1f} "
+                  f"{p10:>10.1f} {p50:>10.1f} {p90:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+from grade_table import GradeTable
+
+# ผลการตรวจจับหนึ่งกล่อง box = (x1, y1, x2, y2) เป็นพิกัดในเฟรม
+Detection = namedtuple("Detection", ["track_id", "class_name", "confidence", "box"])
+
+# คำสั่งให้ servo ของขนาดนั้นทำงาน (box คือตำแหน่งกุ้งในเฟรมที่ตัดสินใจ)
+ActuationCommand = namedtuple("ActuationCommand", ["shrimp_size", "track_id", "timestamp", "box"])
+
+# ข้อมูลสำหรับบันทึก (processed=False เมื่อเจอครั้งแรก, True เมื่อสั่งคัดแยกแล้ว)
+LogEvent = namedtuple("LogEvent", [
+    "class_name", "shrimp_size", "track_id", "confidence", "box", "processed", "timestamp"
+])
+
+# กุ้งที่เห็นในเฟรมล่าสุด สำหรับวาดบนหน้าจอ
+TrackView = namedtuple("TrackView", [
+    "track_id", "class_name", "shrimp_size", "confidence", "box", "processed"
+])
+
+# สถานะที่เผยแพร่ให้ผู้อ่าน (หน้าจอ, metrics) สร้างใหม่ทุกเฟรมและไม่ถูกแก้ไขอีก
+# ผู้อ่านจึงอ่านได้โดยไม่ต้องล็อค ขณะที่ thread ประมวลผลสร้างชุดถัดไป
+SortingSnapshot = namedtuple("SortingSnapshot", [
+    "tracks", "counts", "size_thresholds", "threshold_label", "fps", "timestamp"
+])
+
+
+def box_area(box):
+    """พื้นที่ของกรอบ (pixels²) ปัดพิกัดเป็นจำนวนเต็มแบบเดียวกับที่ใช้แยกขนาด"""
+    x1, y1, x2, y2 = map(int, box)
+    return (x2 - x1) * (y2 - y1)
+
+
+def detections_from_results(results, names):
+    """แปลงผลลัพธ์ YOLO เป็นรายการ Detection (ข้ามกล่องที่ยังไม่มี track id)"""
+    detections = []
+    if not results:
+        return detections
+
+    for result in results:
+        boxes = result.boxes
+        if boxes is None or boxes.id is None:
+            continue
+        # ดึงค่าทั้งชุดครั้งเดียวแทนการอ่าน tensor ทีละกล่อง
+        for box, track_id, cls, conf in zip(
+            boxes.xyxy.tolist(),
+            boxes.id.int().tolist(),
+            boxes.cls.int().tolist(),
+            boxes.conf.tolist()
+        ):
+            detections.append(Detection(track_id, names[cls], conf, tuple(box)))
+    return detections
+
+
+class SortingEngine:
+    """ตรรกะการคัดแยกขนาดกุ้งที่ไม่ขึ้นกับ GPIO กล้อง หรือโมเดล"""
+
+    def __init__(self, size_thresholds, sizes, frame_width, frame_height,
+                 confidence_threshold=0.6, stale_timeout=0.5):
+        self.grades = tuple(sizes)  # ชื่อเกรดเรียงจากเล็กไปใหญ่ (เกรดสุดท้ายไม่มี threshold)
+        self.size_thresholds = size_thresholds
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.confidence_threshold = confidence_threshold
+        self.stale_timeout = stale_timeout  # เวลาที่ไม่เห็นวัตถุก่อนลบออกจากการติดตาม (วินาที)
+
+        self.shrimp_counts = {size: 0 for size in self.grades}
+        self.tracked_objects = {}  # เก็บข้อมูลวัตถุที่กำลังติดตาม
+        self.frame_tracks = ()  # กุ้งที่เห็นในเฟรมล่าสุด (TrackView)
+        self.last_timestamp = None
+        self._grade_table = None
+        self._grade_source = None  # dict size_thresholds ที่ใช้สร้าง _grade_table
+        self._threshold_label = ""  # ข้อความเกณฑ์แบบสั้นสำหรับหน้าจอ สร้างพร้อม _grade_table
+
+    @property
+    def grade_table(self):
+        """GradeTable ของ size_thresholds ปัจจุบัน (สร้างใหม่เฉพาะเมื่อ size_thresholds ถูกแทนที่ด้วย dict ใหม่)"""
+        self._refresh_grade_table()
+        return self._grade_table
+
+    @property
+    def threshold_label(self):
+        """ข้อความเกณฑ์ขนาดแบบสั้นของ size_thresholds ปัจจุบัน (cache เดียวกับ grade_table)"""
+        self._refresh_grade_table()
+        return self._threshold_label
+
+    def _refresh_grade_table(self):
+        if self._grade_source is not self.size_thresholds:
+            self._grade_table = GradeTable.from_thresholds(self.size_thresholds, self.grades)
+            self._threshold_label = self._grade_table.describe(short=True)
+            self._grade_source = self.size_thresholds
+
+    def classify_area(self, area):
+        """แปลงพื้นที่ (pixels²) เป็นขนาดกุ้ง"""
+        return self.grade_table.classify(area)
+
+    def determine_shrimp_size(self, box):
+        """คำนวณขนาดของกุ้งจากพื้นที่ของกรอบ"""
+        return self.classify_area(box_area(box))
+
+    def is_object_in_frame(self, box):
+        """ตรวจสอบว่าวัตถุอยู่ในเฟรมหรือไม่"""
+        x1, y1, x2, y2 = map(int, box)
+        return (0 <= x1 <= self.frame_width and
+                0 <= x2 <= self.frame_width and
+                0 <= y1 <= self.frame_height and
+                0 <= y2 <= self.frame_height)
+
+    def step(self, detections, timestamp):
+        """ประมวลผลการตรวจจับของหนึ่งเฟรม คืนค่า (คำสั่ง servo, รายการบันทึก)"""
+        commands = []
+        events = []
+        active_tracks = set()  # เก็บ ID ที่เจอในเฟรมปัจจุบัน
+        frame_tracks = []
+        tracked_objects = self.tracked_objects
+
+        for detection in detections:
+            # ตรวจสอบความเชื่อมั่น
+            if detection.confidence < self.confidence_threshold:
+                continue
+
+            box = detection.box
+            shrimp_size = self.determine_shrimp_size(box)
+            unique_id = f"{detection.class_name}_{detection.track_id}"
+
+            # ตรวจสอบว่าวัตถุอยู่ในเฟรมหรือไม่
+            if not self.is_object_in_frame(box):
+                tracked_objects.pop(unique_id, None)
+                continue
+
+            active_tracks.add(unique_id)
+
+            tracked = tracked_objects.get(unique_id)
+            if tracked is None:
+                # วัตถุใหม่หรือวัตถุที่กลับเข้ามาในเฟรม
+                tracked = {
+                    'class': detection.class_name,
+                    'size': shrimp_size,
+                    'last_seen': timestamp,
+                    'processed': False,
+                    'box': box  # เก็บข้อมูล bounding box ล่าสุด
+                }
+                tracked_objects[unique_id] = tracked
+                events.append(LogEvent(detection.class_name, shrimp_size, detection.track_id,
+                                       detection.confidence, box, False, timestamp))
+            else:
+                # อัพเดตขนาดและเวลาที่เห็นล่าสุด และตำแหน่งล่าสุด
+                tracked['size'] = shrimp_size
+                tracked['last_seen'] = timestamp
+                tracked['box'] = box
+
+            # ประมวลผลวัตถุที่ยังไม่ได้ประมวลผล
+            if not tracked['processed']:
+                tracked['processed'] = True
+                self.shrimp_counts[shrimp_size] += 1
+                commands.append(ActuationCommand(shrimp_size, detection.track_id, timestamp, box))
+                events.append(LogEvent(detection.class_name, shrimp_size, detection.track_id,
+                                       detection.confidence, box, True, timestamp))
+
+            frame_tracks.append(TrackView(detection.track_id, detection.class_name, shrimp_size,
+                                          detection.confidence, box, tracked['processed']))
+
+        # ลบวัตถุที่ไม่ได้เจอในเฟรมปัจจุบันและไม่ได้เห็นมานาน
+        for unique_id in list(tracked_objects.keys()):
+            if (unique_id not in active_tracks and
+                    timestamp - tracked_objects[unique_id]['last_seen'] > self.stale_timeout):
+                del tracked_objects[unique_id]
+
+        self.frame_tracks = tuple(frame_tracks)
+        self.last_timestamp = timestamp
+        return commands, events
+
+    def snapshot(self, fps=0.0):
+        """สร้างสถานะชุดใหม่ที่แก้ไขไม่ได้ (ยอดนับถูกคัดลอก) ให้ผู้อ่านใน thread อื่น"""
+        return SortingSnapshot(
+            self.frame_tracks,
+            MappingProxyType(dict(self.shrimp_counts)),
+            MappingProxyType(dict(self.size_thresholds)),
+            self.threshold_label,
+            fps,
+            self.last_timestamp
+        )
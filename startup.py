@@ -0,0 +1,102 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+def load_model(model_path):
+    """import ultralytics เมื่อต้องใช้จริงเท่านั้น แล้วโหลดโมเดล YOLO"""
+    from ultralytics import YOLO
+    return YOLO(model_path)
+
+
+def warm_up_model(model, width, height, runs=2, conf=0.6):
+    """รันโมเดลกับเฟรมว่างขนาด inference (width x height) เพื่อจ่ายค่าสร้าง graph และจองหน่วยความจำก่อนเฟรมจริง"""
+    dummy = np.zeros((height, width, 3), dtype=np.uint8)
+    for _ in range(runs):
+        # ใช้ predict แทน track เพื่อไม่ให้ tracker เก็บสถานะจากเฟรมว่าง
+        model.predict(dummy, imgsz=(height, width), conf=conf, verbose=False)
+    return model
+
+
+class StartupTimer:
+    """จับเวลาแต่ละขั้นตอนตอนเริ่มระบบ (บางขั้นตอนทำงานพร้อมกัน)"""
+
+    def __init__(self, launch_time=None):
+        self.launch_time = launch_time if launch_time is not None else time.perf_counter()
+        self.phases = []
+        self.marks = {}
+        self.lock = threading.Lock()
+
+    def elapsed(self):
+        return time.perf_counter() - self.launch_time
+
+    @contextmanager
+    def phase(self, name):
+        start = self.elapsed()
+        try:
+            yield
+        finally:
+            end = self.elapsed()
+            with self.lock:
+                self.phases.append((name, start, end))
+
+    def mark(self, name):
+        """บันทึกเวลาที่เกิดเหตุการณ์ครั้งแรก คืนค่า True ถ้าเพิ่งบันทึก"""
+        with self.lock:
+            if name in self.marks:
+                return False
+            self.marks[name] = self.elapsed()
+            return True
+
+    def report(self):
+        print("Startup timing (seconds since launch):")
+        with self.lock:
+            phases = sorted(self.phases, key=lambda p: p[1])
+            marks = sorted(self.marks.items(), key=lambda m: m[1])
+        for name, start, end in phases:
+            print(f"  - {name:<14} {start:6.2f} -> {end:6.2f}  ({end - start:.2f} s)")
+        for name, at in marks:
+            print(f"  - {name:<14} at {at:.2f}")
+
+
+class BackgroundModelLoader:
+    """โหลดและ warm-up โมเดลใน thread แยก ระหว่างที่ตั้งค่า servo และกล้อง"""
+
+    def __init__(self, model_path, input_size, timer, warmup_runs=2, conf=0.6, resources=None):
+        self.model_path = model_path
+        self.input_size = input_size  # (กว้าง, สูง) ของภาพที่ส่งเข้าโมเดล
+        self.timer = timer
+        self.warmup_runs = warmup_runs
+        self.conf = conf
+        self.resources = resources  # ResourcePlanner: โหลดบน core ของ inference เพื่อให้ thread pool ของ torch อยู่ที่นั่น
+        self.model = None
+        self.error = None
+        self.thread = threading.Thread(target=self._load, name="model_loader")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _load(self):
+        if self.resources:
+            self.resources.enter("inference")
+        try:
+            with self.timer.phase("model_load"):
+                model = load_model(self.model_path)
+            if self.warmup_runs > 0:
+                with self.timer.phase("warm_up"):
+                    width, height = self.input_size
+                    warm_up_model(model, width, height, self.warmup_runs, self.conf)
+            self.model = model
+        except Exception as e:
+            self.error = e
+        finally:
+            if self.resources:
+                self.resources.leave()
+
+    def wait(self):
+        """รอจนโมเดลพร้อมใช้งาน"""
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.model
@@ -0,0 +1,83 @@
+import json
+import os
+
+import numpy as np
+
+from inference_geometry import REFERENCE_FRAME_SIZE
+from size_stats import RunningStats
+from threshold_optimizer import counts_from_histograms
+
+
+class StreamingCalibration:
+    """สะสมสถิติและ histogram ของพื้นที่กุ้งทีละภาพ ใช้หน่วยความจำคงที่ไม่ขึ้นกับจำนวนภาพ
+
+    histogram ใช้ bin กว้างเท่ากันตั้งแต่ 0 ถึง max_area (เฟรมอ้างอิง 640x480 พื้นที่ไม่เกิน 307,200 pixels²)
+    threshold ที่หาได้จึงละเอียดเท่ากับความกว้างของ bin
+    """
+
+    def __init__(self, sizes, bin_width=16, max_area=REFERENCE_FRAME_SIZE[0] * REFERENCE_FRAME_SIZE[1]):
+        self.sizes = tuple(sizes)
+        self.bin_width = bin_width
+        self.num_bins = max_area // bin_width + 1
+        self.stats = {size: RunningStats() for size in self.sizes}
+        self.histograms = np.zeros((len(self.sizes), self.num_bins), dtype=np.int64)
+        self.processed = set()  # ไฟล์ที่ประมวลผลแล้ว ใช้ข้ามเมื่อทำต่อจาก checkpoint
+
+    def add(self, size, area):
+        self.stats[size].add(area)
+        index = min(int(area) // self.bin_width, self.num_bins - 1)
+        self.histograms[self.sizes.index(size), index] += 1
+
+    def mark_processed(self, image_path):
+        self.processed.add(os.path.abspath(image_path))
+
+    def is_processed(self, image_path):
+        return os.path.abspath(image_path) in self.processed
+
+    def bin_edges(self):
+        return np.arange(self.num_bins + 1, dtype=np.float64) * self.bin_width
+
+    def threshold_counts(self):
+        """ข้อมูลสำหรับ threshold_optimizer (จุดตัดอยู่ที่ขอบ bin)"""
+        return counts_from_histograms(self.bin_edges(), self.histograms)
+
+    def save(self, path):
+        """บันทึก checkpoint แบบ atomic (เขียนไฟล์ชั่วคราวแล้วแทนที่) ไฟล์เดิมไม่เสียแม้เครื่องดับระหว่างเขียน"""
+        data = {
+            "bin_width": self.bin_width,
+            "num_bins": self.num_bins,
+            "sizes": list(self.sizes),
+            "processed": sorted(self.processed),
+            "stats": {size: stats.to_dict() for size, stats in self.stats.items()},
+            # เก็บเฉพาะ bin ที่มีค่า histogram ส่วนใหญ่เป็นศูนย์
+            "histograms": {
+                size: {str(index): int(self.histograms[k, index])
+                       for index in np.flatnonzero(self.histograms[k])}
+                for k, size in enumerate(self.sizes)
+            }
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, sizes, bin_width):
+        """โหลด checkpoint ค่า bin_width ต้องตรงกับตอนที่บันทึก"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data["bin_width"] != bin_width or list(data["sizes"]) != list(sizes):
+            raise ValueError(f"Checkpoint {path} was created with bin width {data['bin_width']} "
+                             f"and sizes {data['sizes']}")
+
+        calibration = cls(sizes, bin_width)
+        if data["num_bins"] != calibration.num_bins:
+            raise ValueError(f"Checkpoint {path} has {data['num_bins']} bins, expected {calibration.num_bins}")
+        calibration.processed = set(data["processed"])
+        for k, size in enumerate(calibration.sizes):
+            calibration.stats[size] = RunningStats.from_dict(data["stats"][size])
+            for index, count in data["histograms"][size].items():
+                calibration.histograms[k, int(index)] = count
+        return calibration
@@ -0,0 +1,379 @@
+import argparse
+import csv
+import random
+
+import cv2
+import numpy as np
+
+from grade_table import DEFAULT_GRADES, GradeTable
+from runtime_config import load_config_file
+from simulated_gpio import SERVO_MOVE_TIME
+
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+DEFAULT_THRESHOLDS = {"small": 32519.3, "medium": 48045.8}
+
+TRUTH_FIELDS = ['shrimp_id', 'shrimp_size', 'area', 'width', 'height', 'y',
+                'enter_time', 'exit_time', 'gate_time', 'rate']
+
+BELT_COLOR = (70, 70, 70)
+SHRIMP_COLOR = (150, 180, 230)  # BGR สีชมพูอมส้ม
+
+
+def area_ranges(size_thresholds, margin=0.05, grades=DEFAULT_GRADES):
+    """ช่วงพื้นที่กรอบ (pixels²) ของแต่ละเกรด เว้นระยะ margin จาก threshold เพื่อให้ขนาดจริงชัดเจน"""
+    ranges = {}
+    for grade, lower, upper in GradeTable.from_thresholds(size_thresholds, grades).ranges():
+        low = lower * (1 + margin) if lower is not None else upper * 0.55
+        high = upper * (1 - margin) if upper is not None else lower * 1.35
+        ranges[grade] = (low, high)
+    return ranges
+
+
+def plan_shrimp(duration, rate_start, rate_end, belt_speed, size_thresholds, min_gap=20,
+                gate_distance=200, aspect=(1.6, 2.4), size_mix=None, seed=0, grades=DEFAULT_GRADES):
+    """สุ่มกุ้งที่วิ่งบนสายพาน (ซ้ายไปขวา) โดยอัตรา (ตัว/วินาที) เพิ่มจาก rate_start ถึง rate_end แบบเส้นตรง
+
+    enter_time คือเวลาที่กุ้งเข้ามาในเฟรมครบทั้งตัว, exit_time คือเวลาที่เริ่มออกจากเฟรม
+    gate_time คือเวลาที่หัวกุ้งถึงประตูคัดแยกซึ่งอยู่ห่างจากขอบขวาของเฟรม gate_distance pixels
+    กุ้งที่อยู่ในแนวเดียวกัน (ช่วง y ซ้อนกัน) ห่างกันอย่างน้อย min_gap pixels อัตราจริงจึงอาจต่ำกว่าที่ขอเมื่อสายพานแน่น
+    """
+    rng = random.Random(seed)
+    ranges = area_ranges(size_thresholds, grades=grades)
+    sizes = list(ranges)
+    weights = [size_mix.get(size, 0) for size in sizes] if size_mix else None
+
+    shrimp = []
+    t = 0.0
+    while True:
+        rate = rate_start + (rate_end - rate_start) * min(t / duration, 1.0)
+        t += rng.expovariate(rate) if rate > 0 else duration
+
+        size = rng.choices(sizes, weights)[0]
+        area = rng.uniform(*ranges[size])
+        ratio = rng.uniform(*aspect)
+        width = int(round((area * ratio) ** 0.5))
+        height = int(round(area / width))
+        if width >= FRAME_WIDTH or height >= FRAME_HEIGHT:
+            continue
+
+        # กรอบขวาของตัวนี้ต้องตามหลังกรอบซ้ายของตัวก่อนหน้าที่อยู่แนวเดียวกันอย่างน้อย min_gap
+        y = rng.randint(0, FRAME_HEIGHT - height)
+        for other in shrimp[-8:]:
+            if y < other["y"] + other["height"] + min_gap and other["y"] < y + height + min_gap:
+                t = max(t, other["enter_time"] + (width + min_gap) / belt_speed)
+        if t >= duration:
+            break
+
+        enter_time = t
+        shrimp.append({
+            "shrimp_id": len(shrimp) + 1,
+            "shrimp_size": size,
+            "area": width * height,
+            "width": width,
+            "height": height,
+            "y": y,
+            "enter_time": enter_time,
+            "exit_time": enter_time + (FRAME_WIDTH - width) / belt_speed,
+            "gate_time": enter_time + (FRAME_WIDTH + gate_distance - width) / belt_speed,
+            "rate": rate
+        })
+    return shrimp
+
+
+def _shrimp_sprite(width, height):
+    """ภาพกุ้งสังเคราะห์ (ลำตัววงรีโค้ง หาง และปล้อง) ที่เต็มกรอบพอดี คืนค่า (ภาพ, mask)"""
+    sprite = np.zeros((height, width, 3), dtype=np.uint8)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    body_width = int(width * 0.82)
+    center = (width - body_width // 2 - 1, height // 2)
+    axes = (max(1, body_width // 2), max(1, height // 2 - 1))
+    tail = np.array([[0, 0], [width - body_width + 2, height // 2], [0, height - 1]], dtype=np.int32)
+    for target, color in ((sprite, SHRIMP_COLOR), (mask, 255)):
+        cv2.ellipse(target, center, axes, 0, 0, 360, color, -1)
+        cv2.fillPoly(target, [tail], color)
+    # ปล้องบนลำตัว
+    for i in range(1, 6):
+        x = width - body_width + i * body_width // 6
+        cv2.line(sprite, (x, height // 5), (x, height - height // 5), (120, 150, 200), 2)
+    sprite[mask == 0] = 0
+    return sprite, mask
+
+
+def load_crop_library(archive_dir, per_size=200):
+    """ภาพกุ้งจริงจากคลัง crop ของระบบคัดแยก (ใช้แทนภาพสังเคราะห์เพื่อให้โมเดล YOLO ตรวจจับได้)
+
+    ตัดขอบที่คลังเผื่อไว้รอบกรอบออก ให้ภาพพอดีกรอบ ภาพที่ถูกตัดขอบเฟรมไม่เท่ากันจะถูกข้าม
+    """
+    from crop_archive import CropArchiveReader
+
+    reader = CropArchiveReader(archive_dir)
+    library = {}
+    for record in reader.iter_crops():
+        crops = library.setdefault(record.shrimp_size, [])
+        if len(crops) >= per_size:
+            continue
+        image = cv2.imdecode(np.frombuffer(record.jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        x1, y1, x2, y2 = map(int, record.box)
+        pad_x = image.shape[1] - (x2 - x1)
+        pad_y = image.shape[0] - (y2 - y1)
+        if pad_x < 0 or pad_y < 0 or pad_x % 2 or pad_y % 2:
+            continue
+        image = image[pad_y // 2:image.shape[0] - pad_y // 2, pad_x // 2:image.shape[1] - pad_x // 2]
+        if image.size:
+            crops.append(image)
+    return library
+
+
+def render_video(path, shrimp, duration, fps, belt_speed, crop_library=None, seed=0):
+    """เขียนวิดีโอสายพานสังเคราะห์ตามรายการกุ้ง"""
+    rng = random.Random(seed)
+    sprites = {}
+    for item in shrimp:
+        crops = crop_library.get(item["shrimp_size"]) if crop_library else None
+        if crops:
+            image = cv2.resize(rng.choice(crops), (item["width"], item["height"]), interpolation=cv2.INTER_AREA)
+            sprites[item["shrimp_id"]] = (image, None)
+        else:
+            sprites[item["shrimp_id"]] = _shrimp_sprite(item["width"], item["height"])
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (FRAME_WIDTH, FRAME_HEIGHT))
+    if not writer.isOpened():
+        raise IOError(f"Cannot open video writer for {path}")
+
+    frame = np.empty((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+    ordered = sorted(shrimp, key=lambda item: item["enter_time"])
+    first = 0
+    try:
+        for index in range(int(duration * fps)):
+            t = index / fps
+            frame[:] = BELT_COLOR
+            # แถบบนสายพานที่เลื่อนไปพร้อมกุ้ง
+            offset = int(belt_speed * t) % 40
+            for x in range(offset, FRAME_WIDTH, 40):
+                cv2.line(frame, (x, 0), (x, FRAME_HEIGHT - 1), (80, 80, 80), 1)
+
+            while first < len(ordered) and ordered[first]["exit_time"] + FRAME_WIDTH / belt_speed < t:
+                first += 1
+            for item in ordered[first:]:
+                x1 = int(round(belt_speed * (t - item["enter_time"])))
+                if x1 >= FRAME_WIDTH:
+                    continue
+                if x1 + item["width"] <= 0:
+                    break  # ตัวที่เหลือยังไม่เข้าเฟรม
+                image, mask = sprites[item["shrimp_id"]]
+                # ตัดส่วนที่อยู่นอกเฟรม
+                src_x1 = max(0, -x1)
+                src_x2 = min(item["width"], FRAME_WIDTH - x1)
+                y1 = item["y"]
+                region = frame[y1:y1 + item["height"], x1 + src_x1:x1 + src_x2]
+                if mask is None:
+                    region[:] = image[:, src_x1:src_x2]
+                else:
+                    visible = mask[:, src_x1:src_x2] > 0
+                    region[visible] = image[:, src_x1:src_x2][visible]
+            writer.write(frame)
+    finally:
+        writer.release()
+
+
+def write_ground_truth(path, shrimp):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=TRUTH_FIELDS)
+        writer.writeheader()
+        for item in shrimp:
+            row = dict(item)
+            for key in ("enter_time", "exit_time", "gate_time", "rate"):
+                row[key] = f"{row[key]:.4f}"
+            writer.writerow(row)
+
+
+def read_ground_truth(path):
+    shrimp = []
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            for key in ("shrimp_id", "area", "width", "height", "y"):
+                row[key] = int(row[key])
+            for key in ("enter_time", "exit_time", "gate_time", "rate"):
+                row[key] = float(row[key])
+            shrimp.append(row)
+    return shrimp
+
+
+def read_actuations(path):
+    """อ่าน log การคัดแยกจากโหมด --simulate คืนค่า [(เวลา servo เริ่มหมุน, ชื่อ servo, เวลาที่สั่ง, กรอบ)]"""
+    actuations = []
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            box = None
+            if row.get("x1"):
+                box = tuple(float(row[key]) for key in ("x1", "y1", "x2", "y2"))
+            actuations.append((float(row["video_time"]), row["servo"], float(row["command_time"]), box))
+    return actuations
+
+
+def match_actuations(shrimp, actuations, max_lag=2.0):
+    """จับคู่การคัดแยกแต่ละครั้งกับกุ้งในเฉลยจากตำแหน่งของกรอบ คืนค่า ({shrimp_id: actuation}, จำนวนที่จับคู่ไม่ได้)
+
+    จากกรอบที่ระบบใช้ตัดสินใจและเวลาที่สั่ง ประมาณเวลาที่กุ้งเข้าเฟรมได้ (enter = t - x1 / ความเร็วสายพาน)
+    เวลาที่ประมาณได้จะช้ากว่าเวลาจริงเท่ากับเวลาแฝงของระบบ จึงยอมให้ต่างได้ไม่เกิน max_lag วินาที
+    แล้วเลือกกุ้งที่ยังไม่ถูกจับคู่ซึ่งตำแหน่ง (x, y) ใกล้ที่สุด
+    """
+    matched = {}
+    unmatched = 0
+    for actuation in sorted(actuations, key=lambda item: item[2]):
+        _, _, command_time, box = actuation
+        if box is None:
+            unmatched += 1
+            continue
+        x1, y1, x2, y2 = box
+        best = None
+        best_cost = None
+        for item in shrimp:
+            if item["shrimp_id"] in matched:
+                continue
+            belt_speed = (FRAME_WIDTH - item["width"]) / (item["exit_time"] - item["enter_time"])
+            lag = command_time - x1 / belt_speed - item["enter_time"]
+            if not -0.25 <= lag <= max_lag:
+                continue
+            dy = abs((y1 + y2) / 2 - (item["y"] + item["height"] / 2))
+            if dy > item["height"] / 2:
+                continue
+            cost = dy + abs(x2 - x1 - item["width"]) + abs(lag) * belt_speed * 0.1
+            if best_cost is None or cost < best_cost:
+                best, best_cost = item, cost
+        if best is None:
+            unmatched += 1
+        else:
+            matched[best["shrimp_id"]] = actuation
+    return matched, unmatched
+
+
+def evaluate(shrimp, actuations, max_lag=2.0, servo_move_time=SERVO_MOVE_TIME, buckets=5):
+    """สรุปความแม่นยำและอัตราการพลาดเวลาของการคัดแยก แยกตามช่วงอัตราการไหลของกุ้ง
+
+    พลาดเวลา (deadline miss) คือ servo หมุนถึงตำแหน่ง (เวลาเริ่มหมุน + servo_move_time) หลังจากกุ้งถึงประตูแล้ว
+    """
+    ordered = sorted(shrimp, key=lambda item: item["enter_time"])
+    matched, extra = match_actuations(ordered, actuations, max_lag)
+
+    rates = [item["rate"] for item in ordered] or [0.0]
+    low, high = min(rates), max(rates)
+    step = (high - low) / buckets or 1.0
+    rows = []
+    for index in range(buckets):
+        bucket_low = low + index * step
+        bucket_high = bucket_low + step
+        items = [item for item in ordered
+                 if bucket_low <= item["rate"] < bucket_high or (index == buckets - 1 and item["rate"] >= bucket_low)]
+        if not items:
+            continue
+        sorted_count = correct = late = on_time = 0
+        for item in items:
+            match = matched.get(item["shrimp_id"])
+            if match is None:
+                continue
+            sorted_count += 1
+            move_time, servo = match[:2]
+            is_correct = servo == item["shrimp_size"]
+            is_late = move_time + servo_move_time > item["gate_time"]
+            correct += is_correct
+            late += is_late
+            on_time += is_correct and not is_late
+        span = items[-1]["enter_time"] - items[0]["enter_time"]
+        rows.append({
+            "rate_low": bucket_low,
+            "rate_high": bucket_high,
+            "actual_rate": (len(items) - 1) / span if span > 0 else 0.0,
+            "shrimp": len(items),
+            "sorted": sorted_count,
+            "correct": correct,
+            "late": late,
+            "on_time": on_time
+        })
+    return {"buckets": rows, "unmatched_actuations": extra, "total": len(ordered), "sorted": len(matched)}
+
+
+def print_report(report):
+    print("\nEnd-to-end simulation report")
+    print(f"{'rate (req)':>14} {'actual':>7} {'shrimp':>7} {'sorted':>7} {'accuracy':>9} {'miss':>7} {'on time':>8}")
+    for row in report["buckets"]:
+        shrimp = row["shrimp"]
+        sorted_count = row["sorted"]
+        accuracy = row["correct"] / sorted_count if sorted_count else 0.0
+        miss_rate = row["late"] / sorted_count if sorted_count else 0.0
+        on_time = row["on_time"] / shrimp if shrimp else 0.0
+        print(f"{row['rate_low']:6.2f}-{row['rate_high']:<6.2f}/s {row['actual_rate']:6.2f} {shrimp:7d} "
+              f"{sorted_count:7d} {accuracy:8.1%} {miss_rate:6.1%} {on_time:7.1%}")
+    print(f"Total shrimp: {report['total']}, sorted: {report['sorted']}, "
+          f"actuations without a shrimp: {report['unmatched_actuations']}")
+    print("accuracy = correct servo / sorted, miss = servo ready after gate arrival / sorted, "
+          "on time = correct and in time / all shrimp")
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic conveyor video with ground truth for load tests')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help='Render a synthetic belt video and its ground truth CSV')
+    generate.add_argument('--output', type=str, default='synthetic_belt.mp4', help='Output video file')
+    generate.add_argument('--truth', type=str, default='synthetic_truth.csv', help='Output ground truth CSV')
+    generate.add_argument('--duration', type=float, default=120.0, help='Video length in seconds')
+    generate.add_argument('--fps', type=float, default=30.0, help='Video frame rate')
+    generate.add_argument('--rate-start', type=float, default=0.5, help='Shrimp per second at the start')
+    generate.add_argument('--rate-end', type=float, default=3.0, help='Shrimp per second at the end (linear ramp)')
+    generate.add_argument('--belt-speed', type=float, default=300.0, help='Belt speed in pixels per second')
+    generate.add_argument('--min-gap', type=int, default=20, help='Minimum spacing between shrimp in pixels')
+    generate.add_argument('--gate-distance', type=float, default=200.0,
+                          help='Distance from the right frame edge to the sorting gate in pixels')
+    generate.add_argument('--size-mix', type=str, default=None,
+                          help='Relative share of each grade, e.g. small=2,medium=1,large=1 (default: equal)')
+    generate.add_argument('--config', type=str, default=None, help='Sorter config file for size thresholds')
+    generate.add_argument('--crops', type=str, default=None,
+                          help='Crop archive directory, use real shrimp images instead of drawn blobs')
+    generate.add_argument('--seed', type=int, default=0, help='Random seed')
+
+    evaluate_parser = subparsers.add_parser('evaluate', help='Score a --simulate run against the ground truth')
+    evaluate_parser.add_argument('truth', help='Ground truth CSV from generate')
+    evaluate_parser.add_argument('actuations', help='Actuation CSV written by the sorter in --simulate mode')
+    evaluate_parser.add_argument('--max-lag', type=float, default=2.0,
+                                 help='Seconds after leaving the frame that a servo move can still belong to a shrimp')
+    evaluate_parser.add_argument('--buckets', type=int, default=5, help='Number of throughput buckets')
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        size_thresholds = dict(DEFAULT_THRESHOLDS)
+        grades = DEFAULT_GRADES
+        if args.config:
+            config = load_config_file(args.config)
+            if "grades" in config:
+                grades = config["grades"]
+                size_thresholds = {}
+            size_thresholds.update(config.get("size_thresholds", {}))
+        shrimp = plan_shrimp(args.duration, args.rate_start, args.rate_end, args.belt_speed, size_thresholds,
+                             min_gap=args.min_gap, gate_distance=args.gate_distance,
+                             size_mix=_parse_mix(args.size_mix) if args.size_mix else None, seed=args.seed,
+                             grades=grades)
+        crop_library = load_crop_library(args.crops) if args.crops else None
+        render_video(args.output, shrimp, args.duration, args.fps, args.belt_speed, crop_library, seed=args.seed)
+        write_ground_truth(args.truth, shrimp)
+        print(f"Synthetic video saved to: {args.output} ({len(shrimp)} shrimp, {args.duration:.0f} s)")
+        print(f"Ground truth saved to: {args.truth}")
+    else:
+        report = evaluate(read_ground_truth(args.truth), read_actuations(args.actuations),
+                          max_lag=args.max_lag, buckets=args.buckets)
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
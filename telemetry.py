@@ -0,0 +1,588 @@
+import argparse
+import json
+import math
+import os
+import socket
+import socketserver
+import threading
+import time
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+
+from shrimp_logging import get_logger
+from size_stats import AreaSketch, SizeSummary
+
+log = get_logger("telemetry")
+
+LATENCY_ACCURACY = 0.02  # ความคลาดเคลื่อนสัมพัทธ์ของ histogram เวลาแฝง (หน่วย ms)
+MAX_BATCHES_PER_MESSAGE = 50  # ตอนส่งย้อนหลัง รวมหลายชุดในข้อความเดียว
+MAX_RETRY_DELAY = 30.0
+SOCKET_TIMEOUT = 5.0
+
+
+def parse_address(text):
+    """แปลงที่อยู่เป็น (family, address)
+
+    "unix:/tmp/shrimp.sock" หรือ path ที่มี "/" = Unix socket, "host:port" หรือ ":port" = TCP (ค่าเริ่มต้น 127.0.0.1)
+    """
+    if text.startswith("unix:"):
+        return socket.AF_UNIX, text[len("unix:"):]
+    if "/" in text:
+        return socket.AF_UNIX, text
+    host, _, port = text.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class TelemetryClient:
+    """ส่งข้อมูลของสถานีคัดแยกหนึ่งเครื่องไปยัง aggregator เป็นชุดทุก interval วินาที
+
+    แต่ละชุดมียอดคัดแยกต่อเกรด, sketch พื้นที่ต่อเกรด, histogram เวลาแฝง และสถานะเครื่องของช่วงนั้น
+    ชุดที่ aggregator ยังไม่ตอบรับจะค้างในคิว (ไม่เกิน max_pending ชุด) แล้วส่งย้อนหลังเมื่อเชื่อมต่อได้อีกครั้ง
+    ตอนปิดระบบชุดที่ยังส่งไม่ได้จะถูกเขียนลง spool_path และส่งต่อในการเปิดครั้งถัดไป
+    """
+
+    def __init__(self, address, station, grades, interval=5.0, health=None, spool_path=None,
+                 max_pending=10000, relative_accuracy=0.01):
+        self.family, self.address = parse_address(address)
+        self.address_text = address
+        self.station = station
+        self.grades = tuple(grades)
+        self.interval = interval
+        self.health = health  # callable คืน dict สถานะเครื่อง (เรียกจาก sender thread)
+        self.spool_path = spool_path
+        self.max_pending = max_pending
+        self.relative_accuracy = relative_accuracy
+        self.run_id = f"{int(time.time())}-{os.getpid()}"  # แยกชุดของการรันแต่ละครั้ง (seq เริ่มใหม่ทุกครั้ง)
+
+        # ข้อมูลของช่วงปัจจุบัน (เขียนจาก processing thread, สลับออกโดย sender thread)
+        self.lock = threading.Lock()
+        self._new_window()
+
+        # ชุดที่รอ aggregator ตอบรับ (ใช้เฉพาะใน sender thread และตอน close หลัง thread จบแล้ว)
+        self.pending = deque()
+        self.seq = 0
+        self.sent_batches = 0
+        self.dropped_batches = 0
+        self.sock = None
+        self.reader = None
+        self.connected = False
+        self.retry_delay = 1.0
+        self.next_attempt = 0.0
+
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _new_window(self):
+        self.window_start = time.time()
+        self.counts = {}
+        self.areas = {}
+        self.latency = AreaSketch(LATENCY_ACCURACY)
+
+    def record_sort(self, grade):
+        """นับกุ้งที่ถูกคัดแยกหนึ่งตัว (hot path แค่บวกตัวนับ)"""
+        with self.lock:
+            self.counts[grade] = self.counts.get(grade, 0) + 1
+
+    def record_area(self, grade, area):
+        with self.lock:
+            summary = self.areas.get(grade)
+            if summary is None:
+                summary = self.areas[grade] = SizeSummary(self.relative_accuracy)
+            summary.add(area)
+
+    def record_latency(self, seconds):
+        """เวลาแฝงของหนึ่งเฟรม (ตั้งแต่ได้เฟรมจากกล้องจนคัดแยกเสร็จ)"""
+        with self.lock:
+            self.latency.add(seconds * 1000)
+
+    def start(self):
+        self._load_spool()
+        self.thread = threading.Thread(target=self._sender_loop, name="telemetry")
+        self.thread.daemon = True
+        self.thread.start()
+        print(f"Streaming telemetry as station '{self.station}' to {self.address_text} every {self.interval:g} s")
+
+    def _sender_loop(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self._seal()
+                self._send_pending()
+            except Exception as e:
+                log.error("Telemetry error: %s", e)
+
+    def _seal(self):
+        """ปิดช่วงปัจจุบันเป็นหนึ่งชุดแล้วต่อท้ายคิว"""
+        with self.lock:
+            counts, areas, latency, start = self.counts, self.areas, self.latency, self.window_start
+            self._new_window()
+        health = {}
+        if self.health:
+            try:
+                health = self.health()
+            except Exception as e:
+                log.warning("Cannot read station health: %s", e)
+        health["pending_batches"] = len(self.pending)
+        health["dropped_batches"] = self.dropped_batches
+
+        self.seq += 1
+        batch = {
+            "run": self.run_id,
+            "seq": self.seq,
+            "start": start,
+            "end": self.window_start,
+            "counts": counts,
+            "areas": {grade: summary.to_dict() for grade, summary in areas.items()},
+            "latency_ms": latency.to_dict() if latency.count else None,
+            "health": health
+        }
+        if len(self.pending) >= self.max_pending:
+            self.pending.popleft()
+            self.dropped_batches += 1
+        self.pending.append(batch)
+
+    def _connect(self):
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(SOCKET_TIMEOUT)
+        try:
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+        self.reader = sock.makefile("r", encoding="utf-8")
+        if len(self.pending) > 1:
+            log.info("Connected to telemetry aggregator %s, back-filling %d batches",
+                     self.address_text, len(self.pending))
+        elif not self.connected:
+            log.info("Connected to telemetry aggregator %s", self.address_text)
+        self.connected = True
+
+    def _disconnect(self):
+        if self.sock is not None:
+            try:
+                self.reader.close()
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.reader = None
+
+    def _send_pending(self):
+        """ส่งทุกชุดที่ค้างตามลำดับ ทีละไม่เกิน MAX_BATCHES_PER_MESSAGE ชุด และเอาออกจากคิวเมื่อได้รับการตอบรับ"""
+        if not self.pending or time.time() < self.next_attempt:
+            return
+        try:
+            if self.sock is None:
+                self._connect()
+            while self.pending:
+                batches = list(islice(self.pending, MAX_BATCHES_PER_MESSAGE))
+                self.sock.sendall(_encode({"station": self.station, "grades": self.grades, "batches": batches}))
+                reply = self.reader.readline()
+                if not reply:
+                    raise ConnectionError("aggregator closed the connection")
+                accepted = int(json.loads(reply)["ack"])
+                for _ in range(min(accepted, len(batches))):
+                    self.pending.popleft()
+                self.sent_batches += accepted
+            self.retry_delay = 1.0
+        except (OSError, ValueError, KeyError) as e:
+            if self.connected:
+                log.warning("Telemetry aggregator %s unreachable, buffering batches: %s", self.address_text, e)
+            self.connected = False
+            self._disconnect()
+            # ลองใหม่แบบ exponential backoff ระหว่างนั้นชุดใหม่ยังต่อท้ายคิวตามปกติ
+            self.next_attempt = time.time() + self.retry_delay
+            self.retry_delay = min(self.retry_delay * 2, MAX_RETRY_DELAY)
+
+    def _load_spool(self):
+        """อ่านชุดที่ค้างจากการรันครั้งก่อน (ถ้ามี) ไว้หน้าคิวเพื่อส่งก่อน"""
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return
+        loaded = 0
+        try:
+            with open(self.spool_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        self.pending.append(json.loads(line))
+                        loaded += 1
+            os.remove(self.spool_path)
+        except (OSError, ValueError) as e:
+            print(f"Cannot read telemetry spool {self.spool_path}: {e}")
+        if loaded:
+            print(f"Loaded {loaded} unsent telemetry batches from {self.spool_path}")
+
+    def _write_spool(self):
+        try:
+            with open(self.spool_path, "w", encoding="utf-8") as f:
+                for batch in self.pending:
+                    f.write(json.dumps(batch, separators=(",", ":")) + "\n")
+        except OSError as e:
+            print(f"Error writing telemetry spool: {e}")
+            return
+        print(f"Telemetry: {len(self.pending)} unsent batches saved to {self.spool_path}")
+
+    def close(self):
+        """ส่งช่วงสุดท้าย (ลองเชื่อมต่อทันทีหนึ่งครั้ง) ชุดที่เหลือเขียนลง spool"""
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout=SOCKET_TIMEOUT * 2)
+        self.thread = None
+        self._seal()
+        self.next_attempt = 0.0
+        self._send_pending()
+        self._disconnect()
+        if self.pending:
+            if self.spool_path:
+                self._write_spool()
+            else:
+                print(f"Telemetry: {len(self.pending)} batches could not be sent")
+        print(f"Telemetry: {self.sent_batches} batches sent"
+              + (f", {self.dropped_batches} dropped while the aggregator was down" if self.dropped_batches else ""))
+
+
+class StationView:
+    """ข้อมูลที่รวมแล้วของสถานีหนึ่งเครื่อง"""
+
+    def __init__(self, name):
+        self.name = name
+        self.grades = ()
+        self.counts = {}
+        self.hourly = {}  # เวลาเริ่มชั่วโมง -> {เกรด: จำนวน} (ตามเวลาของชุด ไม่ใช่เวลาที่ได้รับ)
+        self.areas = {}
+        self.latency = AreaSketch(LATENCY_ACCURACY)
+        self.health = {}
+        self.batches = 0
+        self.backfilled = 0  # ชุดที่มาถึงช้ากว่าเวลาจริงมาก (ส่งย้อนหลังหลัง aggregator กลับมา)
+        self.last_seen = None  # เวลาที่ได้รับข้อมูลล่าสุด
+        self.last_batch_end = None
+
+    def merge(self, batch, received):
+        self.batches += 1
+        if received - batch["end"] > 2 * max(batch["end"] - batch["start"], 1.0):
+            self.backfilled += 1
+        hour = math.floor(batch["start"] / 3600) * 3600
+        hourly = self.hourly.setdefault(hour, {})
+        for grade, count in batch["counts"].items():
+            self.counts[grade] = self.counts.get(grade, 0) + count
+            hourly[grade] = hourly.get(grade, 0) + count
+        for grade, data in batch["areas"].items():
+            summary = SizeSummary.from_dict(data)
+            if grade in self.areas:
+                self.areas[grade].merge(summary)
+            else:
+                self.areas[grade] = summary
+        if batch.get("latency_ms"):
+            self.latency.merge(AreaSketch.from_dict(batch["latency_ms"]))
+        # สถานะเครื่องเอาของชุดที่ใหม่ที่สุด (ชุดย้อนหลังมาถึงทีหลังแต่เก่ากว่า)
+        if self.last_batch_end is None or batch["end"] >= self.last_batch_end:
+            self.last_batch_end = batch["end"]
+            self.health = batch.get("health", {})
+        self.last_seen = max(self.last_seen or received, received)
+
+
+def _area_view(areas, grades):
+    view = {}
+    for grade in list(grades) + sorted(set(areas) - set(grades)):
+        summary = areas.get(grade)
+        if summary is None or summary.stats.count == 0:
+            continue
+        view[grade] = {"count": summary.stats.count, "mean": round(summary.stats.mean, 1),
+                       "std": round(summary.stats.std, 1), "p50": round(summary.sketch.quantile(0.5), 1)}
+    return view
+
+
+def _latency_view(sketch):
+    if sketch.count == 0:
+        return None
+    return {"count": sketch.count, "p50": round(sketch.quantile(0.5), 1), "p95": round(sketch.quantile(0.95), 1),
+            "p99": round(sketch.quantile(0.99), 1)}
+
+
+class TelemetryAggregator:
+    """รวมข้อมูลจากหลายสถานีคัดแยก และสร้างมุมมองรวม (ต่อสถานีและรวมทุกสถานี)
+
+    ชุดที่รับแล้วต่อท้ายไฟล์ log_path (JSON lines) ก่อนตอบรับ จึงโหลดกลับได้หลัง aggregator เริ่มใหม่
+    ชุดที่ซ้ำ (สถานีส่งซ้ำเพราะไม่ได้รับการตอบรับ) ตรวจจาก (สถานี, run, seq) และถูกข้าม
+    """
+
+    def __init__(self, log_path=None, offline_after=30.0):
+        self.log_path = log_path
+        self.offline_after = offline_after
+        self.stations = {}
+        self.last_seq = {}  # (สถานี, run) -> seq ล่าสุดที่รวมแล้ว
+        self.duplicates = 0
+        self.lock = threading.Lock()
+        self.log_file = None
+
+    def open(self):
+        """โหลดชุดที่บันทึกไว้ แล้วเปิด log เพื่อต่อท้าย"""
+        if not self.log_path:
+            return
+        replayed = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    # บรรทัดสุดท้ายอาจเขียนไม่ครบถ้าโปรแกรมล่ม
+                    if not line.endswith("\n"):
+                        break
+                    record = json.loads(line)
+                    if self._accept(record["station"], record["batch"], record["received"]):
+                        replayed += 1
+                    if record.get("grades"):
+                        self.stations[record["station"]].grades = tuple(record["grades"])
+        if replayed:
+            print(f"Replayed {replayed} telemetry batches from {self.log_path}")
+        self.log_file = open(self.log_path, "a", encoding="utf-8")
+
+    def close(self):
+        if self.log_file:
+            self.log_file.close()
+            self.log_file = None
+
+    def _accept(self, station_name, batch, received):
+        key = (station_name, batch["run"])
+        if batch["seq"] <= self.last_seq.get(key, 0):
+            self.duplicates += 1
+            return False
+        self.last_seq[key] = batch["seq"]
+        station = self.stations.get(station_name)
+        if station is None:
+            station = self.stations[station_name] = StationView(station_name)
+            log.info("New station: %s", station_name)
+        station.merge(batch, received)
+        return True
+
+    def ingest(self, message):
+        """รวมหนึ่งข้อความจากสถานี คืนค่าจำนวนชุดที่ตอบรับ (รวมชุดซ้ำที่ข้ามไป)"""
+        station_name = message["station"]
+        received = time.time()
+        with self.lock:
+            for batch in message["batches"]:
+                if not self._accept(station_name, batch, received):
+                    continue
+                if self.log_file:
+                    self.log_file.write(json.dumps({"station": station_name, "grades": message.get("grades"),
+                                                    "received": received, "batch": batch},
+                                                   separators=(",", ":")) + "\n")
+            if self.log_file:
+                self.log_file.flush()
+            if message.get("grades") and station_name in self.stations:
+                self.stations[station_name].grades = tuple(message["grades"])
+        return len(message["batches"])
+
+    def view(self):
+        """มุมมองรวมเป็น dict (ส่งเป็น JSON ได้)"""
+        now = time.time()
+        with self.lock:
+            grades = []
+            combined_counts = {}
+            combined_areas = {}
+            combined_latency = AreaSketch(LATENCY_ACCURACY)
+            hourly = {}
+            stations = {}
+            for name, station in sorted(self.stations.items()):
+                grades.extend(grade for grade in station.grades if grade not in grades)
+                for grade, count in station.counts.items():
+                    combined_counts[grade] = combined_counts.get(grade, 0) + count
+                for grade, summary in station.areas.items():
+                    merged = combined_areas.setdefault(grade, SizeSummary(summary.sketch.relative_accuracy))
+                    merged.merge(summary)
+                combined_latency.merge(station.latency)
+                for hour, counts in station.hourly.items():
+                    hour_counts = hourly.setdefault(hour, {})
+                    for grade, count in counts.items():
+                        hour_counts[grade] = hour_counts.get(grade, 0) + count
+                stations[name] = {
+                    "online": now - station.last_seen < self.offline_after,
+                    "last_seen_s": round(now - station.last_seen, 1),
+                    "batches": station.batches,
+                    "backfilled": station.backfilled,
+                    "counts": station.counts,
+                    "total": sum(station.counts.values()),
+                    "areas": _area_view(station.areas, station.grades),
+                    "latency_ms": _latency_view(station.latency),
+                    "health": station.health
+                }
+            return {
+                "generated": now,
+                "grades": grades,
+                "stations": stations,
+                "combined": {
+                    "stations_online": sum(1 for station in stations.values() if station["online"]),
+                    "counts": combined_counts,
+                    "total": sum(combined_counts.values()),
+                    "areas": _area_view(combined_areas, grades),
+                    "latency_ms": _latency_view(combined_latency)
+                },
+                "hourly": {time.strftime("%Y-%m-%d %H:00", time.localtime(hour)): counts
+                           for hour, counts in sorted(hourly.items())},
+                "duplicates": self.duplicates
+            }
+
+
+def format_view(view):
+    """มุมมองรวมเป็นข้อความตาราง"""
+    grades = view["grades"] or sorted(view["combined"]["counts"])
+    lines = [f"Telemetry at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(view['generated']))}, "
+             f"{view['combined']['stations_online']} of {len(view['stations'])} stations online"]
+    header = f"  {'station':<16} {'state':<8}" + "".join(f" {grade:>8}" for grade in grades)
+    header += f" {'total':>8} {'lat p50':>8} {'lat p95':>8} {'fps':>6} {'servo err':>9} {'backlog':>7}"
+    lines.append(header)
+
+    def row(name, state, counts, total, latency, health):
+        text = f"  {name:<16} {state:<8}" + "".join(f" {counts.get(grade, 0):>8}" for grade in grades)
+        text += f" {total:>8}"
+        text += f" {latency['p50']:>8.0f} {latency['p95']:>8.0f}" if latency else f" {'-':>8} {'-':>8}"
+        fps = health.get("fps")
+        text += f" {fps:>6.1f}" if fps is not None else f" {'-':>6}"
+        text += f" {health.get('servo_errors', '-'):>9} {health.get('pending_batches', '-'):>7}"
+        return text
+
+    for name, station in view["stations"].items():
+        state = "online" if station["online"] else "OFFLINE"
+        lines.append(row(name, state, station["counts"], station["total"], station["latency_ms"], station["health"]))
+    combined = view["combined"]
+    lines.append(row("ALL", "", combined["counts"], combined["total"], combined["latency_ms"], {}))
+
+    if combined["areas"]:
+        lines.append(f"  {'grade':<8} {'count':>7} {'mean':>10} {'std':>10} {'p50':>10}  (area, pixels²)")
+        for grade, area in combined["areas"].items():
+            lines.append(f"  {grade:<8} {area['count']:>7} {area['mean']:>10.1f} {area['std']:>10.1f} "
+                         f"{area['p50']:>10.1f}")
+    return "\n".join(lines)
+
+
+class _BatchHandler(socketserver.StreamRequestHandler):
+    """รับข้อความ (JSON หนึ่งบรรทัดต่อข้อความ) จากสถานี และตอบ {"ack": จำนวนชุด} ทีละข้อความ"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                accepted = self.server.aggregator.ingest(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                log.warning("Bad telemetry message from %s: %s", self.client_address or "unix socket", e)
+                return
+            self.wfile.write(_encode({"ack": accepted}))
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def create_batch_server(address, aggregator):
+    """server รับข้อมูลจากสถานีที่ address (TCP หรือ Unix socket)"""
+    family, bind_address = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(bind_address):
+            os.remove(bind_address)  # socket ค้างจากครั้งก่อน
+        server = _UnixServer(bind_address, _BatchHandler)
+    else:
+        server = _TCPServer(bind_address, _BatchHandler)
+    server.aggregator = aggregator
+    return server
+
+
+class _ViewHandler(BaseHTTPRequestHandler):
+    """GET / หรือ /view.json = มุมมองรวมแบบ JSON, GET /text = ตารางข้อความ"""
+
+    def do_GET(self):
+        view = self.server.aggregator.view()
+        if self.path in ("/", "/view.json"):
+            body, content_type = json.dumps(view, indent=2).encode("utf-8"), "application/json"
+        elif self.path == "/text":
+            body, content_type = (format_view(view) + "\n").encode("utf-8"), "text/plain; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(args):
+    aggregator = TelemetryAggregator(log_path=args.log or None, offline_after=args.offline_after)
+    aggregator.open()
+    batch_server = create_batch_server(args.listen, aggregator)
+    threading.Thread(target=batch_server.serve_forever, name="telemetry_batches", daemon=True).start()
+    print(f"Receiving station telemetry on {args.listen}")
+
+    view_server = None
+    if args.http:
+        _, http_address = parse_address(args.http)
+        view_server = ThreadingHTTPServer(http_address, _ViewHandler)
+        view_server.aggregator = aggregator
+        threading.Thread(target=view_server.serve_forever, name="telemetry_view", daemon=True).start()
+        print(f"Combined view at http://{http_address[0]}:{http_address[1]}/ (JSON) and /text")
+
+    try:
+        while True:
+            time.sleep(args.print_interval if args.print_interval > 0 else 3600)
+            if args.print_interval > 0 and aggregator.stations:
+                print("\n" + format_view(aggregator.view()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        batch_server.shutdown()
+        batch_server.server_close()
+        if view_server:
+            view_server.shutdown()
+        aggregator.close()
+        family, bind_address = parse_address(args.listen)
+        if family == socket.AF_UNIX and os.path.exists(bind_address):
+            os.remove(bind_address)
+
+
+def show(args):
+    _, (host, port) = parse_address(args.http)
+    with urllib.request.urlopen(f"http://{host}:{port}/view.json", timeout=SOCKET_TIMEOUT) as response:
+        view = json.load(response)
+    print(json.dumps(view, indent=2) if args.json else format_view(view))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate telemetry from several shrimp sorting stations')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='Run the aggregator')
+    serve_parser.add_argument('--listen', type=str, default='127.0.0.1:8700',
+                              help='Address for station batches: host:port (TCP) or unix:/path (default: 127.0.0.1:8700)')
+    serve_parser.add_argument('--http', type=str, default='127.0.0.1:8701',
+                              help='host:port for the combined view over HTTP, empty string disables it')
+    serve_parser.add_argument('--log', type=str, default='telemetry_batches.jsonl',
+                              help='Append-only log of received batches, replayed on restart (empty string disables)')
+    serve_parser.add_argument('--offline-after', type=float, default=30.0,
+                              help='Seconds without data before a station is shown as offline (default: 30)')
+    serve_parser.add_argument('--print-interval', type=float, default=10.0,
+                              help='Seconds between printed combined views, 0 disables (default: 10)')
+
+    show_parser = commands.add_parser('show', help='Print the combined view from a running aggregator')
+    show_parser.add_argument('--http', type=str, default='127.0.0.1:8701', help='Aggregator HTTP address')
+    show_parser.add_argument('--json', action='store_true', help='Print the raw JSON view')
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        serve(args)
+    else:
+        show(args)
+
+
+if __name__ == "__main__":
+    main()
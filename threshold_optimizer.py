@@ -0,0 +1,146 @@
+import numpy as np
+
+
+def counts_from_samples(areas_by_class):
+    """เรียงพื้นที่ทั้งหมดครั้งเดียว คืนค่า (cut_values, counts)
+
+    counts[k, i] คือจำนวนตัวอย่างของคลาส k ที่มีค่าเท่ากับค่าลำดับที่ i (ค่าไม่ซ้ำ เรียงจากน้อยไปมาก)
+    cut_values[p] คือค่า threshold เมื่อแบ่งระหว่างค่าลำดับที่ p-1 และ p (ยาว M+1)
+    """
+    arrays = [np.asarray(areas, dtype=np.float64) for areas in areas_by_class]
+    labels = np.concatenate([np.full(len(a), k, dtype=np.int64) for k, a in enumerate(arrays)])
+    values, inverse = np.unique(np.concatenate(arrays), return_inverse=True)
+
+    num_classes = len(arrays)
+    num_values = len(values)
+    counts = np.bincount(labels * num_values + inverse,
+                         minlength=num_classes * num_values).reshape(num_classes, num_values)
+
+    # threshold อยู่กึ่งกลางระหว่างค่าที่ติดกัน (พื้นที่ < threshold = คลาสที่เล็กกว่า)
+    cut_values = np.empty(num_values + 1)
+    cut_values[0] = values[0]
+    cut_values[1:-1] = (values[:-1] + values[1:]) / 2
+    cut_values[-1] = values[-1] + 1
+    return cut_values, counts
+
+
+def counts_from_histograms(bin_edges, histograms):
+    """ใช้ histogram ที่มีขอบ bin ร่วมกัน (K x B) แทนข้อมูลดิบ จุดตัดอยู่ที่ขอบ bin"""
+    return np.asarray(bin_edges, dtype=np.float64), np.asarray(histograms, dtype=np.int64)
+
+
+def _utility_matrix(class_totals, objective, cost_matrix):
+    num_classes = len(class_totals)
+    if objective == "balanced_accuracy":
+        # ถูกต้องหนึ่งตัวได้ 1/n_k ผลรวมหารด้วย K คือ balanced accuracy
+        return np.diag(1.0 / np.maximum(class_totals, 1))
+    if objective == "cost":
+        cost = np.asarray(cost_matrix, dtype=np.float64)
+        if cost.shape != (num_classes, num_classes):
+            raise ValueError(f"Cost matrix must be {num_classes}x{num_classes}")
+        return -cost
+    raise ValueError(f"Unknown objective: {objective}")
+
+
+def optimize_thresholds(cut_values, counts, objective="balanced_accuracy", cost_matrix=None):
+    """หา threshold K-1 ค่าที่ดีที่สุด ตรวจทุกจุดตัดที่เป็นไปได้ด้วย cumulative sum ใน O(K·M)
+
+    objective="balanced_accuracy" เลือกจุดตัดที่ให้ balanced accuracy สูงสุด
+    objective="cost" เลือกจุดตัดที่ให้ต้นทุนรวมต่ำสุด cost_matrix[true][predicted]
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    num_classes, num_values = counts.shape
+    class_totals = counts.sum(axis=1)
+    utility = _utility_matrix(class_totals, objective, cost_matrix)
+
+    # cumulative[k, p] = จำนวนคลาส k ที่อยู่ต่ำกว่าจุดตัดตำแหน่ง p
+    cumulative = np.zeros((num_classes, num_values + 1))
+    np.cumsum(counts, axis=1, out=cumulative[:, 1:])
+
+    # g[j, p] = ผลรวม utility ถ้าทุกตัวที่อยู่ต่ำกว่า p ถูกทำนายเป็นคลาส j
+    g = utility.T @ cumulative
+
+    # utility รวมแยกเป็นผลรวมของแต่ละจุดตัด: h_i(p) = g[i-1, p] - g[i, p]
+    # แล้วใช้ dynamic programming กับเงื่อนไข p_1 <= p_2 <= ... ด้วย prefix max
+    positions_index = np.arange(num_values + 1)
+    best = g[0] - g[1]
+    back_pointers = []
+    for i in range(2, num_classes):
+        running_max = np.maximum.accumulate(best)
+        argmax = np.maximum.accumulate(np.where(best == running_max, positions_index, 0))
+        back_pointers.append(argmax)
+        best = running_max + (g[i - 1] - g[i])
+
+    positions = [int(np.argmax(best))]
+    for argmax in reversed(back_pointers):
+        positions.append(int(argmax[positions[-1]]))
+    positions.reverse()
+
+    thresholds = [float(cut_values[p]) for p in positions]
+    return thresholds, positions
+
+
+def confusion_matrix_at(counts, positions):
+    """confusion matrix [true][predicted] จากตำแหน่งจุดตัด"""
+    counts = np.asarray(counts, dtype=np.int64)
+    num_classes, num_values = counts.shape
+    cumulative = np.zeros((num_classes, num_values + 1), dtype=np.int64)
+    np.cumsum(counts, axis=1, out=cumulative[:, 1:])
+    bounds = [0] + list(positions) + [num_values]
+    return np.stack([cumulative[:, bounds[j + 1]] - cumulative[:, bounds[j]]
+                     for j in range(num_classes)], axis=1)
+
+
+def bootstrap_accuracy(confusion, num_resamples=2000, confidence=0.95, seed=0):
+    """ช่วงความเชื่อมั่นของความแม่นยำด้วย stratified bootstrap แบบ vectorized
+
+    เมื่อ threshold คงที่ การสุ่มตัวอย่างซ้ำของแต่ละคลาสเท่ากับการสุ่ม multinomial
+    บนแถวของ confusion matrix จึงไม่ต้องสุ่มข้อมูลดิบทีละแถว
+    (ไม่รวมความแปรปรวนจากการหา threshold ใหม่ในแต่ละรอบ)
+    """
+    rng = np.random.default_rng(seed)
+    confusion = np.asarray(confusion, dtype=np.int64)
+    num_classes = confusion.shape[0]
+    totals = confusion.sum(axis=1)
+
+    per_class = np.zeros((num_resamples, num_classes))
+    for k in range(num_classes):
+        if totals[k] == 0:
+            continue
+        resampled = rng.multinomial(totals[k], confusion[k] / totals[k], size=num_resamples)
+        per_class[:, k] = resampled[:, k] / totals[k]
+
+    valid = totals > 0
+    balanced = per_class[:, valid].mean(axis=1)
+    alpha = (1 - confidence) / 2
+    return {
+        "per_class": np.quantile(per_class, [alpha, 1 - alpha], axis=0).T,
+        "balanced": tuple(np.quantile(balanced, [alpha, 1 - alpha]))
+    }
+
+
+def evaluate_thresholds(cut_values, counts, objective="balanced_accuracy", cost_matrix=None,
+                        num_resamples=2000, confidence=0.95):
+    """หา threshold ที่ดีที่สุดและสรุปผล (confusion matrix, ความแม่นยำ, ช่วงความเชื่อมั่น)"""
+    thresholds, positions = optimize_thresholds(cut_values, counts, objective, cost_matrix)
+    confusion = confusion_matrix_at(counts, positions)
+    totals = confusion.sum(axis=1)
+    per_class = np.divide(np.diag(confusion), totals, out=np.zeros(len(totals)), where=totals > 0)
+
+    result = {
+        "thresholds": thresholds,
+        "positions": positions,
+        "confusion": confusion,
+        "per_class_accuracy": per_class,
+        "balanced_accuracy": float(per_class[totals > 0].mean()) if (totals > 0).any() else 0.0,
+        "ci": bootstrap_accuracy(confusion, num_resamples, confidence),
+        "confidence": confidence
+    }
+    if objective == "cost":
+        result["total_cost"] = float((confusion * np.asarray(cost_matrix, dtype=np.float64)).sum())
+    return result
+
+
+def parse_cost_matrix(text):
+    """แปลงข้อความ "0,1,4;1,0,1;4,1,0" (แถว = คลาสจริง) เป็น list ของ list"""
+    return [[float(value) for value in row.split(",")] for row in text.split(";")]
@@ -0,0 +1,190 @@
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from inference_geometry import InferenceGeometry
+
+
+def _decode_worker(path, shm_name, slot_shape, num_slots, free_slots, ready_slots, stop_event, loop):
+    """Process แยกสำหรับถอดรหัสวิดีโอล่วงหน้าลงใน shared memory"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((num_slots,) + slot_shape, dtype=np.uint8, buffer=shm.buf)
+    height, width = slot_shape[:2]
+    # ปรับเป็นเฟรมอ้างอิงแบบเดียวกับ CheckPixel และ offline_analyzer (ตัดขอบตรงกลาง ไม่ยืดภาพ)
+    geometry = InferenceGeometry(width, height)
+    cap = cv2.VideoCapture(path)
+    seq = 0
+
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                if not loop:
+                    break
+                # วนกลับไปต้นไฟล์ใน process นี้ ฝั่งผู้อ่านยังมีเฟรมในบัฟเฟอร์ให้ใช้ระหว่างรอ
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = cap.read()
+                if not ret:
+                    # บาง backend seek ไม่ได้ ให้เปิดไฟล์ใหม่แทน
+                    cap.release()
+                    cap = cv2.VideoCapture(path)
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+
+            # รอช่องว่างใน ring buffer (bounded) โดยยังตอบสนองต่อการสั่งหยุด
+            idx = None
+            while idx is None and not stop_event.is_set():
+                try:
+                    idx = free_slots.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            if idx is None:
+                break
+
+            np.copyto(slots[idx], geometry.to_reference(frame))
+            ready_slots.put((idx, seq))
+            seq += 1
+    finally:
+        # แจ้งผู้อ่านว่าไม่มีเฟรมต่อแล้ว
+        ready_slots.put(None)
+        cap.release()
+        del slots
+        shm.close()
+
+
+class VideoFileReader:
+    """อ่านไฟล์วิดีโอแบบ read-ahead ผ่าน process แยก ใช้แทน cv2.VideoCapture สำหรับไฟล์
+
+    ถ้าระบุ size เฟรมที่สัดส่วนต่างออกไปจะถูกตัดขอบตรงกลางก่อนย่อ/ขยาย (InferenceGeometry.to_reference)
+    """
+
+    def __init__(self, path, size=None, buffer_size=8, loop=True, pace="native"):
+        if pace not in ("native", "fast"):
+            raise ValueError(f"Unknown pace mode: {pace}")
+
+        # อ่านข้อมูลพื้นฐานของวิดีโอก่อนเริ่ม process ถอดรหัส
+        probe = cv2.VideoCapture(path)
+        if not probe.isOpened():
+            raise IOError(f"Cannot open video file: {path}")
+        fps = probe.get(cv2.CAP_PROP_FPS)
+        width = int(probe.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(probe.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_total = int(probe.get(cv2.CAP_PROP_FRAME_COUNT))
+        probe.release()
+
+        if size is not None:
+            width, height = size
+
+        self.path = path
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.width = width
+        self.height = height
+        self.loop = loop
+        self.pace = pace
+        self.buffer_size = buffer_size
+
+        # จองหน่วยความจำร่วมสำหรับเฟรมทั้งหมดครั้งเดียว
+        slot_shape = (height, width, 3)
+        self._shm = shared_memory.SharedMemory(create=True, size=buffer_size * height * width * 3)
+        self._slots = np.ndarray((buffer_size,) + slot_shape, dtype=np.uint8, buffer=self._shm.buf)
+
+        ctx = mp.get_context("spawn")
+        self._free_slots = ctx.Queue()
+        self._ready_slots = ctx.Queue()
+        self._stop_event = ctx.Event()
+        for i in range(buffer_size):
+            self._free_slots.put(i)
+
+        self._process = ctx.Process(
+            target=_decode_worker,
+            args=(path, self._shm.name, slot_shape, buffer_size,
+                  self._free_slots, self._ready_slots, self._stop_event, loop),
+            daemon=True
+        )
+        self._process.start()
+
+        self._finished = False
+        self._frames_read = 0
+        self._pace_start = None
+
+    @property
+    def pid(self):
+        """pid ของ process ถอดรหัส (None เมื่อปิดแล้ว)"""
+        return self._process.pid if self._process is not None else None
+
+    def isOpened(self):
+        return not self._finished and self._process is not None
+
+    def read(self, timeout=5.0):
+        """คืนค่า (ret, frame) เหมือน cv2.VideoCapture.read()"""
+        if self._finished:
+            return False, None
+
+        try:
+            item = self._ready_slots.get(timeout=timeout)
+        except queue.Empty:
+            return False, None
+
+        if item is None:
+            self._finished = True
+            return False, None
+
+        idx, _ = item
+        frame = self._slots[idx].copy()
+        self._free_slots.put(idx)
+
+        # เล่นตาม FPS จริงของไฟล์ หรือเร็วที่สุดเท่าที่ทำได้
+        if self.pace == "native":
+            now = time.monotonic()
+            if self._pace_start is None:
+                self._pace_start = now
+            due = self._pace_start + self._frames_read / self.fps
+            if due > now:
+                time.sleep(due - now)
+            elif now - due > 1.0:
+                # ผู้อ่านช้ากว่าวิดีโอมาก ให้เริ่มนับเวลาใหม่แทนการเร่งเล่นชดเชย
+                self._pace_start = now - self._frames_read / self.fps
+
+        self._frames_read += 1
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frame_total
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self._frames_read
+        return 0
+
+    def set(self, prop, value):
+        # การ seek ทำใน process ถอดรหัสเท่านั้น
+        return False
+
+    def release(self):
+        if self._process is None:
+            return
+        self._stop_event.set()
+        self._process.join(timeout=2.0)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=1.0)
+        self._process = None
+        self._finished = True
+
+        for q in (self._free_slots, self._ready_slots):
+            q.cancel_join_thread()
+            q.close()
+
+        self._slots = None
+        self._shm.close()
+        self._shm.unlink()